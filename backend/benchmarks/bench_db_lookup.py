@@ -0,0 +1,98 @@
+"""
+Patient lookup latency under concurrent readers, before and after the pool.
+
+    PYTHONPATH=src python benchmarks/bench_db_lookup.py --patients 5000 --threads 8
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from hospital_data.db import close_pool, get_pool, select_sql
+from synthetic_ed import build_database
+
+
+def lookup_unpooled(db_path: str, anon_id: str):
+    # what hospital_api.get_patient_data used to do
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM patient_data WHERE anon_id = ? ORDER BY id DESC LIMIT 1", (anon_id,))
+    result = cursor.fetchone()
+    conn.close()
+    return result
+
+
+def lookup_pooled(db_path: str, anon_id: str):
+    with get_pool(db_path).connection() as conn:
+        return conn.execute(select_sql(by_anon_id=True), (anon_id,)).fetchone()
+
+
+def run(lookup, db_path, anon_ids, threads, lookups_per_thread):
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local = []
+        barrier.wait()
+        for _ in range(lookups_per_thread):
+            anon_id = rng.choice(anon_ids)
+            started = time.perf_counter()
+            lookup(db_path, anon_id)
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "lookups": len(latencies),
+        "throughput_per_s": len(latencies) / elapsed,
+        "p50_us": quantiles[49] * 1e6,
+        "p95_us": quantiles[94] * 1e6,
+        "p99_us": quantiles[98] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lookups", type=int, default=2000, help="lookups per thread")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        anon_ids = build_database(db_path, args.patients)
+        results = {
+            "patients": args.patients,
+            "threads": args.threads,
+            "unpooled": run(lookup_unpooled, db_path, anon_ids, args.threads, args.lookups),
+            "pooled": run(lookup_pooled, db_path, anon_ids, args.threads, args.lookups),
+        }
+    finally:
+        close_pool(db_path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
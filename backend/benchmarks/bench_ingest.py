@@ -0,0 +1,119 @@
+"""
+Queue ingestion against the local IFEM feed simulator, over real HTTP.
+
+Serves a simulated ED (or a recording with --replay) from the simulator
+with time running --speed times faster than the wall clock, and runs the
+ingester against it every --interval seconds for --seconds. Reports cycle
+latency, patients ingested per second and freshness lag: how long after a
+patient arrived in the feed they showed up in a published snapshot.
+
+    PYTHONPATH=src python benchmarks/bench_ingest.py --speed 60 --surge 1:60:5000 --output ingest.json
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from functools import partial
+from typing import Any, Dict, List
+
+from werkzeug.serving import make_server
+
+from hospital_data.changefeed import ChangeFeed
+from hospital_data.create_db import fetch_queue_data
+from hospital_data.db import close_pool
+from hospital_data.ingest import QueueIngester
+from hospital_data.replay import load_recording
+from hospital_data.simulator import FeedSource, RecordedFeed, SimulatedED, SimulationClock, Surge, create_feed_app
+from report import latency_summary, write_report
+
+
+def lag_summary(lags: List[float]) -> Dict[str, Any]:
+    """p50/p95/max of lags in seconds."""
+    if not lags:
+        return {"patients": 0}
+    quantiles = statistics.quantiles(lags * 2 if len(lags) < 2 else lags, n=100, method="inclusive")
+    return {"patients": len(lags), "p50_s": quantiles[49], "p95_s": quantiles[94], "max_s": max(lags)}
+
+
+def drive(ingester: QueueIngester, source: FeedSource, interval: float, seconds: float) -> Dict[str, Any]:
+    cycles, lags = [], []
+    failures = 0
+    seen = set()
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        cycle_started = time.perf_counter()
+        try:
+            ingester.ingest_once()
+        except Exception:
+            failures += 1
+        else:
+            cycles.append(time.perf_counter() - cycle_started)
+            published_at = time.time()
+            for anon_id in ingester.snapshot.store.anon_ids:
+                if anon_id not in seen:
+                    seen.add(anon_id)
+                    arrived_at = source.first_seen(anon_id)
+                    if arrived_at is not None:
+                        lags.append(max(published_at - arrived_at, 0.0))
+        time.sleep(max(interval - (time.perf_counter() - cycle_started), 0))
+    elapsed = time.perf_counter() - started
+
+    stats = ingester.stats
+    return {
+        "cycles": latency_summary(cycles, elapsed),
+        "failures": failures,
+        "rows_changed": stats.total_rows_changed,
+        "rows_changed_per_s": stats.total_rows_changed / elapsed,
+        "patients_in_feed": len(source.queue().get("patients", [])),
+        "freshness_lag": lag_summary(lags),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--speed", type=float, default=60.0)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--interval", type=float, default=1.0, help="wall clock seconds between ingest cycles")
+    parser.add_argument("--replay", help="JSON lines of {at, payload} to replay instead of simulating")
+    parser.add_argument("--arrivals-per-hour", type=float, default=12.0)
+    parser.add_argument("--beds", type=int, default=20)
+    parser.add_argument("--initial-patients", type=int, default=30)
+    parser.add_argument("--surge", type=Surge.parse, action="append", default=[], help="start:minutes:arrivals")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    clock = SimulationClock(args.speed)
+    if args.replay:
+        source: FeedSource = RecordedFeed(load_recording(args.replay), clock, loop=True)
+    else:
+        source = SimulatedED(clock, args.arrivals_per_hour, args.beds, tuple(args.surge), args.initial_patients)
+    server = make_server("127.0.0.1", 0, create_feed_app(source, clock), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/v1/queue"
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        ingester = QueueIngester(fetch=partial(fetch_queue_data, url), db_path=db_path, feed=ChangeFeed(), record_path=None)
+        results = drive(ingester, source, args.interval, args.seconds)
+    finally:
+        server.shutdown()
+        close_pool(db_path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+    write_report({
+        "benchmark": "ingest",
+        "source": "replay" if args.replay else "simulated",
+        "speed": args.speed,
+        "interval_s": args.interval,
+        "surges": [vars(surge) for surge in args.surge],
+        **results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+/listen first-audio and end-to-end latency against simulated upstreams.
+
+Compares the old strictly sequential path (transcribe, whole reply, one TTS
+call for all of it) with SpeechPipeline's sentence-by-sentence overlap. The
+fakes sleep for configurable upstream latencies, so no API keys are needed.
+
+    PYTHONPATH=src python benchmarks/bench_listen.py --sentences 6 --runs 5
+"""
+import argparse
+import json
+import statistics
+import time
+
+from genai.speech import SpeechPipeline, split_sentences
+
+SENTENCE = "Your results are being reviewed by the care team right now. "
+
+
+class FakeTranscriber:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def transcribe(self, audio, filename):
+        time.sleep(self.seconds)
+        return "how long until I see a doctor"
+
+
+class FakeReply:
+    """Streams sentences word by word at a fixed token rate."""
+
+    def __init__(self, sentences, first_token_seconds, token_seconds):
+        self.sentences = sentences
+        self.first_token_seconds = first_token_seconds
+        self.token_seconds = token_seconds
+
+    def __call__(self, transcript, patient_id):
+        time.sleep(self.first_token_seconds)
+        for word in (SENTENCE * self.sentences).split(" "):
+            time.sleep(self.token_seconds)
+            yield word + " "
+
+
+class FakeSynthesizer:
+    """Fixed request overhead plus a cost per character."""
+
+    def __init__(self, overhead_seconds, char_seconds):
+        self.overhead_seconds = overhead_seconds
+        self.char_seconds = char_seconds
+
+    def synthesize(self, text):
+        time.sleep(self.overhead_seconds + self.char_seconds * len(text))
+        return b"\xff\xfb" + text.encode()
+
+
+def run_sequential(transcriber, reply, synthesizer):
+    started = time.perf_counter()
+    transcript = transcriber.transcribe(b"", "speech.webm")
+    text = "".join(reply(transcript, None))
+    synthesizer.synthesize(text)
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+def run_pipelined(transcriber, reply, synthesizer):
+    pipeline = SpeechPipeline(transcriber, reply, synthesizer)
+    started = time.perf_counter()
+    first_audio = None
+    for event, _ in pipeline.run(b""):
+        if event == "audio" and first_audio is None:
+            first_audio = time.perf_counter() - started
+    return first_audio, time.perf_counter() - started
+
+
+def measure(run, runs, *fakes):
+    firsts, totals = zip(*(run(*fakes) for _ in range(runs)))
+    return {
+        "first_audio_ms": statistics.median(firsts) * 1e3,
+        "end_to_end_ms": statistics.median(totals) * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sentences", type=int, default=6)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--transcribe-ms", type=float, default=300)
+    parser.add_argument("--first-token-ms", type=float, default=400)
+    parser.add_argument("--token-ms", type=float, default=15)
+    parser.add_argument("--tts-overhead-ms", type=float, default=250)
+    parser.add_argument("--tts-char-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    fakes = (
+        FakeTranscriber(args.transcribe_ms / 1e3),
+        FakeReply(args.sentences, args.first_token_ms / 1e3, args.token_ms / 1e3),
+        FakeSynthesizer(args.tts_overhead_ms / 1e3, args.tts_char_ms / 1e3),
+    )
+    results = {
+        "sentences": len(list(split_sentences([SENTENCE * args.sentences]))),
+        "sequential": measure(run_sequential, args.runs, *fakes),
+        "pipelined": measure(run_pipelined, args.runs, *fakes),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
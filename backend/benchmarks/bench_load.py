@@ -0,0 +1,154 @@
+"""
+The Flask app under concurrent polling clients, over real HTTP.
+
+Serves a synthetic ED from the threaded development server and has
+--clients threads poll it for --seconds: mostly GET /patient/<id> (half
+of them revalidating with If-None-Match, like the frontend), plus paged
+/queue and batched /patients/status reads. Reports p50/p95/p99 latency
+and throughput per endpoint and overall.
+
+    PYTHONPATH=src python benchmarks/bench_load.py --patients 5000 --clients 16 --output load.json
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+from werkzeug.serving import make_server
+
+from core.logs import stop_logging
+from hospital_data.db import close_pool
+from hospital_data.sites import sites
+from hospital_data.snapshot import QueueSnapshot, publish_snapshot
+from report import latency_summary, write_report
+from synthetic_ed import build_database
+
+# share of requests per endpoint, roughly what patient phones and wall displays send
+MIX = [("patient", 0.8), ("queue", 0.1), ("batch", 0.1)]
+BATCH_SIZE = 50
+
+
+class Client:
+    def __init__(self, port: int, anon_ids: List[str], seed: int):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        self.anon_ids = anon_ids
+        self.rng = random.Random(seed)
+        self.etags: Dict[str, str] = {}
+
+    def request(self, endpoint: str) -> int:
+        headers = {}
+        body = None
+        method = "GET"
+        if endpoint == "patient":
+            anon_id = self.rng.choice(self.anon_ids)
+            path = f"/patient/{anon_id}"
+            if anon_id in self.etags and self.rng.random() < 0.5:
+                headers["If-None-Match"] = self.etags[anon_id]
+        elif endpoint == "queue":
+            path = f"/queue?page={self.rng.randint(1, 5)}&pageSize=50"
+        else:
+            method, path = "POST", "/patients/status"
+            body = json.dumps({"patientIds": self.rng.sample(self.anon_ids, min(BATCH_SIZE, len(self.anon_ids)))})
+            headers["Content-Type"] = "application/json"
+
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        response.read()
+        etag = response.getheader("ETag")
+        if endpoint == "patient" and etag:
+            self.etags[anon_id] = etag
+        return response.status
+
+
+def drive(port: int, anon_ids: List[str], clients: int, seconds: float) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients + 1)
+    endpoints, weights = zip(*MIX)
+
+    def worker(seed: int) -> None:
+        client = Client(port, anon_ids, seed)
+        local: Dict[str, List[float]] = defaultdict(list)
+        local_statuses: Counter = Counter()
+        barrier.wait()
+        stop_at = time.perf_counter() + seconds
+        while time.perf_counter() < stop_at:
+            endpoint = client.rng.choices(endpoints, weights)[0]
+            started = time.perf_counter()
+            local_statuses[client.request(endpoint)] += 1
+            local[endpoint].append(time.perf_counter() - started)
+        with lock:
+            for endpoint, values in local.items():
+                latencies[endpoint].extend(values)
+            statuses.update(local_statuses)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "overall": latency_summary([v for values in latencies.values() for v in values], elapsed),
+        "endpoints": {endpoint: latency_summary(values, elapsed) for endpoint, values in sorted(latencies.items())},
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    # create_app opens the site DBs, history and log under their relative default
+    # paths, so it runs in a scratch directory instead of the checkout
+    cwd = os.getcwd()
+    scratch = tempfile.TemporaryDirectory()
+    os.chdir(scratch.name)
+    from app import create_app
+    app = create_app(["status"])
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    server = None
+    try:
+        anon_ids = build_database(db_path, args.patients)
+        publish_snapshot(QueueSnapshot.load(db_path))
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        # anything the handlers print would end up in the middle of the report
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results = drive(server.server_port, anon_ids, args.clients, args.seconds)
+    finally:
+        if server is not None:
+            server.shutdown()
+        close_pool(db_path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        for site in sites.values():
+            close_pool(site.db_path)
+        stop_logging()
+        os.chdir(cwd)
+        scratch.cleanup()
+    write_report({"benchmark": "load", "patients": args.patients, "clients": args.clients, **results}, output)
+
+
+if __name__ == "__main__":
+    main()
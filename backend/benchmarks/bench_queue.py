@@ -0,0 +1,87 @@
+"""
+Micro-benchmarks of the queue read path over synthetic EDs of several sizes.
+
+Each size gets its own patient_data table; every function is called with
+random anon_ids for at least --seconds and reported as per-call
+p50/p95/p99 and calls per second.
+
+    PYTHONPATH=src python benchmarks/bench_queue.py --sizes 100 1000 10000 50000 --output queue.json
+"""
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+
+from typing import Callable, Dict, List
+
+from hospital_data.db import close_pool
+from hospital_data.expected_time import (
+    compute_expected_time_seconds,
+    get_patient_number_by_cat,
+    get_wait_times_by_cat,
+    longest_wait_time,
+)
+from hospital_data.hospital_api import get_all_patient_data
+from hospital_data.queue_data import get_queue_stats
+from hospital_data.snapshot import QueueSnapshot
+from report import latency_summary, write_report
+from synthetic_ed import build_database
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+
+
+def measure(call: Callable[[str], object], anon_ids: List[str], seconds: float, min_calls: int) -> Dict[str, float]:
+    rng = random.Random(0)
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < min_calls or time.perf_counter() - started < seconds:
+        anon_id = rng.choice(anon_ids)
+        call_started = time.perf_counter()
+        call(anon_id)
+        latencies.append(time.perf_counter() - call_started)
+    return latency_summary(latencies, sum(latencies))
+
+
+def bench_size(patients: int, seconds: float, min_calls: int) -> Dict[str, Dict[str, float]]:
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        anon_ids = build_database(db_path, patients)
+        snapshot = QueueSnapshot.load(db_path)
+        calls = {
+            "get_all_patient_data": lambda _: get_all_patient_data(db_path),
+            "snapshot_load": lambda _: QueueSnapshot.load(db_path),
+            "get_queue_stats": lambda anon_id: get_queue_stats(anon_id, snapshot),
+            "compute_expected_time_seconds": lambda anon_id: compute_expected_time_seconds(anon_id, snapshot),
+            "get_wait_times_by_cat": lambda _: get_wait_times_by_cat(snapshot),
+            "get_patient_number_by_cat": lambda _: get_patient_number_by_cat(snapshot),
+            "longest_wait_time": lambda _: longest_wait_time(snapshot),
+        }
+        return {name: measure(call, anon_ids, seconds, min_calls) for name, call in calls.items()}
+    finally:
+        close_pool(db_path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="patients per synthetic ED")
+    parser.add_argument("--seconds", type=float, default=1.0, help="minimum time spent on each function")
+    parser.add_argument("--min-calls", type=int, default=20)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    results = {}
+    # anything the read path prints would end up in the middle of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for patients in args.sizes:
+            results[str(patients)] = bench_size(patients, args.seconds, args.min_calls)
+    write_report({"benchmark": "queue", "sizes": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Cold start time of the app per feature set.
+
+Each run is a fresh interpreter (in a scratch directory, so the DB, log and
+history it creates are thrown away) that imports app, calls create_app with
+one feature set and serves one GET /queue. Reports the median and best of
+--runs for the import, create_app and first request, the whole process, and
+which heavy SDKs ended up imported. With --top, also the slowest imports by
+cumulative time from the best run's -X importtime output.
+
+    PYTHONPATH=src python benchmarks/bench_startup.py --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from typing import Any, Dict, List
+
+from report import write_report
+
+FEATURE_SETS = {
+    "status": "status",
+    "status+docs": "status,docs",
+    "chat": "status,chat",
+    "voice": "status,voice",
+    "mail": "status,mail",
+    "all": "status,chat,voice,mail,docs",
+}
+
+HEAVY_MODULES = ("openai", "google.generativeai", "speech_recognition", "flask_mail", "flasgger")
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app(sys.argv[1].split(","))
+created = time.perf_counter()
+application.test_client().get("/queue")
+served = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "create_app_s": created - imported,
+    "first_request_s": served - created,
+    "heavy_modules": [m for m in sys.argv[2].split(",") if m in sys.modules],
+}))
+"""
+
+
+def slowest_imports(importtime: str, top: int) -> List[Dict[str, Any]]:
+    """The top modules by cumulative import time from -X importtime's stderr."""
+    found = []
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        found.append({"module": name.strip(), "cumulative_ms": int(cumulative) / 1000})
+    return sorted(found, key=lambda m: m["cumulative_ms"], reverse=True)[:top]
+
+
+def run_once(src: str, features: str) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ, PYTHONPATH=src, LOG_PATH=os.path.join(scratch, "app.log"))
+        # no credentials: startup must not need them
+        for key in ("OPENAI_API_KEY", "GEMINI_API_KEY"):
+            env.pop(key, None)
+        started = time.perf_counter()
+        child = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD, features, ",".join(HEAVY_MODULES)],
+            cwd=scratch, env=env, capture_output=True, text=True, check=True,
+        )
+        elapsed = time.perf_counter() - started
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    result["process_s"] = elapsed
+    result["importtime"] = child.stderr
+    return result
+
+
+def measure(src: str, features: str, runs: int, top: int) -> Dict[str, Any]:
+    results = [run_once(src, features) for _ in range(runs)]
+    best = min(results, key=lambda r: r["process_s"])
+    summary: Dict[str, Any] = {"features": features, "heavy_modules": best["heavy_modules"]}
+    for key in ("import_s", "create_app_s", "first_request_s", "process_s"):
+        values = [r[key] for r in results]
+        summary[key] = {"median": statistics.median(values), "min": min(values)}
+    if top:
+        summary["slowest_imports"] = slowest_imports(best["importtime"], top)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--features", nargs="+", choices=sorted(FEATURE_SETS), default=list(FEATURE_SETS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list per feature set, 0 for none")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    src = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+    results = {name: measure(src, FEATURE_SETS[name], args.runs, args.top) for name in args.features}
+    write_report({"benchmark": "startup", "runs": args.runs, "feature_sets": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare two benchmark reports, e.g. from before and after a change.
+
+Lists every latency percentile and throughput that moved by more than
+--threshold (default 10%) and exits with status 1 if any got worse.
+
+    python benchmarks/compare.py base.json head.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+
+from typing import Any, Dict, Iterator, Tuple
+
+
+def metrics(report: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in report.items():
+        if key == "environment":
+            continue
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from metrics(value, path)
+        elif isinstance(value, (int, float)) and (key.endswith("_us") or key == "throughput_per_s"):
+            yield path, float(value)
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> Tuple[list, list]:
+    before = dict(metrics(base))
+    regressions, improvements = [], []
+    for path, after in metrics(head):
+        if path not in before or not before[path]:
+            continue
+        change = (after - before[path]) / before[path]
+        # latencies should go down, throughput up
+        worse = change > threshold if path.endswith("_us") else change < -threshold
+        better = change < -threshold if path.endswith("_us") else change > threshold
+        if worse:
+            regressions.append((path, before[path], after, change))
+        elif better:
+            improvements.append((path, before[path], after, change))
+    return regressions, improvements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    print(f"{base['environment'].get('commit')} -> {head['environment'].get('commit')}")
+
+    regressions, improvements = compare(base, head, args.threshold)
+    for title, rows in (("regressions", regressions), ("improvements", improvements)):
+        print(f"{title}: {len(rows)}")
+        for path, before, after, change in rows:
+            print(f"  {path}: {before:.1f} -> {after:.1f} ({change:+.0%})")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
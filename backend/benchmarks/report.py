@@ -0,0 +1,51 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from typing import Any, Dict, List, Optional
+
+
+def latency_summary(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Call count, throughput and p50/p95/p99 in microseconds of latencies (seconds)."""
+    latencies = sorted(latencies)
+    if len(latencies) < 2:
+        latencies = latencies * 2 or [0.0, 0.0]
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "calls": len(latencies),
+        "throughput_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_us": quantiles[49] * 1e6,
+        "p95_us": quantiles[94] * 1e6,
+        "p99_us": quantiles[98] * 1e6,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """Where the numbers came from, so runs from different commits can be lined up."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def write_report(results: Dict[str, Any], output: Optional[str]) -> None:
+    """JSON to output, or stdout when it is None or "-"."""
+    report = json.dumps({"environment": environment(), **results}, indent=2)
+    if output in (None, "-"):
+        sys.stdout.write(report + "\n")
+        return
+    with open(output, "w") as f:
+        f.write(report + "\n")
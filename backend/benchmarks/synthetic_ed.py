@@ -0,0 +1,59 @@
+import random
+import sqlite3
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from hospital_data.create_db import create_patient_table, parse_patient_row, upsert_patient_rows
+
+PHASES = [
+    "registered",
+    "triaged",
+    "investigations_pending",
+    "treatment",
+    "decision_pending",
+    "discharge_pending",
+    "admitted",
+    "discharged",
+]
+INVESTIGATION_STATES = ["NA", "pending", "ordered", "reported"]
+# rough CTAS mix of an urban ED, most patients are category 3 to 5
+TRIAGE_WEIGHTS = [0.02, 0.13, 0.35, 0.30, 0.20]
+
+
+def generate_patients(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Feed-shaped patients, the same JSON the IFEM queue endpoint returns."""
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 25, 22, 0, 0)
+    local_positions = {category: 0 for category in range(1, 6)}
+    patients = []
+    for index in range(count):
+        category = rng.choices(range(1, 6), TRIAGE_WEIGHTS)[0]
+        local_positions[category] += 1
+        elapsed = int(rng.expovariate(1 / (40 * category)))
+        patients.append({
+            "id": f"anon_{index}",
+            "arrival_time": (now - timedelta(minutes=elapsed)).isoformat(),
+            "triage_category": category,
+            "queue_position": {"global": index + 1, "category": local_positions[category]},
+            "status": {
+                "current_phase": rng.choice(PHASES),
+                "investigations": {
+                    "labs": rng.choice(INVESTIGATION_STATES),
+                    "imaging": rng.choice(INVESTIGATION_STATES),
+                },
+            },
+            "time_elapsed": elapsed,
+        })
+    return patients
+
+
+def build_database(db_path: str, count: int, seed: int = 0) -> List[str]:
+    """Write a synthetic patient_data table and return its anon_ids."""
+    patients = generate_patients(count, seed)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        create_patient_table(conn.cursor())
+        upsert_patient_rows(conn.cursor(), (parse_patient_row(p) for p in patients))
+    conn.close()
+    return [p["id"] for p in patients]
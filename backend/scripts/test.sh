@@ -1 +1,3 @@
-poetry run python -m unittest discover src/hospital_data/tests/
\ No newline at end of file
+for tests in src/*/tests/; do
+    PYTHONPATH=src poetry run python -m unittest discover "$tests" || exit 1
+done
@@ -1,15 +1,73 @@
 from dotenv import load_dotenv
+import json
 import os
 
 load_dotenv()
 
-CURRENT_HOSPITAL_STATE_URL = "https://ifem-award-mchacks-2025.onrender.com/api/v1/stats/current"
-SPECIFIC_PATIENT_INFO_URL = "https://ifem-award-mchacks-2025.onrender.com/api/v1/patient/%s"
-QUEUE_DATA_URL = "https://ifem-award-mchacks-2025.onrender.com/api/v1/queue"
+# e.g. http://127.0.0.1:5050 for the local simulator (python -m hospital_data.simulator)
+IFEM_BASE_URL = os.getenv("IFEM_BASE_URL", "https://ifem-award-mchacks-2025.onrender.com")
+CURRENT_HOSPITAL_STATE_URL = IFEM_BASE_URL + "/api/v1/stats/current"
+SPECIFIC_PATIENT_INFO_URL = IFEM_BASE_URL + "/api/v1/patient/%s"
+QUEUE_DATA_URL = IFEM_BASE_URL + "/api/v1/queue"
 ELEVENLABS_API_URL = "https://api.elevenlabs.io/v1/text-to-speech/generate"
 
 BACKEND_PORT = 5000
+# route groups create_app serves: status, chat, voice, mail and docs (the Swagger UI)
+APP_FEATURES = tuple(os.getenv("APP_FEATURES", "status,chat,voice,mail,docs").split(","))
 DB_PATH = "db/hospital_data.db"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 8))
+INGEST_INTERVAL_SECONDS = float(os.getenv("INGEST_INTERVAL_SECONDS", 30))
+# sites whose feeds are fetched at the same time
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 4))
+# phases in which a patient holds a queue position; the ingester ranks them by category then arrival
+QUEUE_PHASES = tuple(os.getenv("QUEUE_PHASES", "triaged,investigations_pending").split(","))
+# the site served when a request names none; it keeps QUEUE_DATA_URL, DB_PATH and HISTORY_DIR
+DEFAULT_SITE = os.getenv("DEFAULT_SITE", "main")
+# further sites as JSON, {"name": {"queue_url": ..., "db_path": ..., "history_dir": ...}};
+# the paths are optional and default to SITES_DIR/<name>.db and SITES_DIR/<name>/history
+SITES = json.loads(os.getenv("SITES", "{}"))
+SITES_DIR = os.getenv("SITES_DIR", "db/sites")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 4096))
+ESTIMATOR_ALPHA = float(os.getenv("ESTIMATOR_ALPHA", 0.3))
+# half-width of the expected time band in standard deviations (~80%)
+ESTIMATOR_BAND_Z = 1.28
+INGEST_RECORD_PATH = os.getenv("INGEST_RECORD_PATH")
+HISTORY_DIR = os.getenv("HISTORY_DIR", "db/history")
+# days each resolution of the queue history is kept, None keeps it forever
+HISTORY_RETENTION_DAYS = {"raw": 7, "minute": 30, "hour": 365, "day": None, "transitions": 90}
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", 1024))
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", 3600))
+# estimated tokens of past exchanges resent each turn; older ones are folded into a summary of their questions
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", 1500))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", 200))
+# characters all chat sessions may hold together, least recently used are dropped first
+CHAT_SESSIONS_MAX_CHARS = int(os.getenv("CHAT_SESSIONS_MAX_CHARS", 32_000_000))
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", 4 * 3600))
+SPEECH_TTS_WORKERS = int(os.getenv("SPEECH_TTS_WORKERS", 4))
+# provider: (max concurrent calls, per call timeout in seconds)
+OUTBOUND_LIMITS = {
+    "gemini": (8, 30.0),
+    "openai": (8, 30.0),
+    "elevenlabs": (4, 20.0),
+    "ifem": (INGEST_WORKERS, 10.0),
+}
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", 45))
+LISTEN_DEADLINE_SECONDS = float(os.getenv("LISTEN_DEADLINE_SECONDS", 60))
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", "cache/audio")
+AUDIO_CACHE_MEMORY_BYTES = int(os.getenv("AUDIO_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+AUDIO_CACHE_DISK_BYTES = int(os.getenv("AUDIO_CACHE_DISK_BYTES", 512 * 1024 * 1024))
+LOG_PATH = os.getenv("LOG_PATH", "app.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# level per subsystem (logger name prefix), on top of LOG_LEVEL
+LOG_LEVELS = {"werkzeug": "WARNING"}
+# share of records below WARNING kept per subsystem, the rest are dropped before they are queued
+LOG_SAMPLING = {"hospital_data.ingest": 0.1}
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", 5))
+# per request profiling is off unless a token is set; send it in PROFILE_HEADER
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_HEADER = "X-Profile"
+PROFILE_KEEP = 32
 
 MAIL_USE_TLS=True
 MAIL_USE_SSL=False
@@ -17,6 +75,12 @@ MAIL_SERVER="smtp.gmail.com"
 MAIL_PORT=587
 MAIL_USERNAME = os.getenv('MAIL_USERNAME')
 MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
+MAIL_BATCH_SIZE = 20
+# distinct recipients one POST /email may queue
+MAIL_MAX_RECIPIENTS = 10
+MAIL_MAX_ATTEMPTS = 3
+MAIL_RETRY_SECONDS = 2.0
+MAIL_IDLE_SECONDS = 30.0
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded mapping that evicts the least recently used entry.
+
+    With a ttl, entries also expire that many seconds after they were set and
+    an expired lookup counts as a miss. With a weight function, maxsize bounds
+    the total weight (e.g. bytes) instead of the number of entries.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        weight: Optional[Callable[[Any], int]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._clock = clock
+        self._weight = weight or (lambda value: 1)
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= self._clock():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = None if self.ttl is None else self._clock() + self.ttl
+        weight = self._weight(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if weight > self.maxsize:
+                return
+            self._data[key] = (expires_at, value)
+            self.size += weight
+            while self.size > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def _remove(self, key: Hashable) -> Any:
+        _, value = self._data.pop(key)
+        self.size -= self._weight(value)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,124 @@
+import contextvars
+import logging
+import threading
+import time
+import uuid
+
+from typing import Optional
+
+from flask import Flask, g, request
+
+from config import PROFILE_HEADER, PROFILE_KEEP, PROFILE_TOKEN
+from core.cache import LRUCache
+from core.logs import request_id
+from core.metrics import COUNT_BUCKETS, counter, histogram
+from core.profiler import SamplingProfiler
+
+# one structured record per request, sample it with LOG_SAMPLING["http"]
+access_log = logging.getLogger("http")
+
+queries_total = counter("sqlite_queries_total", "SQLite statements executed")
+rows_total = counter("sqlite_rows_loaded_total", "Rows read back from SQLite")
+
+
+class RequestStats:
+    __slots__ = ("queries", "rows")
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+
+_request_stats: "contextvars.ContextVar[Optional[RequestStats]]" = contextvars.ContextVar("request_stats", default=None)
+
+
+def count_query() -> None:
+    queries_total.inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+
+
+def count_rows(rows: int) -> None:
+    rows_total.inc(rows)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.rows += rows
+
+
+# finished profiles by id, folded stacks
+profiles = LRUCache(PROFILE_KEEP)
+
+
+def profiling_allowed() -> bool:
+    """Profiles are opt in: PROFILE_TOKEN must be set and sent back in the PROFILE_HEADER header."""
+    return bool(PROFILE_TOKEN) and request.headers.get(PROFILE_HEADER) == PROFILE_TOKEN
+
+
+def instrument(app: Flask) -> None:
+    """
+    Times every request into per route histograms and counts the SQLite
+    queries and rows it caused, then logs one access record with those
+    numbers under the request id (X-Request-ID, taken from the request or
+    generated). A request carrying the profile header is also sampled by a
+    SamplingProfiler; its id comes back in X-Profile-Id.
+    """
+
+    @app.before_request
+    def start_request():
+        g.instrument_started = time.perf_counter()
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+        g.request_id_token = request_id.set(g.request_id)
+        g.instrument_stats = RequestStats()
+        g.instrument_token = _request_stats.set(g.instrument_stats)
+        g.instrument_status = 500
+        g.instrument_profiler = None
+        if profiling_allowed():
+            g.instrument_profile_id = uuid.uuid4().hex
+            g.instrument_profiler = SamplingProfiler(threading.get_ident()).start()
+
+    @app.after_request
+    def record_status(response):
+        g.instrument_status = response.status_code
+        response.headers["X-Request-ID"] = g.request_id
+        if g.get("instrument_profiler") is not None:
+            response.headers["X-Profile-Id"] = g.instrument_profile_id
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        # stream_with_context pushes the request again, so a streamed response is torn down twice
+        started = g.pop("instrument_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        histogram(
+            "http_request_duration_seconds",
+            "Time to build each response, until its headers (streamed bodies keep going)",
+            {"method": request.method, "route": route, "status": g.instrument_status},
+        ).observe(elapsed)
+        stats = g.instrument_stats
+        histogram("http_request_sqlite_queries", "SQLite statements per request", {"route": route}, COUNT_BUCKETS).observe(stats.queries)
+        histogram("http_request_sqlite_rows", "SQLite rows loaded per request", {"route": route}, COUNT_BUCKETS).observe(stats.rows)
+        access_log.info(
+            f"{request.method} {route} {g.instrument_status} in {elapsed * 1000:.1f}ms",
+            extra={
+                "method": request.method,
+                "route": route,
+                "status": g.instrument_status,
+                "duration_ms": round(elapsed * 1000, 3),
+                "queries": stats.queries,
+                "rows": stats.rows,
+            },
+        )
+        for var, token in ((_request_stats, g.instrument_token), (request_id, g.request_id_token)):
+            try:
+                var.reset(token)
+            except ValueError:
+                var.set(None)  # torn down from another context
+        profiler = g.get("instrument_profiler")
+        if profiler is not None:
+            profiler.stop()
+            header = f"# {request.method} {request.full_path} {elapsed * 1000:.1f}ms, {profiler.samples} samples\n"
+            profiles.set(g.instrument_profile_id, header + profiler.folded())
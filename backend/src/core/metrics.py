@@ -0,0 +1,214 @@
+import bisect
+import math
+import threading
+
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+Number = Union[int, float]
+Labels = Tuple[Tuple[str, str], ...]
+
+# upper bounds in seconds, from a cached lookup to a slow model call
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# upper bounds for small per request counts, e.g. queries or rows
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 50, 100, 1000, 10000, 100000)
+
+
+class Counter:
+    """A monotonically increasing, thread-safe value."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str = "", labels: Labels = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.value: Number = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: Number = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self) -> List[Tuple[str, Labels, Number]]:
+        return [(self.name, self.labels, self.value)]
+
+
+class Summary:
+    """Count and running total of observed values, e.g. latencies in seconds."""
+
+    kind = "summary"
+
+    def __init__(self, name: str, description: str = "", labels: Labels = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.count = 0
+        self.sum: float = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.sum += value
+
+    @property
+    def average(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def samples(self) -> List[Tuple[str, Labels, Number]]:
+        return [(self.name + "_count", self.labels, self.count), (self.name + "_sum", self.labels, self.sum)]
+
+
+class Histogram(Summary):
+    """A Summary that also counts observations into fixed buckets, for percentiles over time."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str = "", labels: Labels = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # the last slot counts values above every bound
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self.counts[index] += 1
+
+    def samples(self) -> List[Tuple[str, Labels, Number]]:
+        with self._lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == math.inf else format(bound, "g")
+            samples.append((self.name + "_bucket", self.labels + (("le", le),), cumulative))
+        samples.append((self.name + "_count", self.labels, count))
+        samples.append((self.name + "_sum", self.labels, total))
+        return samples
+
+
+class Gauge:
+    """A value read when the metrics are collected, e.g. a cache's current hit ratio."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str = "", labels: Labels = (), read: Callable[[], Number] = lambda: 0):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.read = read
+
+    @property
+    def value(self) -> Number:
+        return self.read()
+
+    def samples(self) -> List[Tuple[str, Labels, Number]]:
+        return [(self.name, self.labels, self.read())]
+
+
+Metric = Union[Counter, Summary, Histogram, Gauge]
+
+_metrics: Dict[Tuple[str, Labels], Metric] = {}
+_metrics_lock = threading.Lock()
+
+
+def _labels(labels: Optional[Mapping[str, str]]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in (labels or {}).items()))
+
+
+def _register(cls, name: str, description: str, labels: Optional[Mapping[str, str]], **kwargs):
+    key = (name, _labels(labels))
+    with _metrics_lock:
+        found = _metrics.get(key)
+        if found is None:
+            for (other, _), metric in _metrics.items():
+                if other == name and type(metric) is not cls:
+                    raise ValueError(f"metric {name} is already a {type(metric).__name__}")
+            found = _metrics[key] = cls(name, description, key[1], **kwargs)
+        elif type(found) is not cls:
+            raise ValueError(f"metric {name} is already a {type(found).__name__}")
+        return found
+
+
+def counter(name: str, description: str = "", labels: Optional[Mapping[str, str]] = None) -> Counter:
+    """The process-wide counter called name (with these labels), created on first use."""
+    return _register(Counter, name, description, labels)
+
+
+def summary(name: str, description: str = "", labels: Optional[Mapping[str, str]] = None) -> Summary:
+    """The process-wide summary called name (with these labels), created on first use."""
+    return _register(Summary, name, description, labels)
+
+
+def histogram(
+    name: str,
+    description: str = "",
+    labels: Optional[Mapping[str, str]] = None,
+    buckets: Sequence[float] = LATENCY_BUCKETS,
+) -> Histogram:
+    """The process-wide histogram called name (with these labels), created on first use."""
+    return _register(Histogram, name, description, labels, buckets=buckets)
+
+
+def gauge(name: str, read: Callable[[], Number], description: str = "", labels: Optional[Mapping[str, str]] = None) -> Gauge:
+    """Registers read as the gauge called name; a later registration replaces the function."""
+    found = _register(Gauge, name, description, labels)
+    found.read = read
+    return found
+
+
+def hit_ratio(hits: Number, misses: Number) -> float:
+    lookups = hits + misses
+    return hits / lookups if lookups else 0.0
+
+
+def cache_hit_ratio(cache: str, read: Callable[[], float]) -> Gauge:
+    """The cache_hit_ratio gauge of one cache, labelled with its name."""
+    return gauge("cache_hit_ratio", read, "Share of lookups answered from the cache", {"cache": cache})
+
+
+def counter_values() -> Dict[str, Number]:
+    with _metrics_lock:
+        return {name: m.value for (name, labels), m in _metrics.items() if isinstance(m, Counter) and not labels}
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value: Number) -> str:
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    with _metrics_lock:
+        metrics = sorted(_metrics.items())
+    lines = []
+    described = set()
+    for (name, _), metric in metrics:
+        if name not in described:
+            described.add(name)
+            if metric.description:
+                lines.append(f"# HELP {name} {metric.description}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+        for sample, labels, value in metric.samples():
+            lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
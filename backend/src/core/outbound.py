@@ -0,0 +1,203 @@
+import contextvars
+import math
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple, Type
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import OUTBOUND_LIMITS
+from core.metrics import Histogram, counter, histogram
+
+# weight of the newest call in the running average used for Retry-After
+DURATION_SMOOTHING = 0.2
+
+
+class Saturated(Exception):
+    """Every slot for a provider is busy; the caller should back off for retry_after seconds."""
+
+    def __init__(self, provider: str, retry_after: int):
+        super().__init__(f"{provider} is at its concurrency limit")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class UpstreamTimeout(TimeoutError):
+    def __init__(self, provider: str):
+        super().__init__(f"{provider} did not answer in time")
+        self.provider = provider
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+
+_deadline: "contextvars.ContextVar[Optional[Deadline]]" = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[Deadline]:
+    """
+    Bounds every outbound call made inside the block, including from threads
+    started with a copy of this context. Nested scopes can only tighten it.
+    """
+    deadline = Deadline(seconds)
+    outer = _deadline.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+class Provider:
+    """
+    Admission control for calls to one upstream service.
+
+    At most concurrency calls run at once; a call that finds every slot
+    taken fails straight away with Saturated instead of queueing behind a
+    slow upstream, so the workers it would have blocked stay free for cheap
+    requests. Each call gets the provider timeout, cut short by the current
+    deadline, to pass to its client library, and errors listed in
+    timeout_errors are reported as UpstreamTimeout.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        timeout: float,
+        timeout_errors: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.default_timeout = timeout
+        self.timeout_errors = (TimeoutError,) + tuple(timeout_errors)
+        self.in_flight = 0
+        self.average_seconds = 0.0
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+
+        labels = {"provider": name}
+        self.calls = counter("outbound_calls_total", "Calls made to an upstream provider", labels)
+        self.rejected = counter("outbound_rejected_total", "Upstream calls rejected at the provider's concurrency limit", labels)
+        self.timeouts = counter("outbound_timeouts_total", "Upstream calls that ran past their timeout", labels)
+        self._latency: Dict[str, Histogram] = {}
+
+    @property
+    def retry_after(self) -> int:
+        """Whole seconds until a slot is likely to free up, at least one."""
+        return max(1, math.ceil(self.average_seconds))
+
+    def timeout(self) -> float:
+        deadline = current_deadline()
+        if deadline is None:
+            return self.default_timeout
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            self.timeouts.inc()
+            raise UpstreamTimeout(self.name)
+        return min(self.default_timeout, remaining)
+
+    def check(self) -> None:
+        """Raise Saturated now if a call would be rejected, e.g. before starting a streamed response."""
+        if self.in_flight >= self.concurrency:
+            self.rejected.inc()
+            raise Saturated(self.name, self.retry_after)
+
+    def latency(self, operation: str) -> Histogram:
+        found = self._latency.get(operation)
+        if found is None:
+            found = self._latency[operation] = call_seconds(self.name, operation)
+        return found
+
+    @contextmanager
+    def slot(self, operation: str = "call") -> Iterator[float]:
+        """
+        Holds one slot for the block and yields the timeout to give the client.
+        The time spent in the block is recorded under (provider, operation).
+        """
+        timeout = self.timeout()
+        if not self._slots.acquire(blocking=False):
+            self.rejected.inc()
+            raise Saturated(self.name, self.retry_after)
+        with self._lock:
+            self.in_flight += 1
+        self.calls.inc()
+        started = time.monotonic()
+        try:
+            yield timeout
+        except self.timeout_errors as e:
+            self.timeouts.inc()
+            raise UpstreamTimeout(self.name) from e
+        finally:
+            elapsed = time.monotonic() - started
+            self.latency(operation).observe(elapsed)
+            with self._lock:
+                self.in_flight -= 1
+                self.average_seconds += DURATION_SMOOTHING * (elapsed - self.average_seconds)
+            self._slots.release()
+
+    @property
+    def session(self) -> requests.Session:
+        """A keep-alive HTTP session with a connection pool sized to the concurrency limit."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "timeoutSeconds": self.default_timeout,
+            "inFlight": self.in_flight,
+            "calls": self.calls.value,
+            "rejected": self.rejected.value,
+            "timeouts": self.timeouts.value,
+            "averageSeconds": self.average_seconds,
+        }
+
+
+def call_seconds(provider: str, operation: str) -> Histogram:
+    """Latency of calls to one upstream operation, also used for calls not bounded by a Provider."""
+    return histogram("outbound_call_seconds", "Upstream call latency", {"provider": provider, "operation": operation})
+
+
+_providers: Dict[str, Provider] = {}
+_providers_lock = threading.Lock()
+
+
+def outbound(name: str, timeout_errors: Tuple[Type[BaseException], ...] = ()) -> Provider:
+    """The process-wide Provider for name, limits taken from OUTBOUND_LIMITS."""
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            concurrency, timeout = OUTBOUND_LIMITS[name]
+            provider = _providers[name] = Provider(name, concurrency, timeout, timeout_errors)
+        elif timeout_errors:
+            provider.timeout_errors = tuple(set(provider.timeout_errors) | set(timeout_errors))
+        return provider
+
+
+def outbound_stats() -> Dict[str, Dict[str, Any]]:
+    with _providers_lock:
+        return {name: provider.stats() for name, provider in _providers.items()}
@@ -0,0 +1,65 @@
+from flask import Blueprint, Response, jsonify
+
+from core.instrumentation import profiles, profiling_allowed
+from core.metrics import render_prometheus
+from core.outbound import outbound_stats
+
+# served whichever features are on
+blueprint = Blueprint("ops", __name__)
+
+
+@blueprint.route("/")
+def index():
+    return "Hello world!"
+
+
+@blueprint.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Metrics in the Prometheus text format
+    ---
+    responses:
+      200:
+        description: Route latency histograms, SQLite queries and rows per request, ingest cycle time, upstream call latency and cache hit ratios
+    """
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@blueprint.route("/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id: str):
+    """
+    Sampled stack profile of one earlier request
+    ---
+    parameters:
+      - name: profile_id
+        in: path
+        type: string
+        required: true
+        description: The X-Profile-Id returned by a request sent with the X-Profile header
+      - name: X-Profile
+        in: header
+        type: string
+        required: true
+        description: The PROFILE_TOKEN configured on the server
+    responses:
+      200:
+        description: Folded stacks ("frame;frame;frame count" per line), ready for flamegraph.pl or speedscope
+      404:
+        description: Profiling is off, the token is wrong or the profile has been evicted
+    """
+    folded = profiles.get(profile_id) if profiling_allowed() else None
+    if folded is None:
+        return jsonify({"error": f"no such profile {profile_id}"}), 404
+    return Response(folded, mimetype="text/plain")
+
+
+@blueprint.route("/outbound/stats", methods=["GET"])
+def get_outbound_stats():
+    """
+    Outbound call limits and usage per upstream provider
+    ---
+    responses:
+      200:
+        description: Concurrency limit, in-flight calls, rejections and timeouts for each provider
+    """
+    return jsonify(outbound_stats())
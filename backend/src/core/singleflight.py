@@ -0,0 +1,67 @@
+import threading
+
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+from core.metrics import counter
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one.
+
+    The first caller for a key runs the function. Callers that arrive while
+    it is still running wait for it and get the same result, or the same
+    exception. Nothing is kept after the call returns, so this is not a
+    cache: it sits on a cache's miss path, where it stops a burst of
+    identical misses from all doing the work. singleflight_calls_total and
+    singleflight_collapsed_total count both kinds of caller per group.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = counter("singleflight_calls_total", "Calls that ran because no identical call was in flight", {"group": group})
+        self.collapsed = counter(
+            "singleflight_collapsed_total", "Calls that shared the result of an identical call in flight", {"group": group}
+        )
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            self.collapsed.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self.calls.inc()
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from app import create_app
+
+SRC = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# runs in a scratch directory so the DB, log and history it creates are thrown away
+STATUS_ONLY = """
+import json, sys
+import app
+client = app.create_app(["status"]).test_client()
+print(json.dumps({
+    "queue": client.get("/queue").status_code,
+    "chat": client.post("/chat/stream", json={"message": "hi"}).status_code,
+    "metrics": client.get("/metrics").status_code,
+    "modules": [m for m in ("openai", "google.generativeai", "speech_recognition", "flask_mail", "flasgger") if m in sys.modules],
+}))
+"""
+
+
+class TestCreateApp(unittest.TestCase):
+
+    def test_status_only_app_serves_an_empty_queue_without_loading_the_sdks(self):
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ, PYTHONPATH=SRC, LOG_PATH=os.path.join(scratch, "app.log"))
+            env.pop("OPENAI_API_KEY", None)
+            child = subprocess.run(
+                [sys.executable, "-c", STATUS_ONLY], cwd=scratch, env=env, capture_output=True, text=True, timeout=60,
+            )
+        self.assertEqual(child.returncode, 0, child.stderr)
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        self.assertEqual((result["queue"], result["chat"], result["metrics"]), (200, 404, 200))
+        self.assertEqual(result["modules"], [])
+
+    def test_unknown_features_are_rejected(self):
+        with self.assertRaises(ValueError):
+            create_app(["status", "fax"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from core.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = LRUCache(2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        clock.now = 9.9
+        self.assertEqual(cache.get("a"), 1)
+        clock.now = 10
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(len(cache), 0)
+
+    def test_weight_bounds_total_size(self):
+        cache = LRUCache(10, weight=len)
+        cache.set("a", b"1234")
+        cache.set("b", b"123456")
+        cache.set("c", b"12")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.size, 8)
+        cache.set("huge", b"x" * 11)
+        self.assertIsNone(cache.get("huge"))
+        self.assertEqual(cache.get("b"), b"123456")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from flask import Flask
+
+from core.instrumentation import instrument, profiles
+from core.metrics import histogram
+from hospital_data.create_db import create_patient_table, upsert_patient_rows
+from hospital_data import routes
+from hospital_data.db import close_pool, get_pool
+from hospital_data.hospital_api import get_all_patient_data
+
+
+class TestInstrument(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        with get_pool(self.db_path).connection() as conn:
+            with conn:
+                create_patient_table(conn.cursor())
+                upsert_patient_rows(conn.cursor(), [
+                    ("anon_1", "2025-01-25T19:55:53", 1, 1, "triaged", "NA", "NA", 3, 40),
+                    ("anon_2", "2025-01-25T20:55:53", 2, 1, "triaged", "NA", "NA", 4, 20),
+                ])
+
+        self.app = Flask(__name__)
+        instrument(self.app)
+
+        @self.app.route("/instrumented/<name>")
+        def instrumented(name):
+            return {"patients": len(get_all_patient_data(self.db_path))}
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def test_requests_are_timed_per_route_with_their_queries_and_rows(self):
+        route = {"route": "/instrumented/<name>"}
+        latency = histogram("http_request_duration_seconds", labels=dict(route, method="GET", status=200))
+        queries = histogram("http_request_sqlite_queries", labels=route)
+        rows = histogram("http_request_sqlite_rows", labels=route)
+        before = (latency.count, queries.sum, rows.sum)
+
+        self.client.get("/instrumented/a")
+        self.client.get("/instrumented/b")
+
+        self.assertEqual(latency.count - before[0], 2)
+        self.assertEqual(queries.sum - before[1], 2)
+        self.assertEqual(rows.sum - before[2], 4)
+
+    def test_streamed_responses_are_finished_once(self):
+        self.app.register_blueprint(routes.blueprint)
+        latency = histogram(
+            "http_request_duration_seconds",
+            labels={"method": "GET", "route": "/patient/<patient_id>/events", "status": 200},
+        )
+        before = latency.count
+
+        response = self.client.get("/patient/anon_1/events", buffered=False)
+        self.assertTrue(next(iter(response.response)).startswith(b"retry:"))
+        response.close()
+
+        self.assertEqual(latency.count - before, 1)
+
+    def test_profile_only_with_the_token(self):
+        with mock.patch("core.instrumentation.PROFILE_TOKEN", "secret"):
+            self.assertNotIn("X-Profile-Id", self.client.get("/instrumented/a").headers)
+            self.assertNotIn("X-Profile-Id", self.client.get("/instrumented/a", headers={"X-Profile": "wrong"}).headers)
+            response = self.client.get("/instrumented/a", headers={"X-Profile": "secret"})
+
+        folded = profiles.get(response.headers["X-Profile-Id"])
+        self.assertTrue(folded.startswith("# GET /instrumented/a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import logging
+import os
+import random
+import tempfile
+import unittest
+
+from core.logs import JsonFormatter, SamplingFilter, configure_logging, request_id, stop_logging
+
+
+def record(name="app", level=logging.INFO, msg="hello", **extra):
+    entry = logging.LogRecord(name, level, __file__, 1, msg, (), None)
+    entry.__dict__.update(extra)
+    return entry
+
+
+class TestLogs(unittest.TestCase):
+
+    def test_json_lines_carry_extra_fields(self):
+        line = json.loads(JsonFormatter().format(record(request_id="abc", patient_id="anon_1", rows=3)))
+        self.assertEqual(line["message"], "hello")
+        self.assertEqual(line["request_id"], "abc")
+        self.assertEqual((line["patient_id"], line["rows"]), ("anon_1", 3))
+        self.assertNotIn("args", line)
+
+    def test_sampling_is_per_subsystem_and_spares_warnings(self):
+        sampler = SamplingFilter({"hospital_data": 0.0, "hospital_data.ingest": 1.0}, random.Random(0))
+        self.assertFalse(sampler.filter(record("hospital_data.snapshot")))
+        self.assertTrue(sampler.filter(record("hospital_data.ingest")))
+        self.assertTrue(sampler.filter(record("hospital_data.snapshot", logging.WARNING)))
+        self.assertTrue(sampler.filter(record("genai.gpt")))
+
+    def test_queue_writes_rotated_json_off_thread(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "app.log")
+        root = logging.getLogger()
+        previous = root.handlers[:], root.level
+        try:
+            listener = configure_logging(path, "INFO", {}, {"quiet": 0.0}, max_bytes=2000, backups=2, console=False)
+            token = request_id.set("req-1")
+            for i in range(50):
+                logging.getLogger("loud").info(f"record {i}", extra={"index": i})
+                logging.getLogger("quiet").info("dropped")
+            request_id.reset(token)
+            stop_logging()
+            # the log file is closed with the writer, not left for the garbage collector
+            self.assertIsNone(listener.handlers[0].stream)
+
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertTrue(os.path.exists(path + ".1"))
+            self.assertEqual(lines[-1]["index"], 49)
+            self.assertEqual(lines[-1]["request_id"], "req-1")
+            self.assertNotIn("quiet", {line["logger"] for line in lines})
+        finally:
+            stop_logging()
+            root.handlers[:], level = previous
+            root.setLevel(level)
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import time
+import unittest
+
+from core.metrics import COUNT_BUCKETS, counter, gauge, histogram, render_prometheus
+from core.profiler import SamplingProfiler
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram_buckets_are_cumulative_in_the_exposition(self):
+        latency = histogram("test_histogram_seconds", "Test latency", {"route": "/a"}, buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            latency.observe(value)
+
+        text = render_prometheus()
+        self.assertIn("# TYPE test_histogram_seconds histogram", text)
+        self.assertIn('test_histogram_seconds_bucket{route="/a",le="0.1"} 1', text)
+        self.assertIn('test_histogram_seconds_bucket{route="/a",le="1"} 3', text)
+        self.assertIn('test_histogram_seconds_bucket{route="/a",le="+Inf"} 4', text)
+        self.assertIn('test_histogram_seconds_count{route="/a"} 4', text)
+
+    def test_labels_share_one_header_and_kinds_cannot_mix(self):
+        counter("test_labelled_total", "Test", {"cache": "a"}).inc()
+        counter("test_labelled_total", "Test", {"cache": "b"}).inc(2)
+        self.assertIs(counter("test_labelled_total", labels={"cache": "a"}), counter("test_labelled_total", labels={"cache": "a"}))
+
+        text = render_prometheus()
+        self.assertEqual(text.count("# TYPE test_labelled_total counter"), 1)
+        self.assertIn('test_labelled_total{cache="b"} 2', text)
+        with self.assertRaises(ValueError):
+            histogram("test_labelled_total", buckets=COUNT_BUCKETS)
+
+    def test_gauge_is_read_at_collection(self):
+        value = [1]
+        gauge("test_gauge", lambda: value[0], "Test gauge")
+        value[0] = 7
+        self.assertIn("test_gauge 7", render_prometheus())
+
+
+class TestSamplingProfiler(unittest.TestCase):
+
+    def test_samples_the_profiled_thread(self):
+        def busy_wait():
+            until = time.perf_counter() + 0.1
+            while time.perf_counter() < until:
+                pass
+
+        profiler = SamplingProfiler(interval=0.002).start()
+        busy_wait()
+        profiler.stop()
+
+        self.assertGreater(profiler.samples, 0)
+        self.assertIn("busy_wait", profiler.folded())
+        stack, count = profiler.folded().splitlines()[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import threading
+import time
+import unittest
+
+from core.metrics import counter
+from core.outbound import Provider, Saturated, UpstreamTimeout, deadline_scope
+
+
+class SlowClientTimeout(Exception):
+    pass
+
+
+class TestProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = Provider(self._testMethodName, concurrency=2, timeout=5.0, timeout_errors=(SlowClientTimeout,))
+
+    def test_rejects_fast_once_every_slot_is_taken(self):
+        release = threading.Event()
+        holding = threading.Barrier(3)
+
+        def hold():
+            with self.provider.slot():
+                holding.wait()
+                release.wait()
+
+        threads = [threading.Thread(target=hold) for _ in range(2)]
+        for t in threads:
+            t.start()
+        holding.wait()
+
+        started = time.monotonic()
+        with self.assertRaises(Saturated) as caught:
+            with self.provider.slot():
+                pass
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertGreaterEqual(caught.exception.retry_after, 1)
+        with self.assertRaises(Saturated):
+            self.provider.check()
+
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.provider.in_flight, 0)
+        with self.provider.slot():
+            pass
+        self.assertEqual(self.provider.rejected.value, 2)
+
+    def test_deadline_shortens_the_timeout(self):
+        with self.provider.slot() as timeout:
+            self.assertEqual(timeout, 5.0)
+        with deadline_scope(1.0):
+            with deadline_scope(30.0):
+                with self.provider.slot() as timeout:
+                    self.assertLessEqual(timeout, 1.0)
+
+    def test_expired_deadline_fails_before_calling(self):
+        with deadline_scope(0):
+            with self.assertRaises(UpstreamTimeout):
+                with self.provider.slot():
+                    self.fail("should not run")
+
+    def test_client_timeouts_are_reported_as_upstream_timeouts(self):
+        with self.assertRaises(UpstreamTimeout):
+            with self.provider.slot():
+                raise SlowClientTimeout()
+        self.assertEqual(self.provider.timeouts.value, 1)
+        self.assertEqual(self.provider.in_flight, 0)
+
+    def test_counters_are_one_family_labelled_by_provider(self):
+        with self.provider.slot():
+            pass
+        labels = {"provider": self._testMethodName}
+        self.assertIs(counter("outbound_calls_total", labels=labels), self.provider.calls)
+        self.assertEqual(counter("outbound_calls_total", labels=labels).value, 1)
+        self.assertIs(counter("outbound_timeouts_total", labels=labels), self.provider.timeouts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import threading
+import unittest
+
+from core.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight(f"test_{self.id()}")
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.runs = 0
+
+    def slow(self, result="done"):
+        self.runs += 1
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def run_concurrently(self, count, fn):
+        results = [None] * count
+
+        def call(i):
+            try:
+                results[i] = self.flight.do("key", fn)
+            except Exception as e:
+                results[i] = e
+
+        leader = threading.Thread(target=call, args=(0,))
+        leader.start()
+        self.started.wait(5)
+        followers = [threading.Thread(target=call, args=(i,)) for i in range(1, count)]
+        for thread in followers:
+            thread.start()
+        # every follower is waiting on the leader's call before it is released
+        while self.flight.collapsed.value < count - 1:
+            self.release.wait(0.001)
+        self.release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        return results
+
+    def test_concurrent_calls_share_one_run(self):
+        results = self.run_concurrently(5, self.slow)
+        self.assertEqual(results, ["done"] * 5)
+        self.assertEqual(self.runs, 1)
+        self.assertEqual((self.flight.calls.value, self.flight.collapsed.value), (1, 4))
+        self.assertEqual(self.flight.in_flight(), 0)
+
+    def test_waiters_get_the_same_exception(self):
+        error = RuntimeError("upstream down")
+        results = self.run_concurrently(3, lambda: self.slow(error))
+        self.assertEqual(results, [error] * 3)
+        self.assertEqual(self.runs, 1)
+
+    def test_calls_after_completion_run_again(self):
+        self.release.set()
+        self.assertEqual(self.flight.do("key", self.slow), "done")
+        self.assertEqual(self.flight.do("key", self.slow), "done")
+        self.assertEqual(self.flight.do("other", self.slow), "done")
+        self.assertEqual((self.runs, self.flight.collapsed.value), (3, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.timeseries import DAY, STRING, Column, Series, default_levels
+
+START = 1_700_006_400  # midnight UTC
+COLUMNS = [Column("waiting", "f", "mean"), Column("departures", "I"), Column("phase", STRING)]
+
+
+class TestSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.levels = default_levels({"raw": 1, "minute": 2, "hour": None, "day": None})
+        self.series = Series(self.directory, COLUMNS, self.levels)
+        # one sample every 30 seconds for ten minutes
+        self.series.extend(
+            (START + i * 30, {"waiting": i, "departures": 1, "phase": "triaged" if i % 2 else "treatment"})
+            for i in range(20)
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_range_reads_only_the_window_and_columns_asked_for(self):
+        rows = self.series.range(START + 60, START + 150, ["waiting", "phase"], level="raw")
+        self.assertEqual(rows, {
+            "ts": [START + 60, START + 90, START + 120],
+            "waiting": [2.0, 3.0, 4.0],
+            "phase": ["treatment", "triaged", "treatment"],
+        })
+        with self.assertRaises(KeyError):
+            self.series.range(columns=["unknown"], level="raw")
+
+    def test_no_start_reads_the_finest_level_before_any_rollup(self):
+        self.assertEqual(self.series.level_for(None).name, "raw")
+        self.assertEqual(len(self.series.range()["ts"]), 20)
+
+    def test_rollup_folds_closed_buckets_once(self):
+        self.assertEqual(self.series.rollup(START + 5 * 60), 5)
+        self.assertEqual(self.series.rollup(START + 5 * 60), 0)
+        minutes = self.series.range(level="minute")
+        self.assertEqual(minutes["ts"], [START + m * 60 for m in range(5)])
+        self.assertEqual(minutes["waiting"], [0.5, 2.5, 4.5, 6.5, 8.5])
+        self.assertEqual(minutes["departures"], [2] * 5)
+        self.assertEqual(minutes["samples"], [2] * 5)
+
+        self.series.rollup(START + 60 * 60)
+        hours = self.series.range(level="hour")
+        self.assertEqual(hours["ts"], [START])
+        self.assertEqual(hours["waiting"], [9.5])
+        self.assertEqual(hours["departures"], [20])
+
+    def test_reopened_series_continues_and_ignores_a_torn_row(self):
+        with open(os.path.join(self.directory, "raw", f"{START:012d}", "waiting.col"), "ab") as f:
+            f.write(b"\0" * 4)  # a write cut short by a crash
+
+        reopened = Series(self.directory, COLUMNS, self.levels)
+        self.assertEqual(len(reopened.range(level="raw")["ts"]), 20)
+        reopened.append(START + 600, {"waiting": 20, "departures": 1, "phase": "triaged"})
+        rows = reopened.range(START + 570, columns=["waiting", "phase"], level="raw")
+        self.assertEqual(rows["waiting"], [19.0, 20.0])
+        self.assertEqual(rows["phase"], ["triaged", "triaged"])
+
+    def test_prune_drops_expired_segments_after_rolling_them_up(self):
+        self.series.maintain(START + 3 * DAY)
+        self.assertEqual(self.series.range(level="raw")["ts"], [])
+        self.assertEqual(self.series.range(level="minute")["ts"], [])
+        self.assertEqual(self.series.range(level="hour")["departures"], [20])
+        self.assertEqual(self.series.level_for(START, now=START + 3 * DAY).name, "hour")
+        self.assertEqual(self.series.level_for(START, now=START + 60).name, "raw")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,356 @@
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+DAY = 24 * 60 * 60
+
+# every series stores the sample time and how many raw samples a row stands for
+TIME_COLUMN = "ts"
+SAMPLES_COLUMN = "samples"
+
+# typecode of dictionary encoded string columns, stored as "I" codes
+STRING = "s"
+
+
+class Column(NamedTuple):
+    name: str
+    typecode: str  # an array module typecode, or STRING
+    rollup: str = "sum"  # sum, mean (weighted by samples), max, min or last; strings always keep the last
+
+
+class Level(NamedTuple):
+    name: str
+    bucket_seconds: int  # 0 keeps every sample as is
+    segment_seconds: int
+    retention_seconds: Optional[float] = None  # None keeps it forever
+
+
+def default_levels(retention_days: Mapping[str, Optional[float]]) -> Tuple[Level, ...]:
+    """Raw samples rolled into minute, hour and day buckets, each kept for retention_days[name]."""
+    def keep(name: str) -> Optional[float]:
+        days = retention_days.get(name)
+        return None if days is None else days * DAY
+
+    return (
+        Level("raw", 0, DAY, keep("raw")),
+        Level("minute", 60, DAY, keep("minute")),
+        Level("hour", 60 * 60, 30 * DAY, keep("hour")),
+        Level("day", DAY, 366 * DAY, keep("day")),
+    )
+
+
+def _storage_typecode(column: Column) -> str:
+    return "I" if column.typecode == STRING else column.typecode
+
+
+class Segment:
+    """
+    One time slice of one level: a directory with a file of fixed width
+    values per column, appended in time order.
+
+    The row count is the shortest column, so a write cut short by a crash
+    hides the partial row instead of misaligning the columns; the writer
+    truncates the longer files before appending again.
+    """
+
+    def __init__(self, directory: str, columns: Sequence[Column]):
+        self.directory = directory
+        self.columns = {column.name: column for column in columns}
+        self._strings: Dict[str, Tuple[List[str], Dict[str, int]]] = {}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name + ".col")
+
+    def _itemsize(self, name: str) -> int:
+        return array(_storage_typecode(self.columns[name])).itemsize
+
+    def length(self, names: Optional[Iterable[str]] = None) -> int:
+        lengths = []
+        for name in names if names is not None else self.columns:
+            try:
+                lengths.append(os.path.getsize(self._path(name)) // self._itemsize(name))
+            except OSError:
+                lengths.append(0)
+        return min(lengths, default=0)
+
+    def repair(self) -> int:
+        """Truncates every column to the common length, returns it."""
+        length = self.length()
+        for name in self.columns:
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) != length * self._itemsize(name):
+                with open(path, "r+b") as f:
+                    f.truncate(length * self._itemsize(name))
+        return length
+
+    def _dictionary(self, name: str) -> Tuple[List[str], Dict[str, int]]:
+        if name not in self._strings:
+            values: List[str] = []
+            try:
+                with open(os.path.join(self.directory, name + ".dict")) as f:
+                    for line in f:
+                        try:
+                            values.append(json.loads(line))
+                        except ValueError:
+                            break  # a line cut short by a crash, nothing refers to it
+            except OSError:
+                pass
+            self._strings[name] = (values, {value: code for code, value in enumerate(values)})
+        return self._strings[name]
+
+    def _encode(self, name: str, values: List[Any]) -> List[int]:
+        strings, codes = self._dictionary(name)
+        new = []
+        for value in values:
+            value = "" if value is None else str(value)
+            if value not in codes:
+                codes[value] = len(strings)
+                strings.append(value)
+                new.append(value)
+        if new:
+            # the dictionary is written before any code that refers to it
+            with open(os.path.join(self.directory, name + ".dict"), "a") as f:
+                f.writelines(json.dumps(value) + "\n" for value in new)
+        return [codes["" if value is None else str(value)] for value in values]
+
+    def append(self, rows: Dict[str, List[Any]]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        # every column is converted before any is written, so a value that doesn't fit leaves them aligned
+        arrays = {
+            name: array(
+                _storage_typecode(column),
+                self._encode(name, rows[name]) if column.typecode == STRING else rows[name],
+            )
+            for name, column in self.columns.items()
+        }
+        for name, values in arrays.items():
+            with open(self._path(name), "ab") as f:
+                values.tofile(f)
+
+    def bounds(self, start: Optional[float], end: Optional[float], length: int) -> Tuple[int, int]:
+        """Row range [lo, hi) with start <= ts < end, found by bisecting the mapped time column."""
+        if not length:
+            return 0, 0
+        with open(self._path(TIME_COLUMN), "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped)[:length * self._itemsize(TIME_COLUMN)] as raw, raw.cast("d") as times:
+                lo = 0 if start is None else bisect_left(times, start)
+                hi = length if end is None else bisect_left(times, end, lo)
+        return lo, hi
+
+    def read(self, names: Sequence[str], lo: int, hi: int) -> Dict[str, List[Any]]:
+        """Reads rows [lo, hi) of just the named columns."""
+        result = {}
+        for name in names:
+            column = self.columns[name]
+            values = array(_storage_typecode(column))
+            if hi > lo:
+                with open(self._path(name), "rb") as f:
+                    f.seek(lo * values.itemsize)
+                    values.frombytes(f.read((hi - lo) * values.itemsize))
+            if column.typecode == STRING:
+                strings = self._dictionary(name)[0]
+                result[name] = [strings[code] for code in values]
+            else:
+                result[name] = values.tolist()
+        return result
+
+
+class Series:
+    """
+    An append-only columnar time series with downsampling and retention.
+
+    Samples go to the finest level; rollup() folds closed buckets of each
+    level into the next coarser one and prune() drops whole segments older
+    than a level's retention. Each level is split into segments by time, so
+    a range query only opens the segments it overlaps, bisects their time
+    column to find the window and reads just the columns asked for.
+    """
+
+    def __init__(self, directory: str, columns: Sequence[Column], levels: Sequence[Level]):
+        self.directory = directory
+        self.columns = [Column(TIME_COLUMN, "d"), Column(SAMPLES_COLUMN, "I")] + list(columns)
+        self.levels = list(levels)
+        self._levels = {level.name: level for level in self.levels}
+        self._lock = threading.Lock()
+        self._writing: Dict[str, Tuple[str, Segment, float]] = {}
+
+    @property
+    def names(self) -> List[str]:
+        return [column.name for column in self.columns]
+
+    def _segment(self, level: Level, segment_start: int) -> Segment:
+        return Segment(os.path.join(self.directory, level.name, f"{segment_start:012d}"), self.columns)
+
+    def _segment_starts(self, level: Level) -> List[int]:
+        try:
+            return sorted(int(name) for name in os.listdir(os.path.join(self.directory, level.name)) if name.isdigit())
+        except OSError:
+            return []
+
+    def append(self, at: float, values: Mapping[str, Any]) -> None:
+        self.extend([(at, values)])
+
+    def extend(self, samples: Iterable[Tuple[float, Mapping[str, Any]]]) -> None:
+        """Adds raw samples in time order; a clock that steps back is held at the last sample time."""
+        samples = list(samples)
+        if not samples:
+            return
+        rows = {name: [values.get(name, 0) for _, values in samples] for name in self.names}
+        rows[SAMPLES_COLUMN] = [1] * len(samples)
+        with self._lock:
+            self._append(self.levels[0], [at for at, _ in samples], rows)
+
+    def _append(self, level: Level, times: List[float], rows: Dict[str, List[Any]]) -> None:
+        by_segment: Dict[int, List[int]] = defaultdict(list)
+        last = self._last_time(level)
+        for i, at in enumerate(times):
+            if last is not None and at < last:
+                at = times[i] = last
+            last = at
+            by_segment[int(at // level.segment_seconds) * level.segment_seconds].append(i)
+        rows = dict(rows, **{TIME_COLUMN: times})
+        for segment_start, indexes in sorted(by_segment.items()):
+            segment = self._writer(level, segment_start)
+            segment.append({name: [rows[name][i] for i in indexes] for name in self.names})
+            self._writing[level.name] = (segment.directory, segment, times[indexes[-1]])
+
+    def _writer(self, level: Level, segment_start: int) -> Segment:
+        directory = self._segment(level, segment_start).directory
+        cached = self._writing.get(level.name)
+        if cached is not None and cached[0] == directory:
+            return cached[1]
+        segment = self._segment(level, segment_start)
+        segment.repair()
+        return segment
+
+    def _last_time(self, level: Level) -> Optional[float]:
+        cached = self._writing.get(level.name)
+        if cached is not None:
+            return cached[2]
+        for segment_start in reversed(self._segment_starts(level)):
+            segment = self._segment(level, segment_start)
+            length = segment.repair()
+            if length:
+                last = segment.read([TIME_COLUMN], length - 1, length)[TIME_COLUMN][0]
+                self._writing[level.name] = (segment.directory, segment, last)
+                return last
+        return None
+
+    def level_for(self, start: Optional[float], now: Optional[float] = None) -> Level:
+        """
+        The finest level that still holds data from start. Without a start
+        that is the finest level, which has the latest samples even before
+        anything was rolled up; its retention bounds how far back it goes.
+        """
+        if start is None:
+            return self.levels[0]
+        now = time.time() if now is None else now
+        for level in self.levels:
+            if level.retention_seconds is None or start >= now - level.retention_seconds:
+                return level
+        return self.levels[-1]
+
+    def range(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        columns: Optional[Sequence[str]] = None,
+        level: Optional[str] = None,
+    ) -> Dict[str, List[Any]]:
+        """
+        Rows with start <= ts < end at level (default: level_for(start)),
+        as {column: values}. The time column is always included.
+        """
+        chosen = self._levels[level] if level is not None else self.level_for(start)
+        names = [TIME_COLUMN] + [name for name in (columns or self.names) if name != TIME_COLUMN]
+        unknown = set(names) - set(self.names)
+        if unknown:
+            raise KeyError(f"Unknown columns: {', '.join(sorted(unknown))}")
+
+        result: Dict[str, List[Any]] = {name: [] for name in names}
+        for segment_start in self._segment_starts(chosen):
+            if end is not None and segment_start >= end:
+                break
+            if start is not None and segment_start + chosen.segment_seconds <= start:
+                continue
+            segment = self._segment(chosen, segment_start)
+            lo, hi = segment.bounds(start, end, segment.length(names))
+            for name, values in segment.read(names, lo, hi).items():
+                result[name].extend(values)
+        return result
+
+    def rollup(self, now: Optional[float] = None) -> int:
+        """Folds every closed bucket not yet rolled up into the next level; returns rows written."""
+        now = time.time() if now is None else now
+        written = 0
+        with self._lock:
+            for source, target in zip(self.levels, self.levels[1:]):
+                last = self._last_time(target)
+                start = None if last is None else last + target.bucket_seconds
+                end = now // target.bucket_seconds * target.bucket_seconds
+                if start is not None and start >= end:
+                    continue
+                rows = self.range(start, end, level=source.name)
+                if rows[TIME_COLUMN]:
+                    written += self._write_buckets(target, rows)
+        return written
+
+    def _write_buckets(self, target: Level, rows: Dict[str, List[Any]]) -> int:
+        buckets: Dict[float, List[int]] = defaultdict(list)
+        for i, at in enumerate(rows[TIME_COLUMN]):
+            buckets[at // target.bucket_seconds * target.bucket_seconds].append(i)
+
+        times = sorted(buckets)
+        out: Dict[str, List[Any]] = {name: [] for name in self.names}
+        for bucket in times:
+            indexes = buckets[bucket]
+            weights = [rows[SAMPLES_COLUMN][i] for i in indexes]
+            total = sum(weights)
+            for column in self.columns[1:]:
+                values = [rows[column.name][i] for i in indexes]
+                if column.rollup == "last" or column.typecode == STRING:
+                    value = values[-1]
+                elif column.rollup == "mean":
+                    value = sum(v * w for v, w in zip(values, weights)) / total if total else 0
+                elif column.rollup == "max":
+                    value = max(values)
+                elif column.rollup == "min":
+                    value = min(values)
+                else:
+                    value = sum(values)
+                out[column.name].append(value)
+        self._append(target, times, out)
+        return len(times)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Deletes segments that ended before their level's retention; returns how many."""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            for level in self.levels:
+                if level.retention_seconds is None:
+                    continue
+                for segment_start in self._segment_starts(level):
+                    if segment_start + level.segment_seconds > now - level.retention_seconds:
+                        break
+                    segment = self._segment(level, segment_start)
+                    shutil.rmtree(segment.directory, ignore_errors=True)
+                    cached = self._writing.get(level.name)
+                    if cached is not None and cached[0] == segment.directory:
+                        del self._writing[level.name]
+                    removed += 1
+        return removed
+
+    def maintain(self, now: Optional[float] = None) -> None:
+        """Rolls up, then prunes, so nothing is dropped before it reaches a coarser level."""
+        self.rollup(now)
+        self.prune(now)
@@ -0,0 +1,101 @@
+import re
+import time
+
+from contextlib import closing
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+from config import CHAT_CACHE_SIZE, CHAT_CACHE_TTL_SECONDS
+from core.cache import LRUCache
+from core.metrics import cache_hit_ratio, counter, hit_ratio
+from core.singleflight import SingleFlight
+
+# weight of the newest sample in the running average of a model call
+MISS_LATENCY_SMOOTHING = 0.2
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Lower-cased, single-spaced and without trailing punctuation."""
+    return _WHITESPACE.sub(" ", text).strip().rstrip("?!. ").lower()
+
+
+class ChatAnswerCache:
+    """
+    Chatbot replies keyed by the normalized question and the patient context.
+
+    The context is whatever patient fields went into the prompt, so a patient
+    whose status changes, or whose rounded wait or queue band moves, gets a
+    fresh answer, while general questions are shared by everyone who asks
+    them. Entries also expire after ttl seconds. The same question asked
+    again while its answer is still being generated waits for that answer
+    instead of a second call.
+    """
+
+    def __init__(self, maxsize: int = CHAT_CACHE_SIZE, ttl: Optional[float] = CHAT_CACHE_TTL_SECONDS, **kwargs):
+        self._cache = LRUCache(maxsize, ttl, **kwargs)
+        self.hits = counter("chat_cache_hits_total", "Chat replies served from the answer cache")
+        self.misses = counter("chat_cache_misses_total", "Chat replies that needed a model call")
+        self.saved_seconds = counter("chat_cache_saved_seconds_total", "Estimated model latency avoided by cache hits")
+        self.miss_seconds = 0.0
+        self._answers = SingleFlight("chat_answer")
+        cache_hit_ratio("chat_answer", lambda: hit_ratio(self.hits.value, self.misses.value))
+
+    def get(self, question: str, context: Optional[Hashable], answer: Callable[[], str]) -> str:
+        key = (normalize_question(question), context)
+        reply = self._cache.get(key)
+        if reply is not None:
+            self.hits.inc()
+            self.saved_seconds.inc(self.miss_seconds)
+            return reply
+        return self._answers.do(key, lambda: self._answer(key, answer))
+
+    def _answer(self, key: Hashable, answer: Callable[[], str]) -> str:
+        self.misses.inc()
+        started = time.perf_counter()
+        reply = answer()
+        self._store(key, reply, time.perf_counter() - started)
+        return reply
+
+    def stream(self, question: str, context: Optional[Hashable], answer: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Like get, but for a reply produced in pieces.
+
+        A hit yields the whole cached reply at once. A miss forwards the pieces
+        as they arrive and only caches the reply if the caller read it to the
+        end; closing this generator early closes the upstream one too.
+        """
+        key = (normalize_question(question), context)
+        reply = self._cache.get(key)
+        if reply is not None:
+            self.hits.inc()
+            self.saved_seconds.inc(self.miss_seconds)
+            yield reply
+            return
+
+        self.misses.inc()
+        started = time.perf_counter()
+        parts = []
+        with closing(answer()) as pieces:
+            for piece in pieces:
+                parts.append(piece)
+                yield piece
+        self._store(key, "".join(parts), time.perf_counter() - started)
+
+    def _store(self, key: Hashable, reply: str, elapsed: float) -> None:
+        if self.miss_seconds:
+            self.miss_seconds += MISS_LATENCY_SMOOTHING * (elapsed - self.miss_seconds)
+        else:
+            self.miss_seconds = elapsed
+        self._cache.set(key, reply)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits.value,
+            "misses": self.misses.value,
+            "hitRate": hit_ratio(self.hits.value, self.misses.value),
+            "averageMissSeconds": self.miss_seconds,
+            "savedSeconds": self.saved_seconds.value,
+            "collapsed": self._answers.collapsed.value,
+        }
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from typing import Iterable, List, Optional, Tuple
+
+from config import AUDIO_CACHE_DIR, AUDIO_CACHE_DISK_BYTES, AUDIO_CACHE_MEMORY_BYTES
+from core.cache import LRUCache
+from core.metrics import cache_hit_ratio, counter, hit_ratio
+from core.singleflight import SingleFlight
+from genai.speech import Synthesizer
+
+logger = logging.getLogger(__name__)
+
+AUDIO_SUFFIX = ".mp3"
+
+# said often enough, word for word, to be worth synthesizing ahead of time
+STOCK_PHRASES = (
+    "Hi! I'm your ED Assistant. How can I help you today?",
+    "I can't give medical advice. If you feel worse, please tell the triage nurse right away.",
+    "Triage category 1 means resuscitation. You need immediate care and will be seen right away.",
+    "Triage category 2 means emergent. You will be seen as quickly as possible.",
+    "Triage category 3 means urgent. You will be seen once more critical patients are cared for.",
+    "Triage category 4 means less urgent. Your wait may be longer while sicker patients are seen first.",
+    "Triage category 5 means non-urgent. You will be seen after more urgent patients.",
+)
+
+
+def audio_key(engine: str, voice: str, model: str, text: str) -> str:
+    """Content address of one synthesized clip; whitespace differences don't matter."""
+    canonical = json.dumps([engine, voice, model, " ".join(text.split())])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class AudioCache:
+    """
+    Synthesized audio by content key, in memory and on disk.
+
+    The memory tier is an LRU bounded by bytes. The disk tier holds one file
+    per key, bounded by total size: the least recently used files (by
+    mtime, bumped on every hit) are deleted first. A disk hit is promoted
+    back to memory.
+    """
+
+    def __init__(
+        self,
+        directory: str = AUDIO_CACHE_DIR,
+        memory_bytes: int = AUDIO_CACHE_MEMORY_BYTES,
+        disk_bytes: int = AUDIO_CACHE_DISK_BYTES,
+    ):
+        self.directory = directory
+        self.disk_bytes = disk_bytes
+        self._memory = LRUCache(memory_bytes, weight=len)
+        self._disk_lock = threading.Lock()
+        self.disk_size = sum(size for _, _, size in self._disk_entries())
+
+        self.memory_hits = counter("audio_cache_memory_hits_total", "TTS clips served from memory")
+        self.disk_hits = counter("audio_cache_disk_hits_total", "TTS clips served from disk")
+        self.misses = counter("audio_cache_misses_total", "TTS clips that had to be synthesized")
+        cache_hit_ratio("audio", lambda: hit_ratio(self.memory_hits.value + self.disk_hits.value, self.misses.value))
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + AUDIO_SUFFIX)
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._memory.get(key)
+        if data is not None:
+            self.memory_hits.inc()
+            return data
+        try:
+            with open(self.path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            self.misses.inc()
+            return None
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass  # evicted since we read it
+        self.disk_hits.inc()
+        self._memory.set(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        self._memory.set(key, data)
+        if len(data) > self.disk_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            with self._disk_lock:
+                previous = self._size_of(self.path(key))
+                # rename is atomic, readers see the old clip or the new one
+                os.replace(tmp_path, self.path(key))
+                self.disk_size += len(data) - previous
+                if self.disk_size > self.disk_bytes:
+                    self._evict()
+        except OSError as e:
+            logger.warning(f"Could not write audio cache entry {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _disk_entries(self) -> List[Tuple[float, str, int]]:
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(AUDIO_SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def _evict(self) -> None:
+        for _, path, size in sorted(self._disk_entries()):
+            if self.disk_size <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.disk_size -= size
+
+    @staticmethod
+    def _size_of(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+
+class CachedSynthesizer:
+    """
+    Wraps a synthesizer so each (engine, voice, model, text) is only
+    synthesized once, also when several requests ask for it at the same time.
+    """
+
+    def __init__(self, synthesizer: Synthesizer, cache: AudioCache, engine: str, model: str, voice: str):
+        self.synthesizer = synthesizer
+        self.cache = cache
+        self.engine = engine
+        self.model = model
+        self.voice = voice
+        self._syntheses = SingleFlight("tts")
+
+    def key(self, text: str) -> str:
+        return audio_key(self.engine, self.voice, self.model, text)
+
+    def synthesize(self, text: str) -> bytes:
+        key = self.key(text)
+        data = self.cache.get(key)
+        if data is None:
+            data = self._syntheses.do(key, lambda: self._synthesize(key, text))
+        return data
+
+    def _synthesize(self, key: str, text: str) -> bytes:
+        data = self.synthesizer.synthesize(text)
+        self.cache.put(key, data)
+        return data
+
+    def prewarm(self, phrases: Iterable[str] = STOCK_PHRASES) -> int:
+        """Synthesizes any phrase not cached yet; returns how many were."""
+        synthesized = 0
+        for phrase in phrases:
+            key = self.key(phrase)
+            if self.cache.get(key) is not None:
+                continue
+            try:
+                self.cache.put(key, self.synthesizer.synthesize(phrase))
+                synthesized += 1
+            except Exception as e:
+                logger.warning(f"Could not pre-warm audio for {phrase!r}: {e}")
+        return synthesized
+
+
+audio_cache = AudioCache()
@@ -0,0 +1,116 @@
+import logging
+
+from flask import Blueprint, Flask, Response, jsonify, request
+
+from config import CHAT_DEADLINE_SECONDS
+from core.outbound import Saturated, UpstreamTimeout, deadline_scope, outbound
+from genai.gpt import (
+    answer_cache,
+    chat_event_stream,
+    chat_sessions,
+    first_token_seconds,
+    get_chatgpt_response,
+    prompt_tokens,
+    streams_cancelled,
+)
+from hospital_data.routes import invalid_site, unknown_site
+from hospital_data.sites import InvalidSite, UnknownSite, get_site
+
+logger = logging.getLogger(__name__)
+
+blueprint = Blueprint("chat", __name__)
+blueprint.register_error_handler(UnknownSite, unknown_site)
+blueprint.register_error_handler(InvalidSite, invalid_site)
+
+
+def register(app: Flask) -> None:
+    """Chatbot routes; the Gemini SDK is imported and configured by the first reply."""
+    app.register_blueprint(blueprint)
+
+
+@blueprint.route('/chat', methods=['POST'])
+def chat():
+    try:
+        user_message = request.json.get('message')
+        patient_id = request.json.get('patient_id')
+
+        if not user_message:
+            return jsonify({'error': 'Message is required'}), 400
+        site = get_site(request.json.get('site') or request.args.get('site')).name
+
+        session = chat_sessions.open(patient_id, request.json.get('session_id'))
+        with deadline_scope(CHAT_DEADLINE_SECONDS):
+            bot_reply = get_chatgpt_response(user_message, patient_id, session=session, site=site)
+        return jsonify({'reply': bot_reply, 'sessionId': session.id})
+
+    except (Saturated, UpstreamTimeout, InvalidSite, UnknownSite):
+        raise
+    except Exception as e:
+        logger.error(f"Chat failed: {e}", extra={"patient_id": request.json.get('patient_id')})
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@blueprint.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Stream a chatbot reply as server-sent events
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            patient_id:
+              type: string
+            session_id:
+              type: string
+              description: sessionId of the previous reply's done event, omit to start a conversation
+            site:
+              type: string
+              description: The ED the patient is in, defaults to the main site (also accepted as a query parameter)
+    responses:
+      200:
+        description: text/event-stream of token events ({"text"}), then done ({"sessionId"}), or error if generation fails
+      400:
+        description: message missing, or site not a string
+      404:
+        description: Unknown site
+      503:
+        description: The model is at its concurrency limit, retry after the Retry-After header
+    """
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message')
+    if not user_message:
+        return jsonify({'error': 'Message is required'}), 400
+    site = get_site(data.get('site') or request.args.get('site')).name
+    # refuse up front while we can still send a status code
+    outbound("gemini").check()
+
+    session = chat_sessions.open(data.get('patient_id'), data.get('session_id'))
+    return Response(
+        chat_event_stream(user_message, data.get('patient_id'), CHAT_DEADLINE_SECONDS, session, site),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@blueprint.route("/chat/stats", methods=["GET"])
+def get_chat_stats():
+    """
+    Chatbot answer cache statistics
+    ---
+    responses:
+      200:
+        description: Cache entries, hit rate, the model latency hits have saved, questions that shared an answer in flight, streaming time to first token, open sessions and average prompt size
+    """
+    stats = answer_cache.stats()
+    stats["sessions"] = len(chat_sessions)
+    stats["averagePromptTokens"] = prompt_tokens.average
+    stats["streams"] = first_token_seconds.count
+    stats["averageFirstTokenSeconds"] = first_token_seconds.average
+    stats["streamsCancelled"] = streams_cancelled.value
+    return jsonify(stats)
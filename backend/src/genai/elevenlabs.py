@@ -1,45 +1,74 @@
+import logging
 import requests
 import os
-import speech_recognition as sr
 
 from config import ELEVENLABS_API_KEY, ELEVENLABS_API_URL
+from core.outbound import outbound
+from genai.audio_cache import CachedSynthesizer, audio_cache
+
+logger = logging.getLogger(__name__)
+
+ELEVENLABS_VOICE = "en_us_male"
+
+class ElevenLabsSynthesizer:
+    def __init__(self, api_key: str = ELEVENLABS_API_KEY, url: str = ELEVENLABS_API_URL, voice: str = ELEVENLABS_VOICE):
+        self.api_key = api_key
+        self.url = url
+        self.voice = voice
+
+    def synthesize(self, text: str) -> bytes:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "text": text,
+            "voice": self.voice,
+            "output_format": "mp3"
+        }
+
+        elevenlabs = outbound("elevenlabs", (requests.Timeout,))
+        with elevenlabs.slot("speech") as timeout:
+            response = elevenlabs.session.post(self.url, headers=headers, json=data, timeout=timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"Error: {response.status_code}, {response.text}")
+        return response.content
+
+eleven_labs_speech = CachedSynthesizer(ElevenLabsSynthesizer(), audio_cache, "elevenlabs", "default", ELEVENLABS_VOICE)
 
 def speak_eleven_labs(text):
-    headers = {
-        "Authorization": f"Bearer {ELEVENLABS_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "text": text,
-        "voice": "en_us_male",
-        "output_format": "mp3"
-    }
-
-    response = requests.post(ELEVENLABS_API_URL, headers=headers, json=data)
-
-    if response.status_code == 200:
-        with open("response_audio.mp3", "wb") as f:
-            f.write(response.content)
-        print("Speech generated successfully.")
-        os.system("start response_audio.mp3")
-    else:
-        print(f"Error: {response.status_code}, {response.text}")
+    try:
+        eleven_labs_speech.synthesize(text)
+    except RuntimeError as e:
+        logger.error(f"ElevenLabs speech failed: {e}")
+        return
+
+    # play the cached clip itself rather than a shared response_audio.mp3
+    path = audio_cache.path(eleven_labs_speech.key(text))
+    if not os.path.exists(path):
+        logger.warning("Speech generated but too large to keep on disk")
+        return
+    logger.info("Speech generated", extra={"characters": len(text)})
+    os.system(f"start {path}")
 
 def listen():
+    import speech_recognition as sr
+
     recognizer = sr.Recognizer()
 
     with sr.Microphone() as source:
-        print("Listening for your command...")
+        logger.debug("Listening on the microphone")
         recognizer.adjust_for_ambient_noise(source)
         audio = recognizer.listen(source)
 
     try:
         text = recognizer.recognize_google(audio)
-        print(f"You said: {text}")
+        # the transcript is the patient's own words, only its length is logged
+        logger.debug("Speech recognized", extra={"characters": len(text)})
         return text
     except sr.UnknownValueError:
-        print("Sorry, I could not understand your speech.")
+        logger.warning("Speech could not be understood")
+        return None
+    except sr.RequestError as e:
+        logger.warning(f"Speech recognition request failed: {e}")
         return None
-    except sr.RequestError:
-        print("Request error. Please check your internet connection.")
-        return None
\ No newline at end of file
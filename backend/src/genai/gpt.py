@@ -1,68 +1,278 @@
+import logging
 import os
-import google.generativeai as genai
+import re
+import threading
+import time
+from contextlib import closing
 from dotenv import load_dotenv
-from hospital_data.hospital_api import get_patient_data
+from typing import Any, Iterator, Optional, Tuple
+from core.metrics import COUNT_BUCKETS, counter, histogram, summary
+from core.outbound import Saturated, deadline_scope, outbound
+from genai.answer_cache import ChatAnswerCache, normalize_question
+from genai.sessions import ChatSession, ChatSessions, estimate_tokens
+from hospital_data.aggregates import as_wait_time
+from hospital_data.changefeed import format_sse
+from hospital_data.hospital_api import Patient
+from hospital_data.snapshot import QueueSnapshot, current_snapshot
 load_dotenv()
 
-def get_chatgpt_response(openai_client:any, user_message:str, patient_id:str):
-    GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-    if not GEMINI_API_KEY:
-        raise ValueError("GEMINI_API_KEY environment variable is not set")
-
-    genai.configure(api_key=GEMINI_API_KEY)
-    
-    generation_config = {
-        "temperature": 1,
-        "top_p": 0.95,
-        "top_k": 40,
-        "max_output_tokens": 8192,
-        "response_mime_type": "text/plain",
-    }
-
-    model = genai.GenerativeModel(
-        model_name="gemini-2.0-flash-exp",
-        generation_config=generation_config,
-    )
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "gemini-2.0-flash-exp"
 
-    system_message = """You are a helpful chatbot designed to assist patients in the emergency room. 
+GENERATION_CONFIG = {
+    "temperature": 1,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+    "response_mime_type": "text/plain",
+}
+
+SYSTEM_MESSAGE = """You are a helpful chatbot designed to assist patients in the emergency room.
         Explain medical terms clearly, provide reassurance, and answer questions about the ED process. Keep your answers concise and to the point. Do not under any circumstance give medical advice."""
+# built once and given to the model, which sends it with every chat instead of as a first user turn
+SYSTEM_INSTRUCTION = " ".join(SYSTEM_MESSAGE.split())
+
+PatientContext = Tuple[Optional[int], Optional[str], Optional[int], Optional[str], Optional[str], Optional[str]]
+
+# the prompt rounds the wait and bands the queue position, so the context
+# (and the answer cache key) holds still across ingests that move them a little
+WAIT_BUCKET_MINUTES = 15
+QUEUE_BANDS = (1, 2, 3, 5, 10, 20)
+# a first question with none of these is about the ED in general, asked without the patient's details
+PERSONAL_WORDS = frozenset({
+    "i", "i'm", "im", "me", "my", "mine", "am", "we", "us", "our",
+    "wait", "waiting", "long", "when", "position", "queue", "turn", "next", "ahead", "seen",
+    "status", "result", "results", "lab", "labs", "imaging", "scan", "scans", "test", "tests",
+})
+_WORD = re.compile(r"[a-z']+")
+
+_model = None
+_model_lock = threading.Lock()
+
+answer_cache = ChatAnswerCache()
+chat_sessions = ChatSessions()
+prompt_tokens = histogram(
+    "chat_prompt_tokens",
+    "Estimated prompt tokens per chat turn: system instruction, history and message",
+    buckets=COUNT_BUCKETS,
+)
+gemini = outbound("gemini")
+first_token_seconds = summary("chat_stream_first_token_seconds", "Time from a /chat/stream request to its first reply text")
+streams_cancelled = counter("chat_streams_cancelled_total", "Streamed replies abandoned by the client before the model finished")
 
-    patient_context = ""
-    if patient_id:
-        patient_info = get_patient_data(patient_id)
-        if patient_info:
-            patient_context = f"""
-            Current patient information:
-            - Triage Category: {patient_info.triage_category}
-            - Current Phase: {patient_info.status}
-            - Time Elapsed: {patient_info.wait_time} minutes
-            - Queue Position: {patient_info.queue_global}
-            - Investigation Status: Labs: {patient_info.labs}, 
-                Imaging: {patient_info.imaging}
-            """
-            system_message += "\n" + patient_context
-    
-    if patient_context:
-        message = f"""
-        You are a helpful chatbot designed to assist this patient in an emergency room by answering their query.\n\n
-        Here is the patient information:\n
-        {patient_context}
-        \n\n
-        Here is the patient query:\n
-        {user_message}\n\n
-        Do not under any circumstance give medical advice.
-        """
+
+def get_model() -> Any:
+    """The process-wide Gemini model, configured (and the SDK imported) on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                # the SDK takes over a second to import, servers without chat never pay for it
+                import google.generativeai as genai
+                from google.api_core.exceptions import DeadlineExceeded
+                outbound("gemini", (DeadlineExceeded,))
+                GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+                if not GEMINI_API_KEY:
+                    raise ValueError("GEMINI_API_KEY environment variable is not set")
+                genai.configure(api_key=GEMINI_API_KEY)
+                _model = genai.GenerativeModel(
+                    model_name=MODEL_NAME,
+                    generation_config=GENERATION_CONFIG,
+                    system_instruction=SYSTEM_INSTRUCTION,
+                )
+    return _model
+
+def queue_band(position: Any) -> Optional[str]:
+    """The position exactly near the front, as a range further back."""
+    # sqlite hands back whatever the feed sent, like the wait time
+    position = as_wait_time(position)
+    if position is None:
+        return None
+    lower = 1
+    for upper in QUEUE_BANDS:
+        if position <= upper:
+            return str(upper) if lower == upper else f"{lower}-{upper}"
+        lower = upper + 1
+    return f"over {QUEUE_BANDS[-1]}"
+
+def patient_context_fields(patient: Patient) -> PatientContext:
+    """The patient fields the prompt mentions, in the stable form it uses; also the answer cache key."""
+    wait_time = as_wait_time(patient.wait_time)
+    return (
+        patient.triage_category,
+        patient.status,
+        None if wait_time is None else WAIT_BUCKET_MINUTES * round(wait_time / WAIT_BUCKET_MINUTES),
+        queue_band(patient.queue_global),
+        patient.labs,
+        patient.imaging,
+    )
+
+def is_personal(question: str) -> bool:
+    return not PERSONAL_WORDS.isdisjoint(_WORD.findall(normalize_question(question)))
+
+def format_patient_context(fields: PatientContext) -> str:
+    triage_category, status, wait_time, queue_position, labs, imaging = fields
+    return (
+        "Current patient information:\n"
+        f"- Triage Category: {triage_category}\n"
+        f"- Current Phase: {status}\n"
+        f"- Time Elapsed: about {wait_time} minutes\n"
+        f"- Queue Position: {queue_position}\n"
+        f"- Investigation Status: Labs: {labs}, Imaging: {imaging}"
+    )
+
+def compose_message(user_message: str, context: Optional[PatientContext], summary: str = "") -> str:
+    """
+    One turn's message: the summary of folded exchanges and the patient's
+    current information, when there are any, then the query. The context
+    goes with every turn so it is never stale, but never into the history.
+    """
+    parts = [summary] if summary else []
+    if context:
+        parts.append(format_patient_context(context))
+    parts.append("Patient query:\n" + user_message)
+    return "\n\n".join(parts)
+
+def _start_chat(
+    user_message: str,
+    context: Optional[PatientContext],
+    session: Optional[ChatSession] = None,
+) -> Tuple[Any, str]:
+    history = session.history() if session is not None else []
+    message = compose_message(user_message, context, session.summary() if session is not None else "")
+    prompt_tokens.observe(
+        estimate_tokens(SYSTEM_INSTRUCTION)
+        + sum(estimate_tokens(turn["parts"][0]) for turn in history)
+        + estimate_tokens(message)
+    )
+    return get_model().start_chat(history=history), message
+
+def generate_reply(user_message: str, context: Optional[PatientContext], session: Optional[ChatSession] = None) -> str:
+    chat, message = _start_chat(user_message, context, session)
+    with gemini.slot("generate") as timeout:
+        response = chat.send_message(message, request_options={"timeout": timeout})
+        return response.text
+
+def _cancel_upstream(response: Any) -> None:
+    # the SDK keeps the open transport stream privately: a grpc call has
+    # cancel(), the REST transport hands back a plain generator
+    upstream = getattr(response, "_iterator", None)
+    for stop in ("cancel", "close"):
+        if callable(getattr(upstream, stop, None)):
+            getattr(upstream, stop)()
+            return
+
+def stream_reply(
+    user_message: str,
+    context: Optional[PatientContext],
+    session: Optional[ChatSession] = None,
+) -> Iterator[str]:
+    """Reply text as the model produces it; closing the generator cancels the request."""
+    chat, message = _start_chat(user_message, context, session)
+    # the slot stays taken until the stream is finished or abandoned
+    with gemini.slot("stream") as timeout:
+        response = chat.send_message(message, stream=True, request_options={"timeout": timeout})
+        try:
+            for chunk in response:
+                # chunks with no text parts (e.g. only a finish reason) raise on .text
+                text = chunk.text if chunk.parts else ""
+                if text:
+                    yield text
+        except GeneratorExit:
+            _cancel_upstream(response)
+            raise
+
+def _patient_context(patient_id: str, snapshot: Optional[QueueSnapshot], site: Optional[str] = None) -> Optional[PatientContext]:
+    """The patient's context from snapshot, or else from their site's current one."""
+    if not patient_id:
+        return None
+    patient_info = (snapshot or current_snapshot(site)).get_patient(patient_id)
+    return patient_context_fields(patient_info) if patient_info else None
+
+def get_chatgpt_response(
+    user_message: str,
+    patient_id: str,
+    snapshot: Optional[QueueSnapshot] = None,
+    session: Optional[ChatSession] = None,
+    site: Optional[str] = None,
+) -> str:
+    """
+    The reply to one message. Within a session the model also sees the
+    earlier turns, and the exchange is added to it. Only a session's first
+    question doesn't depend on what came before, so only those share the
+    answer cache, and a general one is asked without the patient's details
+    so every patient shares its answer. The patient is looked up in site's
+    snapshot, the default site's for None.
+    """
+    if session is None or session.empty:
+        context = _patient_context(patient_id, snapshot, site) if is_personal(user_message) else None
+        reply = answer_cache.get(user_message, context, lambda: generate_reply(user_message, context))
+    else:
+        context = _patient_context(patient_id, snapshot, site)
+        reply = generate_reply(user_message, context, session)
+    if session is not None:
+        chat_sessions.record(session, user_message, reply)
+    return reply
+
+def stream_chatgpt_response(
+    user_message: str,
+    patient_id: str,
+    snapshot: Optional[QueueSnapshot] = None,
+    session: Optional[ChatSession] = None,
+    site: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Streaming get_chatgpt_response: yields reply text as soon as it exists.
+
+    Records time to first text, and counts streams the caller closed before
+    the reply was complete. Only complete replies are added to the session.
+    """
+    started = time.perf_counter()
+    if session is None or session.empty:
+        context = _patient_context(patient_id, snapshot, site) if is_personal(user_message) else None
+        pieces = answer_cache.stream(user_message, context, lambda: stream_reply(user_message, context))
     else:
-        message = f"""
-        You are a helpful chatbot designed to assist this patient in an emergency room by answering their query.\n\n
-        Here is the patient query:\n
-        {user_message}\n\n
-        Do not under any circumstance give medical advice.
-        """
-
-    chat = model.start_chat(history=[
-        {"role": "user", "parts": [system_message]},
-    ])
-    
-    response = chat.send_message(message)
-    return response.text
\ No newline at end of file
+        pieces = stream_reply(user_message, _patient_context(patient_id, snapshot, site), session)
+    parts = []
+    try:
+        for piece in pieces:
+            if not parts:
+                first_token_seconds.observe(time.perf_counter() - started)
+            parts.append(piece)
+            yield piece
+    except GeneratorExit:
+        pieces.close()
+        streams_cancelled.inc()
+        raise
+    if session is not None:
+        chat_sessions.record(session, user_message, "".join(parts))
+
+def chat_event_stream(
+    user_message: str,
+    patient_id: str,
+    deadline_seconds: Optional[float] = None,
+    session: Optional[ChatSession] = None,
+    site: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Server-sent events for one streamed reply.
+
+    A token event per piece of text, then done (with the sessionId to send
+    with the next message), or error if the model call fails part way (with
+    retryAfter if the model was saturated). If the client goes away the
+    server closes this generator, which cancels the model request.
+    """
+    try:
+        with deadline_scope(deadline_seconds or gemini.default_timeout), \
+                closing(stream_chatgpt_response(user_message, patient_id, session=session, site=site)) as pieces:
+            for piece in pieces:
+                yield format_sse({"text": piece}, event="token")
+    except Saturated as e:
+        yield format_sse({"error": str(e), "retryAfter": e.retry_after}, event="error")
+        return
+    except Exception as e:
+        logger.error(f"Streamed chat failed for patient_id: {patient_id}: {e}")
+        yield format_sse({"error": "Internal server error"}, event="error")
+        return
+    yield format_sse({"sessionId": session.id} if session is not None else {}, event="done")
@@ -0,0 +1,138 @@
+import math
+import secrets
+import threading
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config import (
+    CHAT_HISTORY_TOKENS,
+    CHAT_SESSION_TTL_SECONDS,
+    CHAT_SESSIONS_MAX_CHARS,
+    CHAT_SUMMARY_TOKENS,
+)
+from core.cache import LRUCache
+from core.metrics import gauge
+
+# rough characters per token for English text, close enough to budget prompts without a tokenizer call
+CHARS_PER_TOKEN = 4
+# characters of each earlier question kept in the summary
+SUMMARY_QUESTION_CHARS = 120
+# charged to every session on top of its text, so empty ones still count against the cap
+SESSION_OVERHEAD_CHARS = 256
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class ChatSession:
+    """
+    One patient's conversation with the chatbot.
+
+    Holds the recent exchanges as plain strings and, once they outgrow the
+    token budget, folds the oldest into a one line per question summary that
+    is itself capped. The patient context isn't stored: every turn sends the
+    current one, so history never repeats it.
+    """
+
+    def __init__(self, session_id: str, patient_id: Optional[str]):
+        self.id = session_id
+        self.patient_id = patient_id
+        # question, reply, question, reply, ... oldest first
+        self.turns: List[str] = []
+        self.earlier: Deque[str] = deque()
+        self.tokens = 0
+        self.summary_tokens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.patient_id or "", self.id)
+
+    @property
+    def empty(self) -> bool:
+        return not self.turns and not self.earlier
+
+    @property
+    def size(self) -> int:
+        """Characters held, the session's weight against the store's memory cap."""
+        return SESSION_OVERHEAD_CHARS + sum(map(len, self.turns)) + sum(map(len, self.earlier))
+
+    def history(self) -> List[Dict[str, Any]]:
+        """The kept exchanges as chat history for the model."""
+        with self._lock:
+            turns = list(self.turns)
+        return [
+            {"role": "user" if i % 2 == 0 else "model", "parts": [text]}
+            for i, text in enumerate(turns)
+        ]
+
+    def summary(self) -> str:
+        """What the patient asked before the kept exchanges, empty while nothing was folded."""
+        with self._lock:
+            if not self.earlier:
+                return ""
+            return "Earlier in this conversation the patient asked:\n" + "\n".join(self.earlier)
+
+    def add(self, question: str, reply: str, budget: int, summary_budget: int) -> None:
+        with self._lock:
+            self.turns += [question, reply]
+            self.tokens += estimate_tokens(question) + estimate_tokens(reply)
+            # the latest exchange is always kept, however long
+            while self.tokens > budget and len(self.turns) > 2:
+                self._fold(self.turns.pop(0), self.turns.pop(0), summary_budget)
+
+    def _fold(self, question: str, reply: str, summary_budget: int) -> None:
+        self.tokens -= estimate_tokens(question) + estimate_tokens(reply)
+        line = "- " + " ".join(question.split())[:SUMMARY_QUESTION_CHARS]
+        self.earlier.append(line)
+        self.summary_tokens += estimate_tokens(line)
+        while self.summary_tokens > summary_budget and len(self.earlier) > 1:
+            self.summary_tokens -= estimate_tokens(self.earlier.popleft())
+
+
+class ChatSessions:
+    """
+    Chat sessions keyed by patient and session id.
+
+    Bounded by the characters they hold rather than their number, so
+    thousands of short conversations fit where a few long ones would. The
+    least recently used go first, and a session idle for ttl seconds expires.
+    """
+
+    def __init__(
+        self,
+        max_chars: int = CHAT_SESSIONS_MAX_CHARS,
+        ttl: Optional[float] = CHAT_SESSION_TTL_SECONDS,
+        history_tokens: int = CHAT_HISTORY_TOKENS,
+        summary_tokens: int = CHAT_SUMMARY_TOKENS,
+        **kwargs,
+    ):
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self._sessions = LRUCache(max_chars, ttl, weight=lambda session: session.size, **kwargs)
+        # a session's size must not change while the cache holds it, see record
+        self._lock = threading.Lock()
+        gauge("chat_sessions", lambda: len(self._sessions), "Chat sessions held in memory")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def open(self, patient_id: Optional[str], session_id: Optional[str] = None) -> ChatSession:
+        """The patient's session with that id, or a new one if it is unknown or expired."""
+        with self._lock:
+            if session_id:
+                session = self._sessions.get((patient_id or "", session_id))
+                if session is not None:
+                    return session
+            session = ChatSession(secrets.token_urlsafe(12), patient_id)
+            self._sessions.set(session.key, session)
+            return session
+
+    def record(self, session: ChatSession, question: str, reply: str) -> None:
+        with self._lock:
+            # out while it grows, then back so the cap sees the new size and the ttl restarts
+            self._sessions.pop(session.key)
+            session.add(question, reply, self.history_tokens, self.summary_tokens)
+            self._sessions.set(session.key, session)
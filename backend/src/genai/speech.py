@@ -0,0 +1,228 @@
+import base64
+import contextvars
+import logging
+import queue
+import re
+import threading
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Protocol, Tuple, Union
+
+from config import SPEECH_TTS_WORKERS
+
+from core.metrics import summary
+from core.outbound import Saturated, deadline_scope, outbound
+from hospital_data.changefeed import format_sse
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPTION_MODEL = "whisper-1"
+TTS_MODEL = "tts-1"
+TTS_VOICE = "alloy"  # can choose from: alloy, echo, fable, onyx, nova, or shimmer
+
+# short fragments ("Yes.") are merged into the next sentence, each TTS call
+# has a fixed cost and very short clips sound choppy back to back
+MIN_SENTENCE_CHARS = 24
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+
+SpeechEvent = Tuple[str, Dict[str, Any]]
+
+first_audio_seconds = summary("listen_first_audio_seconds", "Time from a /listen upload to the first synthesized audio")
+total_seconds = summary("listen_total_seconds", "Time from a /listen upload to the last synthesized audio")
+
+
+class Transcriber(Protocol):
+    def transcribe(self, audio: bytes, filename: str) -> str: ...
+
+
+class Synthesizer(Protocol):
+    def synthesize(self, text: str) -> bytes: ...
+
+
+openai_calls = outbound("openai")
+
+_client: Any = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client() -> Any:
+    """The process-wide OpenAI client, created (and the SDK imported) on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import APITimeoutError, OpenAI
+                outbound("openai", (APITimeoutError,))
+                _client = OpenAI()
+    return _client
+
+
+# (transcript, patient_id, site=) -> reply text as it is generated
+ReplyStream = Callable[..., Iterator[str]]
+
+
+class OpenAITranscriber:
+    def __init__(self, client: Any = None, model: str = TRANSCRIPTION_MODEL):
+        self.client = client
+        self.model = model
+
+    def transcribe(self, audio: bytes, filename: str) -> str:
+        # the SDK takes (filename, bytes) directly, the extension picks the decoder
+        client = self.client or get_openai_client()
+        with openai_calls.slot("transcription") as timeout:
+            transcription = client.audio.transcriptions.create(
+                model=self.model, file=(filename, audio), timeout=timeout
+            )
+        return transcription.text
+
+
+class OpenAISynthesizer:
+    def __init__(self, client: Any = None, model: str = TTS_MODEL, voice: str = TTS_VOICE):
+        self.client = client
+        self.model = model
+        self.voice = voice
+
+    def synthesize(self, text: str) -> bytes:
+        client = self.client or get_openai_client()
+        with openai_calls.slot("speech") as timeout:
+            return client.audio.speech.create(model=self.model, voice=self.voice, input=text, timeout=timeout).content
+
+
+def split_sentences(pieces: Iterable[str], min_chars: int = MIN_SENTENCE_CHARS) -> Iterator[str]:
+    """Regroups streamed text into sentences of at least min_chars, flushing the remainder at the end."""
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        while True:
+            match = SENTENCE_END.search(buffer, max(min_chars - 1, 0))
+            if match is None:
+                break
+            sentence, buffer = buffer[:match.end()].strip(), buffer[match.end():]
+            yield sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class SpeechPipeline:
+    """
+    Speech in, speech out, overlapped sentence by sentence.
+
+    The upload is transcribed from memory, then the reply is streamed from
+    the chat model on a producer thread and every finished sentence goes to
+    the TTS pool straight away. The caller gets each sentence's audio, in
+    order, as soon as it is ready, so playback starts while later sentences
+    are still being written and synthesized. Nothing is shared between runs
+    except the TTS pool.
+    """
+
+    def __init__(
+        self,
+        transcriber: Transcriber,
+        reply: ReplyStream,
+        synthesizer: Synthesizer,
+        workers: int = SPEECH_TTS_WORKERS,
+    ):
+        self.transcriber = transcriber
+        self.reply = reply
+        self.synthesizer = synthesizer
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+
+    def run(
+        self,
+        audio: bytes,
+        patient_id: Optional[str] = None,
+        filename: str = "speech.webm",
+        site: Optional[str] = None,
+    ) -> Iterator[SpeechEvent]:
+        """
+        transcript, then one audio event per sentence ({"index", "text", "audio"}
+        with base64 audio), then done with the timings. Closing the generator
+        stops the reply stream and drops sentences not yet synthesized.
+        """
+        started = time.perf_counter()
+        transcript = self.transcriber.transcribe(audio, filename)
+        yield "transcript", {"text": transcript}
+
+        sentences: "queue.Queue[Union[Tuple[str, Future], BaseException, None]]" = queue.Queue()
+        stop = threading.Event()
+        # the copied context carries the request deadline into the producer
+        producer = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._produce, transcript, patient_id, site, sentences, stop),
+            name="speech-reply",
+            daemon=True,
+        )
+        producer.start()
+
+        first_audio = None
+        index = 0
+        try:
+            while True:
+                item = sentences.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                sentence, clip = item
+                data = clip.result()
+                if first_audio is None:
+                    first_audio = time.perf_counter() - started
+                    first_audio_seconds.observe(first_audio)
+                yield "audio", {"index": index, "text": sentence, "audio": base64.b64encode(data).decode("ascii")}
+                index += 1
+        finally:
+            stop.set()
+            while True:
+                try:
+                    item = sentences.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, tuple):
+                    item[1].cancel()
+
+        elapsed = time.perf_counter() - started
+        total_seconds.observe(elapsed)
+        yield "done", {"sentences": index, "firstAudioSeconds": first_audio, "totalSeconds": elapsed}
+
+    def _produce(
+        self,
+        transcript: str,
+        patient_id: Optional[str],
+        site: Optional[str],
+        sentences: queue.Queue,
+        stop: threading.Event,
+    ) -> None:
+        try:
+            with closing(self.reply(transcript, patient_id, site=site)) as pieces:
+                for sentence in split_sentences(pieces):
+                    if stop.is_set():
+                        return
+                    clip = self._executor.submit(contextvars.copy_context().run, self.synthesizer.synthesize, sentence)
+                    sentences.put((sentence, clip))
+        except Exception as e:
+            sentences.put(e)
+        finally:
+            sentences.put(None)
+
+
+def speech_event_stream(
+    pipeline: SpeechPipeline,
+    audio: bytes,
+    patient_id: Optional[str],
+    filename: str,
+    deadline_seconds: Optional[float] = None,
+    site: Optional[str] = None,
+) -> Iterator[str]:
+    """SpeechPipeline.run as server-sent events, with an error event if any stage fails."""
+    try:
+        with deadline_scope(deadline_seconds or openai_calls.default_timeout), \
+                closing(pipeline.run(audio, patient_id, filename, site)) as events:
+            for event, data in events:
+                yield format_sse(data, event=event)
+    except Saturated as e:
+        yield format_sse({"error": str(e), "retryAfter": e.retry_after}, event="error")
+    except Exception as e:
+        logger.error(f"Speech to speech failed for patient_id: {patient_id}: {e}")
+        yield format_sse({"error": "Internal server error"}, event="error")
@@ -0,0 +1,91 @@
+import threading
+import unittest
+
+from genai.answer_cache import ChatAnswerCache, normalize_question
+
+
+class TestChatAnswerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ChatAnswerCache(maxsize=8, ttl=None)
+        self.calls = 0
+        self.before = self.cache.stats()
+
+    def answer(self):
+        self.calls += 1
+        return f"reply {self.calls}"
+
+    def test_normalize_question(self):
+        self.assertEqual(normalize_question("  What is   Imaging?? "), "what is imaging")
+
+    def test_repeated_question_is_served_from_cache(self):
+        first = self.cache.get("What does triage category 3 mean?", None, self.answer)
+        second = self.cache.get("what does triage category 3 mean", None, self.answer)
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"] - self.before["hits"], 1)
+        self.assertEqual(stats["misses"] - self.before["misses"], 1)
+        self.assertGreaterEqual(stats["savedSeconds"], self.before["savedSeconds"])
+
+    def test_concurrent_identical_questions_share_one_model_call(self):
+        release = threading.Event()
+
+        def slow_answer():
+            release.wait(5)
+            return self.answer()
+
+        replies = []
+        threads = [
+            threading.Thread(target=lambda: replies.append(self.cache.get("what is triage", None, slow_answer)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        while self.cache.stats()["collapsed"] - self.before["collapsed"] < 3:
+            release.wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(replies, ["reply 1"] * 4)
+        self.assertEqual(self.calls, 1)
+
+    def test_patient_context_change_misses(self):
+        waiting = (3, "triaged", 40, 7, "NA", "NA")
+        treated = (3, "treatment", 55, 2, "NA", "NA")
+        self.cache.get("how long left", waiting, self.answer)
+        self.assertEqual(self.cache.get("how long left", waiting, self.answer), "reply 1")
+        self.assertEqual(self.cache.get("how long left", treated, self.answer), "reply 2")
+
+    def test_failed_answer_is_not_cached(self):
+        def fail():
+            raise RuntimeError("model unavailable")
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get("what is imaging", None, fail)
+        self.assertEqual(self.cache.get("what is imaging", None, self.answer), "reply 1")
+
+    def test_stream_hit_yields_whole_reply(self):
+        pieces = list(self.cache.stream("what is imaging", None, lambda: (p for p in ["X-rays ", "and scans"])))
+        self.assertEqual(pieces, ["X-rays ", "and scans"])
+        self.assertEqual(list(self.cache.stream("What is imaging?", None, self.fail)), ["X-rays and scans"])
+
+    def test_abandoned_stream_closes_upstream_and_is_not_cached(self):
+        closed = []
+
+        def upstream():
+            try:
+                yield "X-rays "
+                yield "and scans"
+            finally:
+                closed.append(True)
+
+        stream = self.cache.stream("what is imaging", None, upstream)
+        self.assertEqual(next(stream), "X-rays ")
+        stream.close()
+        self.assertEqual(closed, [True])
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from genai.audio_cache import AudioCache, CachedSynthesizer, audio_key
+
+
+class CountingSynthesizer:
+    def __init__(self):
+        self.calls = []
+
+    def synthesize(self, text):
+        self.calls.append(text)
+        return text.encode() * 10
+
+
+class TestAudioCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = os.path.join(self.tmp.name, "audio")
+
+    def test_key_covers_engine_voice_model_and_text(self):
+        key = audio_key("openai", "alloy", "tts-1", "Hello  there")
+        self.assertEqual(key, audio_key("openai", "alloy", "tts-1", "Hello there"))
+        self.assertNotEqual(key, audio_key("openai", "nova", "tts-1", "Hello there"))
+        self.assertNotEqual(key, audio_key("elevenlabs", "alloy", "tts-1", "Hello there"))
+
+    def test_second_request_skips_upstream(self):
+        upstream = CountingSynthesizer()
+        tts = CachedSynthesizer(upstream, AudioCache(self.directory), "openai", "tts-1", "alloy")
+        self.assertEqual(tts.synthesize("Please wait."), tts.synthesize("Please wait."))
+        self.assertEqual(upstream.calls, ["Please wait."])
+
+    def test_disk_tier_survives_restart(self):
+        AudioCache(self.directory).put("abc", b"clip")
+        restarted = AudioCache(self.directory, memory_bytes=0)
+        self.assertEqual(restarted.disk_size, 4)
+        self.assertEqual(restarted.get("abc"), b"clip")
+
+    def test_disk_evicts_least_recently_used_by_size(self):
+        cache = AudioCache(self.directory, memory_bytes=0, disk_bytes=10)
+        cache.put("old", b"1234")
+        os.utime(cache.path("old"), (1, 1))
+        cache.put("new", b"5678")
+        os.utime(cache.path("new"), (2, 2))
+        cache.get("old")  # bumps its mtime past "new"
+        cache.put("third", b"9012")
+        self.assertEqual(cache.disk_size, 8)
+        self.assertIsNone(cache.get("new"))
+        self.assertEqual(cache.get("old"), b"1234")
+
+    def test_prewarm_only_synthesizes_missing_phrases(self):
+        upstream = CountingSynthesizer()
+        tts = CachedSynthesizer(upstream, AudioCache(self.directory), "openai", "tts-1", "alloy")
+        tts.synthesize("Hello.")
+        self.assertEqual(tts.prewarm(["Hello.", "Goodbye."]), 1)
+        self.assertEqual(upstream.calls, ["Hello.", "Goodbye."])
+
+
+if __name__ == '__main__':
+    unittest.main()
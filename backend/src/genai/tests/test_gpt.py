@@ -0,0 +1,140 @@
+import json
+import unittest
+
+from unittest import mock
+
+from genai import gpt
+from genai.answer_cache import ChatAnswerCache
+from genai.sessions import ChatSessions
+from hospital_data.patient_store import PatientStore
+from hospital_data.snapshot import QueueSnapshot
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text] if text else []
+
+
+class FakeUpstream:
+    def __init__(self, texts):
+        self.chunks = iter(FakeChunk(t) for t in texts)
+        self.cancelled = False
+
+    def __next__(self):
+        return next(self.chunks)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeResponse:
+    def __init__(self, texts):
+        self._iterator = FakeUpstream(texts)
+
+    def __iter__(self):
+        return self._iterator
+
+
+class FakeChat:
+    def __init__(self, model):
+        self.model = model
+
+    def send_message(self, message, stream=False, request_options=None):
+        self.model.prompts.append(message)
+        self.model.response = FakeResponse(self.model.texts)
+        return self.model.response
+
+
+class FakeModel:
+    def __init__(self, texts):
+        self.texts = texts
+        self.prompts = []
+        self.histories = []
+        self.response = None
+
+    def start_chat(self, history):
+        self.histories.append(history)
+        return FakeChat(self)
+
+
+def snapshot(wait=42, position=4, category=3):
+    row = (1, "anon_1", "2025-01-25T19:55:53", position, 1, "triaged", "NA", "pending", category, wait)
+    return QueueSnapshot(PatientStore.from_rows([row]))
+
+
+# the same anon_id is a different patient at each site
+SITE_SNAPSHOTS = {None: snapshot(), "north": snapshot(wait=150, category=5)}
+
+
+class TestStreamChatResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.model = FakeModel(["Triage ", "", "category 3 ", "means urgent."])
+        patches = [
+            mock.patch.object(gpt, "get_model", return_value=self.model),
+            mock.patch.object(gpt, "answer_cache", ChatAnswerCache(maxsize=8, ttl=None)),
+            mock.patch.object(gpt, "chat_sessions", ChatSessions(ttl=None)),
+            mock.patch.object(gpt, "current_snapshot", lambda site=None: SITE_SNAPSHOTS[site]),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_streams_model_text_with_patient_context(self):
+        pieces = list(gpt.stream_chatgpt_response("how long is my wait", "anon_1"))
+        self.assertEqual(pieces, ["Triage ", "category 3 ", "means urgent."])
+        self.assertIn("Time Elapsed: about 45 minutes", self.model.prompts[0])
+        self.assertIn("Queue Position: 4-5", self.model.prompts[0])
+
+    def test_personal_answer_is_reused_across_ingest_cycles(self):
+        list(gpt.stream_chatgpt_response("how long is my wait", "anon_1", snapshot(wait=42, position=5)))
+        # the next cycle: half a minute later and one place further forward
+        again = list(gpt.stream_chatgpt_response("How long is my wait?", "anon_1", snapshot(wait=43, position=4)))
+        self.assertEqual(again, ["Triage category 3 means urgent."])
+        self.assertEqual(len(self.model.prompts), 1)
+
+    def test_patient_is_looked_up_at_their_site(self):
+        list(gpt.stream_chatgpt_response("how long is my wait", "anon_1", site="north"))
+        self.assertIn("Triage Category: 5", self.model.prompts[0])
+        self.assertIn("Time Elapsed: about 150 minutes", self.model.prompts[0])
+
+    def test_general_questions_are_shared_without_patient_details(self):
+        list(gpt.stream_chatgpt_response("what does category 3 mean", "anon_1"))
+        list(gpt.stream_chatgpt_response("What does category 3 mean?", "anon_2"))
+        self.assertEqual(len(self.model.prompts), 1)
+        self.assertNotIn("Current patient information", self.model.prompts[0])
+
+    def test_closing_the_stream_cancels_the_model_request(self):
+        cancelled = gpt.streams_cancelled.value
+        stream = gpt.stream_chatgpt_response("what does category 3 mean", None)
+        next(stream)
+        stream.close()
+        self.assertTrue(self.model.response._iterator.cancelled)
+        self.assertEqual(gpt.streams_cancelled.value, cancelled + 1)
+
+    def test_follow_ups_carry_the_session_history(self):
+        session = gpt.chat_sessions.open("anon_1")
+        list(gpt.stream_chatgpt_response("what does category 3 mean", "anon_1", session=session))
+        list(gpt.stream_chatgpt_response("what does category 3 mean", "anon_1", session=session))
+
+        # the repeat is a follow-up, so it goes to the model with the first exchange
+        self.assertEqual(len(self.model.prompts), 2)
+        self.assertEqual(self.model.histories[0], [])
+        self.assertEqual(self.model.histories[1], [
+            {"role": "user", "parts": ["what does category 3 mean"]},
+            {"role": "model", "parts": ["Triage category 3 means urgent."]},
+        ])
+        # the patient context goes with each turn but never into the history
+        self.assertIn("Time Elapsed: about 45 minutes", self.model.prompts[1])
+        self.assertEqual(len(session.turns), 4)
+
+    def test_event_stream_ends_with_done(self):
+        events = list(gpt.chat_event_stream("hi", None))
+        self.assertTrue(events[0].startswith("event: token\n"))
+        self.assertEqual(json.loads(events[0].split("data: ")[1]), {"text": "Triage "})
+        self.assertTrue(events[-1].startswith("event: done\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from genai.sessions import ChatSessions, estimate_tokens
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestChatSessions(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sessions = ChatSessions(max_chars=10_000, ttl=60, history_tokens=50, summary_tokens=20, clock=self.clock)
+
+    def test_sessions_are_resumed_by_patient_and_id(self):
+        session = self.sessions.open("anon_1")
+        self.sessions.record(session, "How long is the wait?", "About an hour.")
+
+        self.assertIs(self.sessions.open("anon_1", session.id), session)
+        self.assertIsNot(self.sessions.open("anon_2", session.id), session)
+        self.assertEqual(
+            session.history(),
+            [{"role": "user", "parts": ["How long is the wait?"]}, {"role": "model", "parts": ["About an hour."]}],
+        )
+
+    def test_older_turns_are_folded_into_a_capped_summary(self):
+        session = self.sessions.open("anon_1")
+        for i in range(6):
+            self.sessions.record(session, f"question {i} " + "x" * 40, "y" * 60)
+
+        self.assertLessEqual(session.tokens, 50)
+        self.assertEqual(session.history()[0]["parts"][0], "question 5 " + "x" * 40)
+        summary = session.summary()
+        self.assertTrue(summary.startswith("Earlier in this conversation the patient asked:"))
+        self.assertIn("question 4", summary)
+        self.assertNotIn("question 0", summary)
+        self.assertLessEqual(sum(estimate_tokens(line) for line in session.earlier), 20)
+
+    def test_idle_sessions_expire(self):
+        session = self.sessions.open("anon_1")
+        self.sessions.record(session, "hi", "hello")
+        self.clock.now += 59
+        self.assertIs(self.sessions.open("anon_1", session.id), session)
+        self.clock.now += 61
+        self.assertIsNot(self.sessions.open("anon_1", session.id), session)
+
+    def test_memory_cap_drops_least_recently_used(self):
+        sessions = ChatSessions(max_chars=2000, ttl=None)
+        first = sessions.open("anon_1")
+        sessions.record(first, "q" * 400, "r" * 400)
+        second = sessions.open("anon_2")
+        sessions.record(second, "q" * 400, "r" * 400)
+
+        self.assertEqual(len(sessions), 1)
+        self.assertIs(sessions.open("anon_2", second.id), second)
+        self.assertIsNot(sessions.open("anon_1", first.id), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
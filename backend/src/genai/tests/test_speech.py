@@ -0,0 +1,101 @@
+import base64
+import threading
+import time
+import unittest
+
+from genai.speech import SpeechPipeline, speech_event_stream, split_sentences
+
+
+class EchoTranscriber:
+    def transcribe(self, audio, filename):
+        return audio.decode()
+
+
+class EchoSynthesizer:
+    def synthesize(self, text):
+        return text.encode()
+
+
+def audio_texts(events):
+    return [base64.b64decode(data["audio"]).decode() for event, data in events if event == "audio"]
+
+
+class TestSplitSentences(unittest.TestCase):
+
+    def test_regroups_stream_into_sentences(self):
+        pieces = ["Triage category 3 ", "means urgent. You will", " be seen soon! Ok. Thanks for waiting", "."]
+        self.assertEqual(list(split_sentences(pieces, min_chars=10)), [
+            "Triage category 3 means urgent.",
+            "You will be seen soon!",
+            "Ok. Thanks for waiting.",
+        ])
+
+
+class TestSpeechPipeline(unittest.TestCase):
+
+    def test_first_audio_before_reply_finishes(self):
+        def reply(transcript, patient_id, site=None):
+            yield "The first sentence is ready. "
+            time.sleep(0.3)
+            yield "The second one took a while."
+
+        pipeline = SpeechPipeline(EchoTranscriber(), reply, EchoSynthesizer())
+        started = time.perf_counter()
+        events = pipeline.run(b"hello")
+        self.assertEqual(next(events), ("transcript", {"text": "hello"}))
+        event, data = next(events)
+        self.assertEqual(event, "audio")
+        self.assertLess(time.perf_counter() - started, 0.25)
+        rest = list(events)
+        self.assertEqual(audio_texts(rest), ["The second one took a while."])
+        self.assertEqual(rest[-1][1]["sentences"], 2)
+
+    def test_concurrent_requests_are_isolated(self):
+        def reply(transcript, patient_id, site=None):
+            for i in range(3):
+                time.sleep(0.01)
+                yield f"Reply number {i} for {transcript}. "
+
+        pipeline = SpeechPipeline(EchoTranscriber(), reply, EchoSynthesizer())
+        results = {}
+
+        def run(name):
+            results[name] = audio_texts(pipeline.run(name.encode()))
+
+        threads = [threading.Thread(target=run, args=(f"patient{i}",)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for name, texts in results.items():
+            self.assertEqual(texts, [f"Reply number {i} for {name}." for i in range(3)])
+
+    def test_closing_stops_the_reply_stream(self):
+        closed = threading.Event()
+
+        def reply(transcript, patient_id, site=None):
+            try:
+                while True:
+                    yield "This sentence keeps on coming. "
+            finally:
+                closed.set()
+
+        events = SpeechPipeline(EchoTranscriber(), reply, EchoSynthesizer()).run(b"hi")
+        next(events)
+        next(events)
+        events.close()
+        self.assertTrue(closed.wait(1))
+
+    def test_failures_become_an_error_event(self):
+        def reply(transcript, patient_id, site=None):
+            yield "Almost there, one moment please. "
+            raise RuntimeError("model unavailable")
+
+        pipeline = SpeechPipeline(EchoTranscriber(), reply, EchoSynthesizer())
+        events = list(speech_event_stream(pipeline, b"hi", "anon_1", "speech.webm"))
+        self.assertTrue(events[0].startswith("event: transcript\n"))
+        self.assertTrue(events[-1].startswith("event: error\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
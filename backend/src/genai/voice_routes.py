@@ -0,0 +1,81 @@
+import base64
+
+from flask import Blueprint, Flask, Response, current_app, jsonify, request
+
+from config import LISTEN_DEADLINE_SECONDS
+from core.outbound import outbound
+from genai.audio_cache import CachedSynthesizer, audio_cache
+from genai.gpt import stream_chatgpt_response
+from genai.speech import TTS_MODEL, TTS_VOICE, OpenAISynthesizer, OpenAITranscriber, SpeechPipeline, speech_event_stream
+from hospital_data.routes import invalid_site, unknown_site
+from hospital_data.sites import InvalidSite, UnknownSite, get_site
+
+blueprint = Blueprint("voice", __name__)
+blueprint.register_error_handler(UnknownSite, unknown_site)
+blueprint.register_error_handler(InvalidSite, invalid_site)
+
+
+def register(app: Flask) -> None:
+    """
+    Speech to speech route. The OpenAI client behind transcription and TTS
+    is only created by the first call that needs it.
+    """
+    tts = CachedSynthesizer(OpenAISynthesizer(), audio_cache, "openai", TTS_MODEL, TTS_VOICE)
+    app.extensions["tts"] = tts
+    app.extensions["speech_pipeline"] = SpeechPipeline(OpenAITranscriber(), stream_chatgpt_response, tts)
+    app.register_blueprint(blueprint)
+
+
+@blueprint.route('/listen/<patient_id>', methods=['POST'])
+def listen_to_speech(patient_id:str):
+    """
+    Speech to speech: transcribe a question and stream the spoken reply
+    ---
+    consumes:
+      - multipart/form-data
+      - application/json
+    parameters:
+      - name: patient_id
+        in: path
+        type: string
+        required: true
+      - name: audio
+        in: formData
+        type: file
+        description: The recorded question (or JSON {"base64Audio"} with a data URL)
+      - name: site
+        in: query
+        type: string
+        required: false
+        description: The ED the patient is in, defaults to the main site
+    responses:
+      200:
+        description: text/event-stream of transcript, one audio event per sentence (base64 mp3) and done, or error
+      400:
+        description: No audio in the request
+      404:
+        description: Unknown site
+      503:
+        description: Transcription, TTS or the model is at its concurrency limit, retry after the Retry-After header
+    """
+    upload = request.files.get('audio')
+    if upload is not None:
+        audio_data, filename = upload.read(), upload.filename or "speech.webm"
+    else:
+        base64_audio = (request.get_json(silent=True) or {}).get('base64Audio') or ""
+        try:
+            audio_data = base64.b64decode(base64_audio.split(',')[-1], validate=True)
+        except ValueError:
+            audio_data = b""
+        filename = "speech.webm"
+    if not audio_data:
+        return jsonify({'error': 'audio is required'}), 400
+    site = get_site(request.args.get("site")).name
+    outbound("openai").check()
+    outbound("gemini").check()
+
+    return Response(
+        speech_event_stream(current_app.extensions["speech_pipeline"], audio_data, patient_id, filename, LISTEN_DEADLINE_SECONDS, site),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
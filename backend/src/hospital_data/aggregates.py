@@ -0,0 +1,149 @@
+import math
+
+from collections import Counter
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+TRIAGE_CATEGORIES = [1, 2, 3, 4, 5]
+
+
+def as_triage_category(value: Any) -> Optional[int]:
+    """The feed and sqlite hand back triage categories as int or str, compare them as int."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def as_wait_time(value: Any) -> Optional[int]:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def nearest_rank(sorted_values: Sequence[int], q: float) -> int:
+    """The q quantile of sorted_values by nearest rank, 0 when there are none."""
+    if not sorted_values:
+        return 0
+    return sorted_values[max(1, math.ceil(q * len(sorted_values))) - 1]
+
+
+def counted_nearest_rank(counts: Mapping[int, int], q: float) -> int:
+    """nearest_rank over a value -> multiplicity mapping, without expanding it."""
+    total = sum(counts.values())
+    if not total:
+        return 0
+    rank = max(1, math.ceil(q * total))
+    seen = 0
+    for value in sorted(counts):
+        seen += counts[value]
+        if seen >= rank:
+            return value
+    return value
+
+
+class CategoryAggregate:
+    def __init__(self):
+        self.count = 0
+        self.wait_sum = 0
+        self._wait_counts: Counter = Counter()
+        self._max_wait: Optional[int] = None
+
+    def add(self, wait_time: Optional[int]) -> None:
+        self.count += 1
+        if wait_time is None:
+            return
+        self.wait_sum += wait_time
+        self._wait_counts[wait_time] += 1
+        if self._max_wait is None or wait_time > self._max_wait:
+            self._max_wait = wait_time
+
+    def remove(self, wait_time: Optional[int]) -> None:
+        self.count -= 1
+        if wait_time is None:
+            return
+        self.wait_sum -= wait_time
+        self._wait_counts[wait_time] -= 1
+        if not self._wait_counts[wait_time]:
+            del self._wait_counts[wait_time]
+            if wait_time == self._max_wait:
+                # only removing the last copy of the max needs a rescan
+                self._max_wait = max(self._wait_counts, default=None)
+
+    @property
+    def mean_wait(self) -> int:
+        # patients without a usable wait still count towards the average
+        return int(self.wait_sum / self.count) if self.count else 0
+
+    @property
+    def max_wait(self) -> Optional[int]:
+        return self._max_wait
+
+    def percentile(self, q: float) -> int:
+        """
+        Exact, by nearest rank over the waits that aren't negative, the same
+        definition PatientStore.category_summary uses. The distinct waits are
+        sorted per call, a few hundred at most, not every patient.
+        """
+        return counted_nearest_rank({w: n for w, n in self._wait_counts.items() if w >= 0}, q)
+
+
+class TriageAggregates:
+    """Per triage category count, wait sum, max and p50/p90, updated one patient at a time."""
+
+    def __init__(self):
+        self.categories: Dict[int, CategoryAggregate] = {
+            category: CategoryAggregate() for category in TRIAGE_CATEGORIES
+        }
+
+    def _aggregate(self, triage_category: Any) -> Optional[CategoryAggregate]:
+        return self.categories.get(as_triage_category(triage_category))
+
+    def add(self, triage_category: Any, wait_time: Any) -> None:
+        aggregate = self._aggregate(triage_category)
+        if aggregate is not None:
+            aggregate.add(as_wait_time(wait_time))
+
+    def remove(self, triage_category: Any, wait_time: Any) -> None:
+        aggregate = self._aggregate(triage_category)
+        if aggregate is not None:
+            aggregate.remove(as_wait_time(wait_time))
+
+    def summary(self) -> "AggregateSummary":
+        ordered = [self.categories[category] for category in TRIAGE_CATEGORIES]
+        return AggregateSummary(
+            counts=[a.count for a in ordered],
+            mean_waits=[a.mean_wait for a in ordered],
+            max_waits=[a.max_wait for a in ordered],
+            p50_waits=[a.percentile(0.5) for a in ordered],
+            p90_waits=[a.percentile(0.9) for a in ordered],
+        )
+
+
+class AggregateSummary:
+    """Read-only per-category values, frozen when a snapshot is published."""
+
+    def __init__(
+        self,
+        counts: List[int],
+        mean_waits: List[int],
+        max_waits: List[Optional[int]],
+        p50_waits: List[int],
+        p90_waits: List[int],
+    ):
+        self.counts = counts
+        self.mean_waits = mean_waits
+        self.max_waits = max_waits
+        self.p50_waits = p50_waits
+        self.p90_waits = p90_waits
+
+    def mean_wait(self, triage_category: Any) -> int:
+        category = as_triage_category(triage_category)
+        if category not in TRIAGE_CATEGORIES:
+            return 0
+        return self.mean_waits[category - 1]
+
+    @property
+    def longest_wait(self) -> Optional[int]:
+        return max((w for w in self.max_waits if w is not None), default=None)
@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+
+from collections import deque
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterable, Iterator, List, Optional
+
+from config import DEFAULT_SITE
+
+# how many ingest cycles a reconnecting client can catch up on
+FEED_HISTORY = 1024
+HEARTBEAT_SECONDS = 15.0
+RECONNECT_MILLISECONDS = 5000
+
+
+class ChangeEvent:
+    __slots__ = ("version", "changed_ids", "aggregates_changed", "published_at")
+
+    def __init__(self, version: int, changed_ids: FrozenSet[str], aggregates_changed: bool):
+        self.version = version
+        self.changed_ids = changed_ids
+        self.aggregates_changed = aggregates_changed
+        self.published_at = time.time()
+
+    def affects(self, patient_id: str) -> bool:
+        return self.aggregates_changed or patient_id in self.changed_ids
+
+
+class ChangeFeed:
+    """
+    One in-process log of what each ingest cycle changed.
+
+    The ingester publishes once per cycle and every subscriber waits on the
+    same condition, so fan-out costs nothing per subscriber until a change
+    they care about arrives.
+    """
+
+    def __init__(self, history: int = FEED_HISTORY):
+        self.version = 0
+        self._events: Deque[ChangeEvent] = deque(maxlen=history)
+        self._cond = threading.Condition()
+
+    def publish(self, changed_ids: Iterable[str], aggregates_changed: bool, version: Optional[int] = None) -> int:
+        """Record one cycle's changes; version defaults to the next one and must only grow."""
+        with self._cond:
+            if version is None:
+                version = self.version + 1
+            if version <= self.version:
+                raise ValueError(f"change feed version {version} is not after {self.version}")
+            self.version = version
+            self._events.append(ChangeEvent(self.version, frozenset(changed_ids), aggregates_changed))
+            self._cond.notify_all()
+            return self.version
+
+    def can_resume(self, version: int) -> bool:
+        """Whether every event after version is still buffered."""
+        with self._cond:
+            if version > self.version:
+                return False
+            oldest = self._events[0].version if self._events else self.version + 1
+            return version >= oldest - 1
+
+    def wait(self, after_version: int, timeout: float) -> List[ChangeEvent]:
+        """Events newer than after_version, blocking up to timeout for the first one."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > after_version, timeout)
+            return [event for event in self._events if event.version > after_version]
+
+
+change_feed = ChangeFeed()
+# one feed per site, so a busy site's cycles don't wake another site's subscribers
+_site_feeds: Dict[str, ChangeFeed] = {DEFAULT_SITE: change_feed}
+_site_feeds_lock = threading.Lock()
+
+
+def site_feed(site: str) -> ChangeFeed:
+    """The change feed of site, created on first use."""
+    with _site_feeds_lock:
+        feed = _site_feeds.get(site)
+        if feed is None:
+            feed = _site_feeds[site] = ChangeFeed()
+        return feed
+
+
+def parse_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_sse(data: Any, event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def patient_event_stream(
+    patient_id: str,
+    render: Callable[[str], Optional[Dict[str, Any]]],
+    last_event_id: Optional[int] = None,
+    feed: ChangeFeed = change_feed,
+    heartbeat: float = HEARTBEAT_SECONDS,
+) -> Iterator[str]:
+    """
+    Server-sent events for one patient.
+
+    The current state is sent first unless the client is resuming from an
+    event id the feed still remembers and nothing relevant changed since.
+    After that a status event goes out only for cycles that touched this
+    patient or the category aggregates, with comment heartbeats in between.
+    """
+    yield f"retry: {RECONNECT_MILLISECONDS}\n\n"
+
+    version = feed.version
+    resumable = last_event_id is not None and feed.can_resume(last_event_id)
+    if resumable:
+        missed = feed.wait(last_event_id, timeout=0)
+        send_now = any(event.affects(patient_id) for event in missed)
+    else:
+        send_now = True
+    if send_now:
+        yield format_sse(render(patient_id), event="status", event_id=version)
+
+    while True:
+        events = feed.wait(version, heartbeat)
+        if not events:
+            yield ": heartbeat\n\n"
+            continue
+        if events[0].version > version + 1:
+            # fell behind the buffer, resend the full state
+            relevant = True
+        else:
+            relevant = any(event.affects(patient_id) for event in events)
+        version = events[-1].version
+        if relevant:
+            yield format_sse(render(patient_id), event="status", event_id=version)
@@ -1,19 +1,58 @@
 import requests
 import sqlite3
+import os
 from os import path
 from config import QUEUE_DATA_URL, DB_PATH
-from typing import Dict, Any
+from hospital_data.db import get_pool
+from core.outbound import outbound
+from core.singleflight import SingleFlight
+from typing import Dict, Any, Iterable, List, Tuple
 
-def save_hospital_data() -> None:
-    def _get_queue_data() -> Dict[str, Any]:
-        return requests.get(QUEUE_DATA_URL).json()
+PatientRow = Tuple[Any, ...]
 
-    if path.exists(DB_PATH):
-        return None
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+class InvalidQueuePayload(ValueError):
+    """The feed answered, but not with a queue, e.g. an error body."""
 
+_fetches = SingleFlight("ifem_fetch")
+
+PATIENT_COLUMNS = (
+    "anon_id",
+    "arrival_time",
+    "queue_global",
+    "queue_local",
+    "status",
+    "imaging",
+    "labs",
+    "triage_category",
+    "wait_time",
+)
+
+UPSERT_PATIENT_SQL = """
+    INSERT INTO patient_data (
+        anon_id,
+        arrival_time,
+        queue_global,
+        queue_local,
+        status,
+        imaging,
+        labs,
+        triage_category,
+        wait_time
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(anon_id) DO UPDATE SET
+        arrival_time = excluded.arrival_time,
+        queue_global = excluded.queue_global,
+        queue_local = excluded.queue_local,
+        status = excluded.status,
+        imaging = excluded.imaging,
+        labs = excluded.labs,
+        triage_category = excluded.triage_category,
+        wait_time = excluded.wait_time
+"""
+
+def create_patient_table(cursor: sqlite3.Cursor) -> None:
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS patient_data (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -28,53 +67,60 @@ def save_hospital_data() -> None:
             wait_time INTEGER
         )
     """)
-    queue_data = _get_queue_data()
-
-    for patient in queue_data['patients']:
-        anon_id = patient.get('id')
-        arrival_time = patient.get('arrival_time')
-        wait_time = patient.get('time_elapsed')
-
-        queue_global = patient.get('queue_position', {}).get('global')
-        queue_local = patient.get('queue_position', {}).get('category')
-        
-        status = patient.get('status', {}).get('current_phase')
-        
-        investigations = patient.get('status', {}).get('investigations', {})
-        imaging = investigations.get('imaging', 'NA')
-        labs = investigations.get('labs', 'NA')
-        
-        triage_category = patient.get('triage_category')
-
-        cursor.execute(
-            """
-            INSERT INTO patient_data (
-                anon_id,
-                arrival_time,
-                queue_global,
-                queue_local,
-                status,
-                imaging,
-                labs,
-                triage_category,
-                wait_time
-            )
-            VALUES (?,?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                anon_id,
-                arrival_time,
-                queue_global,
-                queue_local,
-                status,
-                imaging,
-                labs,
-                triage_category,
-                wait_time
-            )
-        )
 
-    conn.commit()
-    conn.close()
-    
-    print(f"Hospital data saved to {DB_PATH}")
\ No newline at end of file
+def fetch_queue_data(url: str = QUEUE_DATA_URL) -> Dict[str, Any]:
+    """The feed's current queue; concurrent fetches of the same url share one request."""
+    return _fetches.do(url, lambda: _get_queue_data(url))
+
+def _get_queue_data(url: str) -> Dict[str, Any]:
+    ifem = outbound("ifem", (requests.Timeout,))
+    with ifem.slot("queue") as timeout:
+        response = ifem.session.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+def queue_patients(payload: Any) -> List[Dict[str, Any]]:
+    """The payload's patients; raises InvalidQueuePayload rather than reading an error body as an empty ED."""
+    patients = payload.get('patients') if isinstance(payload, dict) else None
+    if not isinstance(patients, list) or not all(isinstance(patient, dict) for patient in patients):
+        raise InvalidQueuePayload(f"queue payload has no list of patients: {str(payload)[:200]}")
+    return patients
+
+def parse_patient_row(patient: Dict[str, Any]) -> PatientRow:
+    """Flatten one feed patient into a tuple ordered like PATIENT_COLUMNS."""
+    anon_id = patient.get('id')
+    arrival_time = patient.get('arrival_time')
+    wait_time = patient.get('time_elapsed')
+
+    queue_global = patient.get('queue_position', {}).get('global')
+    queue_local = patient.get('queue_position', {}).get('category')
+
+    status = patient.get('status', {}).get('current_phase')
+
+    investigations = patient.get('status', {}).get('investigations', {})
+    imaging = investigations.get('imaging', 'NA')
+    labs = investigations.get('labs', 'NA')
+
+    triage_category = patient.get('triage_category')
+
+    return (
+        anon_id,
+        arrival_time,
+        queue_global,
+        queue_local,
+        status,
+        imaging,
+        labs,
+        triage_category,
+        wait_time
+    )
+
+def upsert_patient_rows(cursor: sqlite3.Cursor, rows: Iterable[PatientRow]) -> None:
+    cursor.executemany(UPSERT_PATIENT_SQL, rows)
+
+def ensure_patient_table(db_path: str = DB_PATH) -> None:
+    """An empty patient table if there is none yet, so the API can serve before the first ingest."""
+    os.makedirs(path.dirname(db_path) or ".", exist_ok=True)
+    with get_pool(db_path).connection() as conn:
+        with conn:
+            create_patient_table(conn.cursor())
@@ -0,0 +1,150 @@
+import queue
+import sqlite3
+import threading
+
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Sequence
+
+from config import DB_PATH, DB_POOL_SIZE
+from core.instrumentation import count_query
+
+TABLE_COLUMNS = (
+    "id",
+    "anon_id",
+    "arrival_time",
+    "queue_global",
+    "queue_local",
+    "status",
+    "imaging",
+    "labs",
+    "triage_category",
+    "wait_time",
+)
+
+PRAGMAS = (
+    # readers keep going while the ingester commits
+    "PRAGMA journal_mode=WAL",
+    # WAL makes NORMAL durable enough, we can always re-ingest the feed
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# sqlite3 reuses a prepared statement whenever the same SQL string is executed
+# on a connection, so keep the query text stable and the cache roomy
+CACHED_STATEMENTS = 256
+# how often a caller waiting for a connection checks whether the pool was closed
+CLOSED_CHECK_SECONDS = 0.5
+
+
+@lru_cache(maxsize=None)
+def select_sql(columns: Sequence[str] = TABLE_COLUMNS, by_anon_id: bool = False) -> str:
+    unknown = set(columns) - set(TABLE_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown patient_data columns: {sorted(unknown)}")
+    sql = f"SELECT {', '.join(columns)} FROM patient_data"
+    if by_anon_id:
+        return sql + " WHERE anon_id = ? ORDER BY id DESC LIMIT 1"
+    return sql + " ORDER BY id"
+
+
+class ConnectionPool:
+    """
+    A small thread-safe pool of tuned sqlite connections for one database file.
+
+    Connections are handed out LIFO so a warm one (page cache, prepared
+    statements) is reused first, and callers block once size connections are
+    checked out. Closing it closes the idle connections right away and the
+    checked out ones when they are returned; it hands out none after that.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, size: int = DB_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=5.0,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        # counts every statement, for /metrics and the per request query histogram
+        conn.set_trace_callback(lambda statement: count_query())
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"The connection pool for {self.db_path} is closed")
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        while True:
+            try:
+                return self._idle.get(timeout=CLOSED_CHECK_SECONDS)
+            except queue.Empty:
+                # nothing is returned to a closed pool, so waiting would never end
+                if self._closed:
+                    raise RuntimeError(f"The connection pool for {self.db_path} is closed") from None
+
+    def _checkin(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.put(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._checkin(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = DB_PATH) -> ConnectionPool:
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(db_path, ConnectionPool(db_path))
+    return pool
+
+
+def close_pool(db_path: str = DB_PATH) -> None:
+    with _pools_lock:
+        pool: Optional[ConnectionPool] = _pools.pop(db_path, None)
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,103 @@
+import math
+
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+from config import ESTIMATOR_ALPHA, ESTIMATOR_BAND_Z
+from hospital_data.aggregates import TRIAGE_CATEGORIES
+
+# below this many departures a minute the category is treated as stalled and
+# the estimate falls back to the category's mean wait
+MIN_RATE_PER_MINUTE = 1e-3
+# ingests closer together than this are not a sample: one departure would read as a huge rate
+MIN_SAMPLE_SECONDS = 1.0
+
+# (rate per minute, variance of the rate) per category, None until observed
+Rates = Tuple[Optional[Tuple[float, float]], ...]
+
+
+class WaitEstimate(NamedTuple):
+    minutes: float
+    low: float
+    high: float
+
+
+class ServiceRate:
+    """Exponentially weighted mean and variance of one category's departures per minute."""
+
+    __slots__ = ("rate", "variance")
+
+    def __init__(self):
+        self.rate: Optional[float] = None
+        self.variance = 0.0
+
+    def observe(self, departures: int, minutes: float, alpha: float) -> None:
+        sample = departures / minutes
+        if self.rate is None:
+            self.rate = sample
+            return
+        diff = sample - self.rate
+        self.rate += alpha * diff
+        self.variance = (1 - alpha) * (self.variance + alpha * diff * diff)
+
+
+class ServiceRateEstimator:
+    """
+    Learns how fast each triage category is being served from successive ingests.
+
+    Every ingest reports how many patients left each category and how long
+    it has been since the previous one; each category keeps an EWMA of that
+    rate and of its variance, so an update is O(categories) and nothing is
+    rescanned. A patient at local position k then waits k / rate minutes.
+    The band combines the randomness of k departures (Poisson, variance
+    k / rate^2) with the uncertainty in the rate itself (delta method).
+    """
+
+    def __init__(self, alpha: float = ESTIMATOR_ALPHA, z: float = ESTIMATOR_BAND_Z, min_seconds: float = MIN_SAMPLE_SECONDS):
+        self.alpha = alpha
+        self.z = z
+        self.min_seconds = min_seconds
+        self.categories: Dict[int, ServiceRate] = {category: ServiceRate() for category in TRIAGE_CATEGORIES}
+
+    def observe(self, departures: Mapping[int, int], seconds: float, waiting: Optional[Mapping[int, int]] = None) -> bool:
+        """
+        Folds in one ingest's departures, unless the interval is too short or
+        more patients left a category than waiting says it held before; the
+        sample is dropped rather than skewing the rates. Returns whether it was used.
+        """
+        if seconds <= 0 or seconds < self.min_seconds:
+            return False
+        if waiting is not None and any(departures.get(c, 0) > waiting.get(c, 0) for c in self.categories):
+            return False
+        minutes = seconds / 60
+        for category, rate in self.categories.items():
+            rate.observe(departures.get(category, 0), minutes, self.alpha)
+        return True
+
+    def rates(self) -> Rates:
+        """Immutable copy of the learned rates, for a published snapshot."""
+        return tuple(
+            None if r.rate is None else (r.rate, r.variance)
+            for r in (self.categories[category] for category in TRIAGE_CATEGORIES)
+        )
+
+
+def rates_tag(rates: Rates) -> Tuple[Optional[float], ...]:
+    """
+    What of the rates is visible in whole-minute estimates: unknown and
+    stalled rates both mean falling back to the mean wait, and small changes
+    are rounded away.
+    """
+    return tuple(None if r is None or r[0] < MIN_RATE_PER_MINUTE else round(r[0], 3) for r in rates)
+
+
+def estimate_wait(rates: Rates, category: int, position: Optional[int], z: float = ESTIMATOR_BAND_Z) -> Optional[WaitEstimate]:
+    """Minutes until a patient at local position is seen, or None if the rate is unknown."""
+    if category not in TRIAGE_CATEGORIES or position is None or position < 1:
+        return None
+    learned = rates[category - 1] if rates else None
+    if learned is None or learned[0] < MIN_RATE_PER_MINUTE:
+        return None
+    rate, variance = learned
+    minutes = position / rate
+    spread = math.sqrt(position / rate ** 2 + position ** 2 * variance / rate ** 4)
+    return WaitEstimate(minutes, max(minutes - z * spread, 0.0), minutes + z * spread)
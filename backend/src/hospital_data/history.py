@@ -0,0 +1,94 @@
+import logging
+import os
+
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from config import HISTORY_DIR, HISTORY_RETENTION_DAYS
+from core.timeseries import DAY, STRING, Column, Level, Series, default_levels
+from hospital_data.aggregates import TRIAGE_CATEGORIES, AggregateSummary, as_triage_category, as_wait_time
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_COLUMNS = [
+    column
+    for category in TRIAGE_CATEGORIES
+    for column in (
+        Column(f"waiting_{category}", "f", "mean"),
+        Column(f"mean_wait_{category}", "f", "mean"),
+        Column(f"max_wait_{category}", "i", "max"),
+        Column(f"arrivals_{category}", "I", "sum"),
+        Column(f"departures_{category}", "I", "sum"),
+    )
+]
+
+# bounds of the "i" columns
+INT_MAX = 2 ** 31 - 1
+
+TRANSITION_COLUMNS = [
+    Column("anon_id", STRING),
+    Column("triage_category", "b"),
+    Column("phase", STRING),
+    Column("wait_time", "i"),
+]
+
+
+def _category(value: Any) -> int:
+    """0 for a missing or unknown category, which could also be out of range for "b"."""
+    category = as_triage_category(value)
+    return category if category in TRIAGE_CATEGORIES else 0
+
+
+def _clamp(value: int) -> int:
+    return max(-INT_MAX - 1, min(value, INT_MAX))
+
+
+class QueueHistory:
+    """
+    What the queue looked like at every ingest, kept apart from patient_data.
+
+    aggregates holds one row per ingest with each category's waiting count,
+    mean and max wait, arrivals and departures, rolled up into minute, hour
+    and day buckets as it ages. transitions holds one row per patient phase
+    change (including arriving and departing) and is only kept raw.
+    """
+
+    def __init__(self, directory: str = HISTORY_DIR, retention_days: Mapping[str, Optional[float]] = HISTORY_RETENTION_DAYS):
+        self.aggregates = Series(os.path.join(directory, "aggregates"), AGGREGATE_COLUMNS, default_levels(retention_days))
+        keep = retention_days.get("transitions")
+        self.transitions = Series(
+            os.path.join(directory, "transitions"),
+            TRANSITION_COLUMNS,
+            [Level("raw", 0, DAY, None if keep is None else keep * DAY)],
+        )
+
+    def record(
+        self,
+        at: float,
+        summary: AggregateSummary,
+        arrivals: Mapping[Optional[int], int],
+        departures: Mapping[Optional[int], int],
+        transitions: Iterable[Tuple[str, Any, str, Any]],
+    ) -> None:
+        """transitions are (anon_id, triage category, new phase, wait time)."""
+        values: Dict[str, Any] = {}
+        for i, category in enumerate(TRIAGE_CATEGORIES):
+            values[f"waiting_{category}"] = summary.counts[i]
+            values[f"mean_wait_{category}"] = summary.mean_waits[i]
+            values[f"max_wait_{category}"] = _clamp(summary.max_waits[i] or 0)
+            values[f"arrivals_{category}"] = arrivals.get(category, 0)
+            values[f"departures_{category}"] = departures.get(category, 0)
+        self.aggregates.append(at, values)
+
+        self.transitions.extend(
+            (at, {
+                "anon_id": anon_id,
+                "triage_category": _category(category),
+                "phase": phase,
+                "wait_time": _clamp(as_wait_time(wait_time) or 0),
+            })
+            for anon_id, category, phase, wait_time in transitions
+        )
+
+    def maintain(self, now: Optional[float] = None) -> None:
+        self.aggregates.maintain(now)
+        self.transitions.maintain(now)
@@ -1,9 +1,22 @@
-import sqlite3
-
 from config import DB_PATH
-from typing import List
+from core.instrumentation import count_rows
+from hospital_data.db import TABLE_COLUMNS, get_pool, select_sql
+from typing import Any, Dict, List, Optional, Sequence
 
 class Patient:
+    __slots__ = (
+        "id",
+        "anon_id",
+        "arrival_time",
+        "queue_global",
+        "queue_local",
+        "status",
+        "imaging",
+        "labs",
+        "triage_category",
+        "wait_time",
+    )
+
     def __init__(self, pid, anon_id, arrival_time, queue_global, queue_local, status, imaging, labs, triage_category, wait_time):
         self.id = pid
         self.anon_id = anon_id
@@ -17,28 +30,33 @@ class Patient:
         self.wait_time = wait_time
 
     def to_dict(self):
-        return self.__dict__
-
-def get_patient_data(patient_id: str) -> Patient:
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM patient_data WHERE anon_id = ? ORDER BY id DESC LIMIT 1", (patient_id,))
-    result = cursor.fetchone()
-    if result == None:
-        return None 
-    conn.close()
+        return {field: getattr(self, field) for field in self.__slots__}
+
+def get_patient_data(patient_id: str, db_path: str = DB_PATH) -> Optional[Patient]:
+    with get_pool(db_path).connection() as conn:
+        result = conn.execute(select_sql(TABLE_COLUMNS, by_anon_id=True), (patient_id,)).fetchone()
+    if result is None:
+        return None
+    count_rows(1)
     return Patient(*result)
 
 
-def get_all_patient_data() -> List[Patient]:
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM patient_data")
-    result = cursor.fetchall()
-    print("result:", result)
+def get_patient_fields(patient_id: str, columns: Sequence[str], db_path: str = DB_PATH) -> Optional[Dict[str, Any]]:
+    """Fetch only the named columns of one patient."""
+    columns = tuple(columns)
+    with get_pool(db_path).connection() as conn:
+        result = conn.execute(select_sql(columns, by_anon_id=True), (patient_id,)).fetchone()
+    if result is None:
+        return None
+    count_rows(1)
+    return dict(zip(columns, result))
+
+
+def get_all_patient_data(db_path: str = DB_PATH) -> List[Patient]:
+    with get_pool(db_path).connection() as conn:
+        result = conn.execute(select_sql(TABLE_COLUMNS)).fetchall()
+    count_rows(len(result))
     retlist = []
     for patient in result:
         retlist.append(Patient(*patient))
-    conn.close()
     return retlist
-
@@ -0,0 +1,400 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, asdict
+from collections import Counter
+from functools import partial
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from config import DB_PATH, DEFAULT_SITE, INGEST_INTERVAL_SECONDS, INGEST_RECORD_PATH, INGEST_WORKERS
+from hospital_data.create_db import (
+    PatientRow,
+    create_patient_table,
+    fetch_queue_data,
+    parse_patient_row,
+    queue_patients,
+    upsert_patient_rows,
+)
+from core.metrics import counter, histogram
+from hospital_data.aggregates import TriageAggregates, as_triage_category
+from hospital_data.changefeed import ChangeFeed, change_feed, site_feed
+from hospital_data.db import get_pool
+from hospital_data.estimator import ServiceRateEstimator
+from hospital_data.history import QueueHistory
+from hospital_data.ranking import QueueRanking
+from hospital_data.sites import Site, UnknownSite, sites as site_registry
+from hospital_data.snapshot import DEPARTED_STATUS, QueueSnapshot, publish_snapshot
+
+logger = logging.getLogger(__name__)
+
+ARRIVAL_INDEX = 1
+QUEUE_LOCAL_INDEX = 3
+STATUS_INDEX = 4
+TRIAGE_INDEX = 7
+WAIT_INDEX = 8
+
+
+@dataclass
+class IngestStats:
+    cycles: int = 0
+    failures: int = 0
+    last_duration_seconds: float = 0.0
+    max_duration_seconds: float = 0.0
+    total_duration_seconds: float = 0.0
+    last_rows_changed: int = 0
+    last_rows_departed: int = 0
+    total_rows_changed: int = 0
+    # ranked patients whose feed positions differ from the ranking's
+    last_rank_mismatches: int = 0
+    last_ingest_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = asdict(self)
+        stats["mean_duration_seconds"] = (
+            self.total_duration_seconds / self.cycles if self.cycles else 0.0
+        )
+        return stats
+
+
+class QueueIngester:
+    """
+    Polls the IFEM queue feed and keeps patient_data in sync with it.
+
+    Each cycle diffs the payload against the rows already stored, upserts the
+    new or changed anon_ids and marks the ones that left the feed as departed,
+    all in one transaction. Readers keep using the previously published
+    snapshot until the new one is swapped in. Departures per category feed
+    the service rate estimator, and with record_path set every payload is
+    appended to a JSON lines file the replay harness can score it against.
+    With a history, each cycle's aggregates and phase changes are appended
+    to it as well. The queue ranking is updated with the same changes, so
+    published positions reflect this cycle's arrivals and departures rather
+    than whenever the feed last renumbered. One ingester serves one site.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Dict[str, Any]] = fetch_queue_data,
+        db_path: str = DB_PATH,
+        interval: float = INGEST_INTERVAL_SECONDS,
+        feed: ChangeFeed = change_feed,
+        record_path: Optional[str] = INGEST_RECORD_PATH,
+        history: Optional[QueueHistory] = None,
+        site: str = DEFAULT_SITE,
+    ):
+        self.site = site
+        self.fetch = fetch
+        self.record_path = record_path
+        self.history = history
+        self.feed = feed
+        self.db_path = db_path
+        self.interval = interval
+        self.stats = IngestStats()
+        self._rows: Optional[Dict[str, PatientRow]] = None
+        self.aggregates = TriageAggregates()
+        self.ranking = QueueRanking()
+        self.estimator = ServiceRateEstimator()
+        self._last_fetched_at: Optional[float] = None
+        self.snapshot: Optional[QueueSnapshot] = None
+        self._cycle_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.cycle_seconds = histogram("ingest_cycle_seconds", "Duration of each successful queue ingest cycle", {"site": site})
+
+    def _load_rows(self, conn: sqlite3.Connection) -> Dict[str, PatientRow]:
+        create_patient_table(conn.cursor())
+        cursor = conn.execute(
+            """
+            SELECT anon_id, arrival_time, queue_global, queue_local, status,
+                   imaging, labs, triage_category, wait_time
+            FROM patient_data
+            """
+        )
+        rows = {row[0]: row for row in cursor}
+        for row in rows.values():
+            self._count(row)
+        return rows
+
+    def _count(self, row: PatientRow) -> None:
+        if row[STATUS_INDEX] != DEPARTED_STATUS:
+            self.aggregates.add(row[TRIAGE_INDEX], row[WAIT_INDEX])
+        self.ranking.update(row[0], row[TRIAGE_INDEX], row[ARRIVAL_INDEX], row[STATUS_INDEX])
+
+    def _uncount(self, row: Optional[PatientRow]) -> None:
+        if row is not None and row[STATUS_INDEX] != DEPARTED_STATUS:
+            self.aggregates.remove(row[TRIAGE_INDEX], row[WAIT_INDEX])
+
+    def _diff(self, patients: List[Dict[str, Any]]):
+        incoming = {}
+        for patient in patients:
+            row = parse_patient_row(patient)
+            incoming[row[0]] = row
+
+        changed = [row for anon_id, row in incoming.items() if self._rows.get(anon_id) != row]
+        departed = [
+            anon_id
+            for anon_id, row in self._rows.items()
+            if anon_id not in incoming and row[STATUS_INDEX] != DEPARTED_STATUS
+        ]
+        return changed, departed
+
+    def ingest_once(self) -> None:
+        with self._cycle_lock:
+            started = time.perf_counter()
+            try:
+                changed, departed = self._ingest()
+            except Exception as e:
+                # anywhere in the cycle, from the fetch to publishing the snapshot
+                self.stats.failures += 1
+                self.stats.last_error = str(e)
+                logger.exception(f"Queue ingest failed: {e}", extra={"site": self.site})
+                raise
+            self._record(time.perf_counter() - started, changed, departed)
+
+    def _ingest(self) -> Tuple[List[PatientRow], List[str]]:
+        """The cycle itself; returns the changed rows and the departed anon_ids."""
+        payload = self.fetch()
+        fetched_at = time.monotonic()
+        # an error body fails the cycle here, before it can read as everyone departing
+        patients = queue_patients(payload)
+        with get_pool(self.db_path).connection() as conn:
+            if self._rows is None:
+                self._rows = self._load_rows(conn)
+            changed, departed = self._diff(patients)
+            if changed or departed:
+                with conn:
+                    upsert_patient_rows(conn.cursor(), changed)
+                    conn.executemany(
+                        "UPDATE patient_data SET status = ? WHERE anon_id = ?",
+                        [(DEPARTED_STATUS, anon_id) for anon_id in departed],
+                    )
+
+        waiting = {category: aggregate.count for category, aggregate in self.aggregates.categories.items()}
+        arrivals = Counter()
+        transitions = []
+        for row in changed:
+            previous = self._rows.get(row[0])
+            if previous is None:
+                arrivals[as_triage_category(row[TRIAGE_INDEX])] += 1
+            if previous is None or previous[STATUS_INDEX] != row[STATUS_INDEX]:
+                transitions.append(row)
+            self._uncount(previous)
+            self._count(row)
+            self._rows[row[0]] = row
+        for anon_id in departed:
+            row = self._rows[anon_id]
+            self._uncount(row)
+            self._rows[anon_id] = row[:STATUS_INDEX] + (DEPARTED_STATUS,) + row[STATUS_INDEX + 1:]
+            self.ranking.discard(anon_id)
+            transitions.append(self._rows[anon_id])
+
+        departures = Counter(as_triage_category(self._rows[anon_id][TRIAGE_INDEX]) for anon_id in departed)
+        # the first cycle compares against whatever was on disk, over an unknown interval
+        if self._last_fetched_at is not None:
+            self.estimator.observe(departures, fetched_at - self._last_fetched_at, waiting)
+        self._last_fetched_at = fetched_at
+        if self.record_path:
+            self._append_record(payload)
+
+        # the rates move with every cycle's departures (or lack of them), even when no row does
+        if changed or departed or self.snapshot is None or self.estimator.rates() != self.snapshot.rates:
+            self._publish(changed, departed)
+        if self.history is not None:
+            self._append_history(arrivals, departures, transitions)
+        return changed, departed
+
+    def _publish(self, changed: List[PatientRow], departed: List[str]) -> None:
+        previous = self.snapshot
+        version = self.feed.version + 1
+        if changed or departed or previous is None:
+            snapshot = QueueSnapshot.load(
+                self.db_path, self.aggregates, version, self.estimator.rates(), self.site, self.ranking
+            )
+        else:
+            # only the rates changed: the same rows, without reading them again
+            snapshot = QueueSnapshot(
+                previous.store, self.aggregates, version, self.estimator.rates(), self.site, self.ranking
+            )
+        self.stats.last_rank_mismatches = snapshot.rank_mismatches
+        self.snapshot = snapshot
+        publish_snapshot(snapshot)
+
+        # the tag covers the counts, queue length, mean waits and service rates every patient's view depends on
+        aggregates_changed = previous is None or previous.aggregates_tag != snapshot.aggregates_tag
+        self.feed.publish([row[0] for row in changed] + departed, aggregates_changed, version)
+
+    def _append_record(self, payload: Dict[str, Any]) -> None:
+        try:
+            with open(self.record_path, "a") as f:
+                f.write(json.dumps({"at": time.time(), "payload": payload}) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not record queue payload to {self.record_path}: {e}")
+
+    def _append_history(self, arrivals: Counter, departures: Counter, transitions: List[PatientRow]) -> None:
+        try:
+            self.history.record(
+                time.time(),
+                self.snapshot.aggregates,
+                arrivals,
+                departures,
+                [(row[0], row[TRIAGE_INDEX], row[STATUS_INDEX], row[WAIT_INDEX]) for row in transitions],
+            )
+            self.history.maintain()
+        except (OSError, OverflowError, TypeError, ValueError) as e:
+            # a bad value or a full disk costs this cycle's history, never the ingest
+            logger.warning(f"Could not append to the queue history: {e}")
+
+    def _record(self, duration: float, changed: List[PatientRow], departed: List[str]) -> None:
+        stats = self.stats
+        stats.cycles += 1
+        stats.last_duration_seconds = duration
+        stats.max_duration_seconds = max(stats.max_duration_seconds, duration)
+        stats.total_duration_seconds += duration
+        stats.last_rows_changed = len(changed)
+        stats.last_rows_departed = len(departed)
+        stats.total_rows_changed += len(changed) + len(departed)
+        stats.last_ingest_at = time.time()
+        stats.last_error = None
+        self.cycle_seconds.observe(duration)
+        logger.info(
+            f"Queue ingest: {len(changed)} changed, {len(departed)} departed in {duration * 1000:.1f}ms",
+            extra={
+                "site": self.site,
+                "changed": len(changed),
+                "departed": len(departed),
+                "duration_ms": round(duration * 1000, 3),
+            },
+        )
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.ingest_once()
+            except Exception:
+                pass  # already counted and logged, try again next interval
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self) -> "QueueIngester":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="queue-ingester", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+class SiteIngesters:
+    """
+    One QueueIngester per site, all driven by one scheduler thread on a
+    shared pool of workers.
+
+    Every interval each site whose previous cycle has finished starts a new
+    one, so the feeds are fetched at the same time and a slow or large site
+    only delays its own next cycle (counted in ingest_cycles_skipped_total).
+    Each site keeps its own partition, aggregates, estimator, snapshots and
+    change feed.
+    """
+
+    def __init__(
+        self,
+        ingesters: Mapping[str, QueueIngester],
+        interval: float = INGEST_INTERVAL_SECONDS,
+        workers: int = INGEST_WORKERS,
+    ):
+        self.ingesters = dict(ingesters)
+        self.interval = interval
+        self.workers = max(1, min(workers, len(self.ingesters)))
+        self._pool = self._new_pool()
+        self._running: Dict[str, Future] = {}
+        self._running_lock = threading.Lock()
+        self._skipped = {
+            site: counter(
+                "ingest_cycles_skipped_total",
+                "Cycles not started because the site's previous one was still running",
+                {"site": site},
+            )
+            for site in self.ingesters
+        }
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def for_sites(cls, sites: Mapping[str, Site] = site_registry, **kwargs: Any) -> "SiteIngesters":
+        """An ingester per site, fetching its feed into its own DB and history."""
+        return cls({
+            name: QueueIngester(
+                fetch=partial(fetch_queue_data, site.queue_url),
+                db_path=site.db_path,
+                feed=site_feed(name),
+                history=QueueHistory(site.history_dir),
+                site=name,
+            )
+            for name, site in sites.items()
+        }, **kwargs)
+
+    def __getitem__(self, site: str) -> QueueIngester:
+        ingester = self.ingesters.get(site)
+        if ingester is None:
+            raise UnknownSite(site)
+        return ingester
+
+    def _new_pool(self) -> ThreadPoolExecutor:
+        # the workers are only started by the first submit
+        return ThreadPoolExecutor(self.workers, thread_name_prefix="site-ingest")
+
+    @staticmethod
+    def _cycle(ingester: QueueIngester) -> None:
+        try:
+            ingester.ingest_once()
+        except Exception:
+            pass  # ingest_once counts and logs a failure in any part of the cycle, try again next interval
+
+    def _submit_due(self) -> List[Future]:
+        started = []
+        with self._running_lock:
+            for site, ingester in self.ingesters.items():
+                running = self._running.get(site)
+                if running is not None and not running.done():
+                    self._skipped[site].inc()
+                    continue
+                self._running[site] = self._pool.submit(self._cycle, ingester)
+                started.append(self._running[site])
+        return started
+
+    def ingest_once(self) -> None:
+        """One cycle of every site not already mid-cycle, concurrently; returns when they are done."""
+        wait(self._submit_due())
+
+    def _run(self) -> None:
+        while True:
+            self._submit_due()
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self) -> "SiteIngesters":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="site-ingest-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._running_lock:
+            running = list(self._running.values())
+            wait(running, timeout)
+            # a fresh pool without threads, so the ingesters can be started again
+            pool, self._pool = self._pool, self._new_pool()
+        pool.shutdown(wait=False)
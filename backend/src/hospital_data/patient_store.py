@@ -0,0 +1,189 @@
+import zlib
+
+from array import array
+from bisect import bisect_left
+from itertools import compress, repeat
+from operator import eq, mul, ne
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from hospital_data.aggregates import TRIAGE_CATEGORIES, AggregateSummary, as_triage_category, as_wait_time, nearest_rank
+from hospital_data.hospital_api import Patient
+
+# stands in for NULL in the integer columns
+MISSING = -1
+
+
+def _encode_int(value: Any) -> int:
+    return MISSING if value is None else int(value)
+
+
+def _decode_int(value: int) -> Optional[int]:
+    return None if value == MISSING else value
+
+
+def _encode_category(value: Any) -> int:
+    # 0 marks a missing or out of range category, which no aggregate counts
+    category = as_triage_category(value)
+    return category if category in TRIAGE_CATEGORIES else 0
+
+
+class Categorical:
+    """Maps the handful of distinct status / investigation strings to small codes."""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]
+        self.codes: Dict[Optional[str], int] = {None: 0}
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code]
+
+
+class PatientStore:
+    """
+    Column-oriented copy of patient_data.
+
+    Numeric columns live in typed arrays, status, imaging and labs are
+    dictionary encoded, and anon_id maps to a row index. Patient objects are
+    only materialised for the rows a caller asks for.
+    """
+
+    def __init__(self):
+        self.ids = array('q')
+        self.anon_ids: List[str] = []
+        self.arrival_times: List[str] = []
+        self.queue_global = array('l')
+        self.queue_local = array('l')
+        self.status = array('H')
+        self.imaging = array('H')
+        self.labs = array('H')
+        self.triage_category = array('h')
+        self.wait_time = array('l')
+
+        self.statuses = Categorical()
+        self.investigations = Categorical()
+        self._index: Dict[str, int] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]]) -> "PatientStore":
+        """Build from rows ordered like db.TABLE_COLUMNS."""
+        store = cls()
+        for row in rows:
+            store.append(row)
+        return store
+
+    def append(self, row: Sequence[Any]) -> int:
+        pid, anon_id, arrival_time, queue_global, queue_local, status, imaging, labs, triage_category, wait_time = row
+        position = len(self.anon_ids)
+
+        self.ids.append(pid)
+        self.anon_ids.append(anon_id)
+        self.arrival_times.append(arrival_time)
+        self.queue_global.append(_encode_int(queue_global))
+        self.queue_local.append(_encode_int(queue_local))
+        self.status.append(self.statuses.encode(status))
+        self.imaging.append(self.investigations.encode(imaging))
+        self.labs.append(self.investigations.encode(labs))
+        self.triage_category.append(_encode_category(triage_category))
+        wait = as_wait_time(wait_time)
+        self.wait_time.append(MISSING if wait is None else wait)
+
+        # later rows for the same anon_id shadow earlier ones
+        self._index[anon_id] = position
+        return position
+
+    def __len__(self) -> int:
+        return len(self.anon_ids)
+
+    def row_of(self, anon_id: str) -> Optional[int]:
+        return self._index.get(anon_id)
+
+    def patient(self, row: int) -> Patient:
+        return Patient(
+            self.ids[row],
+            self.anon_ids[row],
+            self.arrival_times[row],
+            _decode_int(self.queue_global[row]),
+            _decode_int(self.queue_local[row]),
+            self.statuses.decode(self.status[row]),
+            self.investigations.decode(self.imaging[row]),
+            self.investigations.decode(self.labs[row]),
+            self.triage_category[row] or None,
+            _decode_int(self.wait_time[row]),
+        )
+
+    def row_tag(self, row: int) -> int:
+        """Checksum of one row, changes whenever any of its columns does."""
+        values = (
+            self.ids[row],
+            self.anon_ids[row],
+            self.arrival_times[row],
+            self.queue_global[row],
+            self.queue_local[row],
+            self.statuses.decode(self.status[row]),
+            self.investigations.decode(self.imaging[row]),
+            self.investigations.decode(self.labs[row]),
+            self.triage_category[row],
+            self.wait_time[row],
+        )
+        return zlib.crc32(repr(values).encode())
+
+    def find(self, anon_id: str) -> Optional[Patient]:
+        row = self.row_of(anon_id)
+        return None if row is None else self.patient(row)
+
+    def active_mask(self, excluded_status: Optional[str] = None) -> array:
+        """1 for rows whose status isn't excluded_status, 0 otherwise."""
+        code = self.statuses.codes.get(excluded_status) if excluded_status is not None else None
+        if code is None:
+            return array('B', repeat(1, len(self)))
+        return array('B', map(ne, self.status, repeat(code)))
+
+    def matching_rows(
+        self,
+        triage_category: Optional[int] = None,
+        status: Optional[str] = None,
+        excluded_status: Optional[str] = None,
+    ) -> List[int]:
+        """Row numbers passing every given filter, in storage order."""
+        mask = self.active_mask(excluded_status)
+        if triage_category is not None:
+            mask = array('B', map(mul, mask, map(eq, self.triage_category, repeat(triage_category))))
+        if status is not None:
+            code = self.statuses.codes.get(status)
+            if code is None:
+                return []
+            mask = array('B', map(mul, mask, map(eq, self.status, repeat(code))))
+        return list(compress(range(len(self)), mask))
+
+    def category_summary(self, active: Optional[array] = None) -> AggregateSummary:
+        """
+        Per triage category count, mean, max and percentiles over the columns.
+
+        Each step is an itertools/operator pipeline over the arrays, so the
+        per-row work stays in C instead of a Python loop per patient.
+        """
+        keys = self.triage_category if active is None else array('h', map(mul, self.triage_category, active))
+
+        counts, mean_waits, max_waits, p50_waits, p90_waits = [], [], [], [], []
+        for category in TRIAGE_CATEGORIES:
+            in_category = array('B', map(eq, keys, repeat(category)))
+            count = in_category.count(1)
+            waits = sorted(compress(self.wait_time, in_category))
+            waits = waits[bisect_left(waits, 0):]
+
+            counts.append(count)
+            # patients without a usable wait still count towards the average
+            mean_waits.append(int(sum(waits) / count) if count else 0)
+            max_waits.append(waits[-1] if waits else None)
+            p50_waits.append(nearest_rank(waits, 0.5))
+            p90_waits.append(nearest_rank(waits, 0.9))
+
+        return AggregateSummary(counts, mean_waits, max_waits, p50_waits, p90_waits)
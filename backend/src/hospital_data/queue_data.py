@@ -1,20 +1,121 @@
-from flask import current_app
-from typing import Tuple
-from hospital_data.hospital_api import get_patient_data, get_all_patient_data
+import logging
 
-def get_queue_stats(patient_id: str) -> Tuple[int, int, int]:
-    patient_list = get_all_patient_data()
-    print("patient_list:", patient_list)
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from hospital_data.expected_time import compute_expected_time_seconds, get_patient_number_by_cat, get_wait_times_by_cat
+from hospital_data.snapshot import DEPARTED_STATUS, QueueSnapshot
 
-    patient_position_local = 0
-    patient_position_global = 0
-    total_in_queue = len(patient_list) # GET FOR TRIAGE CATEGORY
+# per-patient fields of the batch responses, each patient is one list in this order
+STATUS_COLUMNS = [
+    "anonId",
+    "arrivalTime",
+    "elapsedTime",
+    "triage",
+    "expectedTime",
+    "queuePositionLocal",
+    "queuePositionGlobal",
+    "labs",
+    "imaging",
+    "currentPhase",
+]
+MAX_BATCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
-    for patient in patient_list:
-        if patient.anon_id == patient_id:
-            patient_position_local = patient.queue_local
-            patient_position_global= patient.queue_global
+logger = logging.getLogger(__name__)
 
-    current_app.logger.info(patient_list)
+def get_queue_stats(patient_id: str, snapshot: Optional[QueueSnapshot] = None) -> Tuple[int, int, int]:
+    snapshot = snapshot or QueueSnapshot.load()
+    queue_stats = snapshot.queue_stats(patient_id) # GET FOR TRIAGE CATEGORY
+    logger.debug("Queue stats", extra={"patient_id": patient_id, "patients": snapshot.total_patients})
+    return queue_stats
 
-    return (patient_position_local, patient_position_global, total_in_queue) 
+def get_patient_status(patient_id: str, snapshot: Optional[QueueSnapshot] = None) -> Dict[str, Any]:
+    snapshot = snapshot or QueueSnapshot.load()
+    queue_data = get_queue_stats(patient_id, snapshot)
+    patient_data = snapshot.get_patient(patient_id)
+    expected_time = compute_expected_time_seconds(patient_id, snapshot)
+    if expected_time == -1:
+        return {"error": f"no such patient_id {patient_id}"}
+    expected_low, expected_high = snapshot.expected_time_band(snapshot.store.row_of(patient_id))
+
+    return {
+        "site": snapshot.site,
+        "arrivalTime": patient_data.arrival_time,
+        "elapsedTime": patient_data.wait_time,
+        "triage": patient_data.triage_category,
+        "expectedTime": expected_time,
+        "expectedTimeLow": expected_low,
+        "expectedTimeHigh": expected_high,
+        "queuePositionLocal": queue_data[0],
+        "queuePositionGlobal": queue_data[1],
+        "peopleAhead": snapshot.people_ahead(snapshot.store.row_of(patient_id)),
+        "queueMax": queue_data[2],
+        "allPatients": snapshot.total_patients,
+        "labs": patient_data.labs,
+        "imaging": patient_data.imaging,
+        "currentPhase": patient_data.status,
+        "patientNumberByCat": get_patient_number_by_cat(snapshot),
+        "expectedWaitTimesByCat": get_wait_times_by_cat(snapshot)
+    }
+
+def _shared_fields(snapshot: QueueSnapshot) -> Dict[str, Any]:
+    return {
+        "site": snapshot.site,
+        "allPatients": snapshot.total_patients,
+        "queueMax": snapshot.total_patients,
+        "patientNumberByCat": snapshot.patient_number_by_cat(),
+        "expectedWaitTimesByCat": snapshot.wait_times_by_cat(),
+        "columns": STATUS_COLUMNS,
+    }
+
+def _status_row(snapshot: QueueSnapshot, row: int) -> List[Any]:
+    patient = snapshot.store.patient(row)
+    queue_local, queue_global = snapshot.positions(row)
+    return [
+        patient.anon_id,
+        patient.arrival_time,
+        patient.wait_time,
+        patient.triage_category,
+        snapshot.expected_time_for_row(row),
+        queue_local,
+        queue_global,
+        patient.labs,
+        patient.imaging,
+        patient.status,
+    ]
+
+def get_batch_status(patient_ids: Iterable[str], snapshot: Optional[QueueSnapshot] = None) -> Dict[str, Any]:
+    snapshot = snapshot or QueueSnapshot.load()
+    rows, missing = [], []
+    for patient_id in dict.fromkeys(patient_ids):
+        row = snapshot.store.row_of(patient_id)
+        if row is None:
+            missing.append(patient_id)
+        else:
+            rows.append(_status_row(snapshot, row))
+
+    response = _shared_fields(snapshot)
+    response["rows"] = rows
+    response["missing"] = missing
+    return response
+
+def get_queue_page(
+    triage_category: Optional[int] = None,
+    phase: Optional[str] = None,
+    page: int = 1,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    snapshot: Optional[QueueSnapshot] = None,
+) -> Dict[str, Any]:
+    snapshot = snapshot or QueueSnapshot.load()
+    store = snapshot.store
+    rows = store.matching_rows(triage_category, phase, excluded_status=DEPARTED_STATUS)
+    # global queue order, patients without a position go last
+    rows.sort(key=lambda r: (snapshot.queue_global[r] < 0, snapshot.queue_global[r]))
+
+    start = (page - 1) * page_size
+    response = _shared_fields(snapshot)
+    response["page"] = page
+    response["pageSize"] = page_size
+    response["total"] = len(rows)
+    response["rows"] = [_status_row(snapshot, row) for row in rows[start:start + page_size]]
+    return response
@@ -0,0 +1,95 @@
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+from config import QUEUE_PHASES
+from hospital_data.aggregates import as_triage_category
+
+# sorts after every real category, for rows the feed sent without one
+_NO_CATEGORY = 99
+
+# (category, no arrival time, arrival time, anon_id), queue order
+RankKey = Tuple[int, bool, str, str]
+
+
+def rank_key(anon_id: str, triage_category: Any, arrival_time: Optional[str]) -> RankKey:
+    category = as_triage_category(triage_category)
+    # ISO timestamps sort like the times they stand for; patients without one go last in their category
+    return (
+        _NO_CATEGORY if category is None else category,
+        arrival_time is None,
+        arrival_time or "",
+        anon_id,
+    )
+
+
+class QueueRanking:
+    """
+    Order statistic index over the waiting patients, by triage category then
+    arrival time.
+
+    The global queue is one sorted list, so each category's queue is a
+    contiguous slice of it: a patient's global position is their index and
+    their position in the category is that index minus where the category
+    starts, both O(log n). Arrivals, phase changes and departures are
+    O(log n) updates, so positions follow the feed without re-sorting it.
+    Only patients in one of phases are in the queue.
+    """
+
+    def __init__(self, phases: Iterable[str] = QUEUE_PHASES):
+        self.phases = frozenset(phases)
+        self._queue = SortedList()
+        self._keys: Dict[str, RankKey] = {}
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, anon_id: str) -> bool:
+        return anon_id in self._keys
+
+    def update(self, anon_id: str, triage_category: Any, arrival_time: Optional[str], phase: Optional[str]) -> None:
+        """Inserts, moves or drops the patient for their current category, arrival time and phase."""
+        key = rank_key(anon_id, triage_category, arrival_time) if phase in self.phases else None
+        previous = self._keys.get(anon_id)
+        if previous == key:
+            return
+        if previous is not None:
+            self._queue.remove(previous)
+            del self._keys[anon_id]
+        if key is not None:
+            self._queue.add(key)
+            self._keys[anon_id] = key
+
+    def discard(self, anon_id: str) -> None:
+        key = self._keys.pop(anon_id, None)
+        if key is not None:
+            self._queue.remove(key)
+
+    def rank(self, anon_id: str) -> Optional[Tuple[int, int]]:
+        """1-based (category, global) queue positions, None when the patient isn't waiting."""
+        key = self._keys.get(anon_id)
+        if key is None:
+            return None
+        index = self._queue.index(key)
+        category_start = self._queue.bisect_left((key[0],))
+        return (index - category_start + 1, index + 1)
+
+    def ahead(self, anon_id: str) -> Optional[int]:
+        """Patients who will be seen before this one."""
+        positions = self.rank(anon_id)
+        return None if positions is None else positions[1] - 1
+
+    def category_size(self, triage_category: Any) -> int:
+        category = as_triage_category(triage_category)
+        category = _NO_CATEGORY if category is None else category
+        return self._queue.bisect_left((category + 1,)) - self._queue.bisect_left((category,))
+
+    def positions(self) -> Iterator[Tuple[str, int, int]]:
+        """(anon_id, category position, global position) of every waiting patient, in queue order."""
+        local = 0
+        category = None
+        for index, key in enumerate(self._queue, 1):
+            if key[0] != category:
+                category, local = key[0], 0
+            local += 1
+            yield key[3], local, index
@@ -0,0 +1,113 @@
+"""
+Scores the service rate estimator against recorded queue payloads.
+
+Record with INGEST_RECORD_PATH set on the server, then
+
+    PYTHONPATH=src python -m hospital_data.replay ingest_record.jsonl --alpha 0.3
+
+Every payload is replayed in order through a fresh estimator. Each waiting
+patient's estimate is kept until they leave the feed, then compared with how
+long they actually took, next to the old category mean-wait answer.
+"""
+import argparse
+import json
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import ESTIMATOR_ALPHA
+from hospital_data.aggregates import TriageAggregates, as_triage_category, as_wait_time
+from hospital_data.create_db import PatientRow, parse_patient_row
+from hospital_data.estimator import ServiceRateEstimator, estimate_wait
+from hospital_data.ingest import QUEUE_LOCAL_INDEX, TRIAGE_INDEX, WAIT_INDEX
+
+# (seconds since the epoch, queue feed payload)
+Recording = Iterable[Tuple[float, Dict[str, Any]]]
+
+
+def load_recording(path: str) -> Iterator[Tuple[float, Dict[str, Any]]]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["at"], record["payload"]
+
+
+@dataclass
+class ReplayScore:
+    predictions: int = 0
+    absolute_error: float = 0.0
+    baseline_absolute_error: float = 0.0
+    covered: int = 0
+
+    def add(self, actual: float, minutes: float, low: float, high: float, baseline: float) -> None:
+        self.predictions += 1
+        self.absolute_error += abs(minutes - actual)
+        self.baseline_absolute_error += abs(baseline - actual)
+        self.covered += low <= actual <= high
+
+    def to_dict(self) -> Dict[str, Any]:
+        n = self.predictions
+        return {
+            "predictions": n,
+            "mae_minutes": self.absolute_error / n if n else None,
+            "baseline_mae_minutes": self.baseline_absolute_error / n if n else None,
+            "band_coverage": self.covered / n if n else None,
+        }
+
+
+def replay(recording: Recording, estimator: Optional[ServiceRateEstimator] = None) -> ReplayScore:
+    estimator = estimator or ServiceRateEstimator()
+    score = ReplayScore()
+    # anon_id -> (predicted at, minutes, low, high, baseline minutes) not yet resolved
+    pending: Dict[str, List[Tuple[float, float, float, float, float]]] = {}
+    previous: Optional[Dict[str, PatientRow]] = None
+    previous_at = 0.0
+
+    for at, payload in recording:
+        rows = {row[0]: row for row in map(parse_patient_row, payload.get("patients", []))}
+
+        if previous is not None:
+            departed = [anon_id for anon_id in previous if anon_id not in rows]
+            estimator.observe(
+                Counter(as_triage_category(previous[anon_id][TRIAGE_INDEX]) for anon_id in departed),
+                at - previous_at,
+            )
+            for anon_id in departed:
+                for predicted_at, minutes, low, high, baseline in pending.pop(anon_id, []):
+                    score.add((at - predicted_at) / 60, minutes, low, high, baseline)
+
+        aggregates = TriageAggregates()
+        for row in rows.values():
+            aggregates.add(row[TRIAGE_INDEX], row[WAIT_INDEX])
+        summary = aggregates.summary()
+        rates = estimator.rates()
+
+        for anon_id, row in rows.items():
+            category = as_triage_category(row[TRIAGE_INDEX])
+            estimate = estimate_wait(rates, category, row[QUEUE_LOCAL_INDEX], estimator.z)
+            if estimate is None:
+                continue
+            # the old answer was the category mean wait, minus what this patient already waited
+            waited = as_wait_time(row[WAIT_INDEX]) or 0
+            baseline = max(summary.mean_wait(category) - waited, 0)
+            pending.setdefault(anon_id, []).append((at, estimate.minutes, estimate.low, estimate.high, baseline))
+
+        previous, previous_at = rows, at
+
+    return score
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="JSON lines of {at, payload}, as written by the ingester")
+    parser.add_argument("--alpha", type=float, default=ESTIMATOR_ALPHA)
+    args = parser.parse_args()
+
+    score = replay(load_recording(args.recording), ServiceRateEstimator(alpha=args.alpha))
+    print(json.dumps(score.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
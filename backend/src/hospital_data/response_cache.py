@@ -0,0 +1,57 @@
+import threading
+
+from typing import Callable, Tuple
+
+from config import RESPONSE_CACHE_SIZE
+from core.cache import LRUCache
+from core.metrics import cache_hit_ratio, hit_ratio
+from core.singleflight import SingleFlight
+from hospital_data.snapshot import QueueSnapshot
+
+
+class PatientResponseCache:
+    """
+    Serialized GET /patient bodies keyed by (patient_id, snapshot version).
+
+    Only published snapshots are cached. The first request that sees a newer
+    version drops every body rendered for the previous one, so an ingest
+    invalidates the whole cache at once. Versions are per site, so each site
+    needs its own cache. Concurrent misses for the same body (a family
+    opening a shared link together) render it once.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, name: str = "patient_response"):
+        self._cache = LRUCache(maxsize)
+        self._version = 0
+        self._lock = threading.Lock()
+        self._renders = SingleFlight(name)
+        cache_hit_ratio(name, lambda: hit_ratio(self.hits, self.misses))
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def get(self, patient_id: str, snapshot: QueueSnapshot, render: Callable[[], str]) -> str:
+        if not snapshot.version:
+            return render()
+        if snapshot.version != self._version:
+            with self._lock:
+                if snapshot.version > self._version:
+                    self._cache.clear()
+                    self._version = snapshot.version
+
+        key = (patient_id, snapshot.version)
+        body = self._cache.get(key)
+        if body is None:
+            body = self._renders.do(key, lambda: self._render(key, render))
+        return body
+
+    def _render(self, key: Tuple[str, int], render: Callable[[], str]) -> str:
+        # stored before the flight ends, so a late caller finds it in the cache
+        body = render()
+        self._cache.set(key, body)
+        return body
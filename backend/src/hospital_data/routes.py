@@ -0,0 +1,405 @@
+import math
+
+from typing import Optional
+
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context
+
+from config import DEFAULT_SITE
+from hospital_data.aggregates import TRIAGE_CATEGORIES
+from hospital_data.changefeed import parse_event_id, patient_event_stream, site_feed
+from hospital_data.create_db import ensure_patient_table
+from hospital_data.ingest import SiteIngesters
+from hospital_data.queue_data import (
+    DEFAULT_PAGE_SIZE,
+    MAX_BATCH_SIZE,
+    MAX_PAGE_SIZE,
+    get_batch_status,
+    get_patient_status,
+    get_queue_page,
+)
+from hospital_data.response_cache import PatientResponseCache
+from hospital_data.sites import InvalidSite, UnknownSite, get_site, sites
+from hospital_data.snapshot import current_snapshot
+
+blueprint = Blueprint("status", __name__)
+
+
+def register(app: Flask) -> None:
+    """
+    Patient status, queue, ingest and history routes. They serve whatever the
+    site's DB holds, an empty queue until its first ingest has landed; the
+    ingesters are created here but only started by start_background_work.
+    """
+    for site in sites.values():
+        ensure_patient_table(site.db_path)
+    app.extensions["ingester"] = SiteIngesters.for_sites(sites)
+    app.extensions["patient_responses"] = {
+        name: PatientResponseCache(name="patient_response" if name == DEFAULT_SITE else f"patient_response_{name}")
+        for name in sites
+    }
+    app.register_blueprint(blueprint)
+
+
+@blueprint.errorhandler(UnknownSite)
+def unknown_site(e: UnknownSite):
+    return jsonify({"error": e.args[0]}), 404
+
+
+@blueprint.errorhandler(InvalidSite)
+def invalid_site(e: InvalidSite):
+    return jsonify({"error": e.args[0]}), 400
+
+
+def _site() -> str:
+    return get_site(request.args.get("site")).name
+
+
+class BadParameter(ValueError):
+    pass
+
+
+@blueprint.errorhandler(BadParameter)
+def bad_parameter(e: BadParameter):
+    return jsonify({"error": e.args[0]}), 400
+
+
+def _int_arg(name: str, default: Optional[int] = None) -> Optional[int]:
+    """An integer query parameter, default when absent; raises BadParameter when malformed."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadParameter(f"{name} must be an integer, not {value!r}") from None
+
+
+def _float_arg(name: str) -> Optional[float]:
+    """A finite number query parameter, None when absent; raises BadParameter when malformed."""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        number = math.nan
+    if not math.isfinite(number):
+        raise BadParameter(f"{name} must be a number, not {value!r}")
+    return number
+
+
+@blueprint.route("/patient/<patient_id>", methods=["GET"])
+def get_wait_times(patient_id: str):
+    """
+    Retrieve patient data
+    ---
+openapi: 3.0.0
+info:
+  title: Patient Queue API
+  version: 1.0.0
+description: API to retrieve patient wait time and queue data.
+paths:
+  /patient/{patient_id}:
+    get:
+      summary: Retrieve patient wait time and queue position
+      description: Get details about a patient's wait time, queue position, and arrival data.
+      parameters:
+        - name: patient_id
+          in: path
+          required: true
+          schema:
+            type: string
+          description: The ID of the patient
+        - name: site
+          in: query
+          required: false
+          schema:
+            type: string
+          description: The ED the patient is in, defaults to the main site
+      responses:
+        200:
+          description: Successful response with patient data
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  site:
+                    type: string
+                    description: The ED the patient is in
+                  arrivalTime:
+                    type: string
+                    format: date-time
+                    description: The arrival time of the patient
+                  elapsedTime:
+                    type: integer
+                    description: Time already spent in queue (minutes)
+                  triage:
+                    type: string
+                    description: Triage category of the patient
+                  expectedTime:
+                    type: integer
+                    description: Expected total wait in minutes, the time already waited included
+                  expectedTimeLow:
+                    type: integer
+                    nullable: true
+                    description: Lower end of the expectedTime confidence band in minutes, null until service rates are learned
+                  expectedTimeHigh:
+                    type: integer
+                    nullable: true
+                    description: Upper end of the expectedTime confidence band in minutes
+                  queuePositionLocal:
+                    type: integer
+                    nullable: true
+                    description: Patient's position in local queue, null when not waiting
+                  queuePositionGlobal:
+                    type: integer
+                    nullable: true
+                    description: Patient's position in the global queue, null when not waiting
+                  peopleAhead:
+                    type: integer
+                    nullable: true
+                    description: Patients who will be seen before this one, null when not waiting
+                  queueMax:
+                    type: integer
+                    description: Maximum queue length
+                  allPatients:
+                    type: integer
+                    description: Total number of patients in the system
+        400:
+          description: Invalid request due to missing or malformed patient_id
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  error:
+                    type: string
+                    example: "Invalid patient_id format"
+        404:
+          description: Patient not found
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  error:
+                    type: string
+                    example: "no such patient_id {patient_id}"
+    """
+    site = _site()
+    snapshot = current_snapshot(site)
+    etag = snapshot.etag(patient_id)
+    if etag is not None and etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        responses = current_app.extensions["patient_responses"][site]
+        body = responses.get(patient_id, snapshot, lambda: current_app.json.dumps(get_patient_status(patient_id, snapshot)))
+        response = Response(body, mimetype="application/json")
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@blueprint.route("/patient/<patient_id>/events", methods=["GET"])
+def patient_events(patient_id: str):
+    """
+    Stream patient status updates
+    ---
+    parameters:
+      - name: patient_id
+        in: path
+        type: string
+        required: true
+        description: The ID of the patient
+      - name: Last-Event-ID
+        in: header
+        type: string
+        required: false
+        description: Id of the last status event received, sent automatically by EventSource on reconnect
+      - name: site
+        in: query
+        type: string
+        required: false
+        description: The ED the patient is in, defaults to the main site
+    responses:
+      200:
+        description: text/event-stream of "status" events carrying the same body as GET /patient/{patient_id}
+    """
+    site = _site()
+    last_event_id = parse_event_id(request.headers.get("Last-Event-ID") or request.args.get("lastEventId"))
+    stream = patient_event_stream(
+        patient_id, lambda pid: get_patient_status(pid, current_snapshot(site)), last_event_id, site_feed(site),
+    )
+    return Response(
+        stream_with_context(stream),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@blueprint.route("/patients/status", methods=["POST"])
+def get_patients_status():
+    """
+    Status of several patients at once
+    ---
+    parameters:
+      - name: patientIds
+        in: body
+        type: array
+        required: true
+        description: anon IDs of the patients to return, at most 500
+      - name: site
+        in: body
+        type: string
+        required: false
+        description: The ED the patients are in, defaults to the main site (also accepted as a query parameter)
+    responses:
+      200:
+        description: Shared queue fields (including site) once, plus one row per patient in "columns" order and the IDs that were not found under "missing"
+      400:
+        description: patientIds missing, not a list or too long, or site not a string
+      404:
+        description: Unknown site
+    """
+    data = request.get_json(silent=True) or {}
+    patient_ids = data.get("patientIds")
+    if not isinstance(patient_ids, list) or not all(isinstance(p, str) for p in patient_ids):
+        return jsonify({"error": "patientIds must be a list of strings"}), 400
+    if len(patient_ids) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"at most {MAX_BATCH_SIZE} patientIds per request"}), 400
+    site = get_site(data.get("site") or request.args.get("site")).name
+
+    return jsonify(get_batch_status(patient_ids, current_snapshot(site)))
+
+
+@blueprint.route("/queue", methods=["GET"])
+def get_queue():
+    """
+    Page through the patients currently in the ED
+    ---
+    parameters:
+      - name: triage
+        in: query
+        type: integer
+        required: false
+        description: Only patients in this triage category (1-5)
+      - name: phase
+        in: query
+        type: string
+        required: false
+        description: Only patients in this phase, e.g. triaged
+      - name: page
+        in: query
+        type: integer
+        required: false
+        description: 1-based page number
+      - name: pageSize
+        in: query
+        type: integer
+        required: false
+        description: Patients per page, at most 500
+      - name: site
+        in: query
+        type: string
+        required: false
+        description: The ED to list, defaults to the main site
+    responses:
+      200:
+        description: Shared queue fields once, plus one row per patient in global queue order
+      400:
+        description: Malformed filter or paging parameter
+    """
+    triage = _int_arg("triage")
+    page = _int_arg("page", 1)
+    page_size = _int_arg("pageSize", DEFAULT_PAGE_SIZE)
+    if triage is not None and triage not in TRIAGE_CATEGORIES:
+        return jsonify({"error": "triage must be between 1 and 5"}), 400
+    if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"page must be >= 1 and pageSize between 1 and {MAX_PAGE_SIZE}"}), 400
+
+    return jsonify(get_queue_page(triage, request.args.get("phase"), page, page_size, current_snapshot(_site())))
+
+
+@blueprint.route("/ingest/stats", methods=["GET"])
+def get_ingest_stats():
+    """
+    Queue feed ingestion statistics
+    ---
+    parameters:
+      - name: site
+        in: query
+        type: string
+        required: false
+        description: The ED whose feed to report on, defaults to the main site
+    responses:
+      200:
+        description: Cycle count, ingest latency and rows changed in the last cycle
+    """
+    return jsonify(current_app.extensions["ingester"][_site()].stats.to_dict())
+
+
+@blueprint.route("/history/<series>", methods=["GET"])
+def get_history(series: str):
+    """
+    Queue history over a time range
+    ---
+    parameters:
+      - name: series
+        in: path
+        type: string
+        required: true
+        description: aggregates (per category counts and waits per ingest) or transitions (patient phase changes)
+      - name: start
+        in: query
+        type: number
+        required: false
+        description: Unix time of the first sample
+      - name: end
+        in: query
+        type: number
+        required: false
+        description: Unix time just past the last sample
+      - name: columns
+        in: query
+        type: string
+        required: false
+        description: Comma separated columns to return, e.g. waiting_3,mean_wait_3. Defaults to all
+      - name: resolution
+        in: query
+        type: string
+        required: false
+        description: raw, minute, hour or day. Defaults to the finest one still covering start
+      - name: site
+        in: query
+        type: string
+        required: false
+        description: The ED whose history to read, defaults to the main site
+    responses:
+      200:
+        description: One list of values per column, ts holding the sample or bucket start times
+      400:
+        description: Unknown column or resolution, or malformed start or end
+      404:
+        description: Unknown series or site
+    """
+    start, end = _float_arg("start"), _float_arg("end")
+    queue_history = current_app.extensions["ingester"][_site()].history
+    store = {"aggregates": queue_history.aggregates, "transitions": queue_history.transitions}.get(series)
+    if store is None:
+        return jsonify({"error": f"Unknown history series {series}"}), 404
+    columns = request.args.get("columns")
+    resolution = request.args.get("resolution")
+    if resolution is not None and resolution not in {level.name for level in store.levels}:
+        return jsonify({"error": f"Unknown resolution {resolution}"}), 400
+    try:
+        rows = store.range(
+            start,
+            end,
+            columns.split(",") if columns else None,
+            resolution,
+        )
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 400
+    return jsonify(rows)
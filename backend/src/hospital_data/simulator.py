@@ -0,0 +1,353 @@
+"""
+A local stand-in for the IFEM feed, for load and scale tests.
+
+Serves /api/v1/queue, /api/v1/stats/current and /api/v1/patient/<id> in
+the same JSON shapes as the live feed, from either a simulated ED or a
+recording made with INGEST_RECORD_PATH, with simulated time running
+--speed times faster than the wall clock. Point the backend at it with
+IFEM_BASE_URL=http://127.0.0.1:5050.
+
+    PYTHONPATH=src python -m hospital_data.simulator --speed 60 --surge 30:60:5000
+    PYTHONPATH=src python -m hospital_data.simulator --replay ingest_record.jsonl --speed 10
+"""
+import argparse
+import bisect
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+from flask import Flask, jsonify
+
+from hospital_data.aggregates import TRIAGE_CATEGORIES
+from hospital_data.replay import Recording, load_recording
+
+# rough CTAS mix of an urban ED, most patients are category 3 to 5
+TRIAGE_WEIGHTS = [0.02, 0.13, 0.35, 0.30, 0.20]
+# mean minutes of treatment per category, once a bed is free
+TREATMENT_MINUTES = {1: 120, 2: 90, 3: 60, 4: 40, 5: 25}
+REGISTRATION_MINUTES = 5
+DISCHARGE_MINUTES = 20
+INVESTIGATION_MINUTES = 45
+# chance that labs or imaging are ordered at triage
+INVESTIGATION_ODDS = {"labs": 0.6, "imaging": 0.35}
+
+
+@dataclass(frozen=True)
+class Surge:
+    """arrivals extra patients spread over minutes, starting start minutes into the run."""
+
+    start: float
+    minutes: float
+    arrivals: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Surge":
+        start, minutes, arrivals = value.split(":")
+        return cls(float(start), float(minutes), int(arrivals))
+
+
+class SimulationClock:
+    """Simulated minutes since the start, running speed times faster than the wall clock."""
+
+    def __init__(self, speed: float = 1.0, start: Optional[datetime] = None, wall: Callable[[], float] = time.time):
+        self.speed = speed
+        self.start = start or datetime.now().replace(microsecond=0)
+        self.wall = wall
+        self.started_at = wall()
+
+    def minutes(self) -> float:
+        return (self.wall() - self.started_at) * self.speed / 60
+
+    def wall_time(self, minutes: float) -> float:
+        """When simulated minute minutes happens (or happened) on the wall clock."""
+        return self.started_at + minutes * 60 / self.speed
+
+    def timestamp(self, minutes: float) -> str:
+        return (self.start + timedelta(minutes=minutes)).isoformat()
+
+
+class FeedSource(Protocol):
+    def queue(self) -> Dict[str, Any]: ...
+
+    def first_seen(self, anon_id: str) -> Optional[float]: ...
+
+
+class _Patient:
+    __slots__ = ("anon_id", "category", "arrival", "phase", "labs", "imaging")
+
+    def __init__(self, anon_id: str, category: int, arrival: float):
+        self.anon_id = anon_id
+        self.category = category
+        self.arrival = arrival
+        self.phase = "registered"
+        self.labs = "NA"
+        self.imaging = "NA"
+
+
+class SimulatedED:
+    """
+    A stochastic ED: Poisson arrivals (plus any surges) with the usual triage
+    mix, registration, then a wait for one of beds treatment spaces in
+    (category, arrival) order, treatment and discharge, after which the
+    patient leaves the feed. Labs and imaging ordered at triage are reported
+    after a while. The state is advanced to the clock on every read.
+    """
+
+    def __init__(
+        self,
+        clock: SimulationClock,
+        arrivals_per_hour: float = 12.0,
+        beds: int = 20,
+        surges: Tuple[Surge, ...] = (),
+        initial_patients: int = 0,
+        seed: int = 0,
+    ):
+        self.clock = clock
+        self.arrivals_per_hour = arrivals_per_hour
+        self.beds = beds
+        self.rng = random.Random(seed)
+        self.patients: Dict[str, _Patient] = {}
+        self.in_treatment = 0
+        self.arrivals = 0
+        self.departures = 0
+        self._ids = itertools.count()
+        self._now = 0.0
+        # (minute, sequence, action, anon_id) for everything scheduled to happen
+        self._events: List[Tuple[float, int, str, str]] = []
+        self._sequence = itertools.count()
+        # (category, arrival, anon_id) of the patients waiting for a bed
+        self._waiting: List[Tuple[int, float, str]] = []
+        self._lock = threading.Lock()
+        self._payload: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
+        self._version = 0
+
+        for _ in range(initial_patients):
+            self._arrive(-self.rng.expovariate(1 / 60))
+        self._schedule(self._next_arrival(0.0), "arrive", "")
+        for surge in surges:
+            for _ in range(surge.arrivals):
+                self._schedule(surge.start + self.rng.random() * surge.minutes, "arrive", "surge")
+
+    def _schedule(self, at: float, action: str, anon_id: str) -> None:
+        heapq.heappush(self._events, (at, next(self._sequence), action, anon_id))
+
+    def _next_arrival(self, after: float) -> float:
+        if self.arrivals_per_hour <= 0:
+            return float("inf")
+        return after + self.rng.expovariate(self.arrivals_per_hour / 60)
+
+    def _arrive(self, at: float) -> None:
+        category = self.rng.choices(TRIAGE_CATEGORIES, TRIAGE_WEIGHTS)[0]
+        patient = _Patient(f"anon_{next(self._ids)}", category, at)
+        self.patients[patient.anon_id] = patient
+        self.arrivals += 1
+        self._schedule(max(at, self._now) + self.rng.expovariate(1 / REGISTRATION_MINUTES), "triage", patient.anon_id)
+
+    def _triage(self, patient: _Patient, at: float) -> None:
+        for kind, odds in INVESTIGATION_ODDS.items():
+            if self.rng.random() < odds:
+                setattr(patient, kind, "pending")
+                self._schedule(at + self.rng.expovariate(1 / INVESTIGATION_MINUTES), "report_" + kind, patient.anon_id)
+        patient.phase = "investigations_pending" if "pending" in (patient.labs, patient.imaging) else "triaged"
+        heapq.heappush(self._waiting, (patient.category, patient.arrival, patient.anon_id))
+
+    def _admit_waiting(self, at: float) -> None:
+        while self._waiting and self.in_treatment < self.beds:
+            _, _, anon_id = heapq.heappop(self._waiting)
+            patient = self.patients[anon_id]
+            patient.phase = "treatment"
+            self.in_treatment += 1
+            self._schedule(at + self.rng.expovariate(1 / TREATMENT_MINUTES[patient.category]), "discharge", anon_id)
+
+    def _step(self, at: float, action: str, anon_id: str) -> None:
+        if action == "arrive":
+            self._arrive(at)
+            if not anon_id:
+                # the Poisson stream schedules its own next arrival, surge arrivals are all scheduled up front
+                self._schedule(self._next_arrival(at), "arrive", "")
+            return
+        patient = self.patients.get(anon_id)
+        if patient is None:
+            return
+        if action == "triage":
+            self._triage(patient, at)
+        elif action.startswith("report_"):
+            setattr(patient, action[len("report_"):], "reported")
+            if patient.phase == "investigations_pending" and "pending" not in (patient.labs, patient.imaging):
+                patient.phase = "triaged"
+        elif action == "discharge":
+            patient.phase = "discharge_pending"
+            self.in_treatment -= 1
+            self._schedule(at + self.rng.expovariate(1 / DISCHARGE_MINUTES), "leave", anon_id)
+        elif action == "leave":
+            del self.patients[anon_id]
+            self.departures += 1
+        self._admit_waiting(at)
+
+    def advance(self, to: float) -> None:
+        """Applies every event up to simulated minute to."""
+        while self._events and self._events[0][0] <= to:
+            at, _, action, anon_id = heapq.heappop(self._events)
+            self._now = at
+            self._step(at, action, anon_id)
+            self._version += 1
+        self._now = max(self._now, to)
+
+    def queue(self) -> Dict[str, Any]:
+        """The /api/v1/queue payload at the clock's current time."""
+        with self._lock:
+            now = self.clock.minutes()
+            self.advance(now)
+            # time_elapsed is in whole minutes, so the payload only changes with the state or the minute
+            key = (self._version, int(now))
+            if self._payload is None or self._payload[0] != key:
+                self._payload = (key, self._render(now))
+            return self._payload[1]
+
+    def _render(self, now: float) -> Dict[str, Any]:
+        waiting = sorted(
+            (p for p in self.patients.values() if p.phase in ("triaged", "investigations_pending")),
+            key=lambda p: (p.category, p.arrival),
+        )
+        positions = {}
+        per_category = dict.fromkeys(TRIAGE_CATEGORIES, 0)
+        for position, patient in enumerate(waiting, 1):
+            per_category[patient.category] += 1
+            positions[patient.anon_id] = (position, per_category[patient.category])
+
+        patients = []
+        for patient in sorted(self.patients.values(), key=lambda p: p.arrival):
+            queue_global, queue_local = positions.get(patient.anon_id, (None, None))
+            patients.append({
+                "id": patient.anon_id,
+                "arrival_time": self.clock.timestamp(patient.arrival),
+                "triage_category": patient.category,
+                "queue_position": {"global": queue_global, "category": queue_local},
+                "status": {
+                    "current_phase": patient.phase,
+                    "investigations": {"labs": patient.labs, "imaging": patient.imaging},
+                },
+                "time_elapsed": int(now - patient.arrival),
+            })
+        return {"waitingCount": len(waiting), "patients": patients}
+
+    def first_seen(self, anon_id: str) -> Optional[float]:
+        """Wall clock time the patient arrived, the start for patients already there."""
+        patient = self.patients.get(anon_id)
+        if patient is None:
+            return None
+        return self.clock.wall_time(max(patient.arrival, 0.0))
+
+
+class RecordedFeed:
+    """
+    Replays recorded queue payloads: each one is served from its recorded
+    offset, divided by the clock's speed. After the last one the feed stays
+    on it, or starts over with loop.
+    """
+
+    def __init__(self, recording: Recording, clock: SimulationClock, loop: bool = False):
+        records = list(recording)
+        if not records:
+            raise ValueError("the recording holds no payloads")
+        self.clock = clock
+        self.loop = loop
+        first = records[0][0]
+        self.offsets = [(at - first) / 60 for at, _ in records]
+        self.payloads = [payload for _, payload in records]
+        self.length = self.offsets[-1]
+        # minute offset each anon_id first appears at
+        self._first_offsets: Dict[str, float] = {}
+        for offset, payload in zip(self.offsets, self.payloads):
+            for patient in payload.get("patients", []):
+                self._first_offsets.setdefault(patient.get("id"), offset)
+
+    def _position(self) -> Tuple[int, float]:
+        """(number of completed passes, minutes into the current one)."""
+        now = self.clock.minutes()
+        if self.loop and self.length > 0:
+            return int(now // self.length), now % self.length
+        return 0, now
+
+    def queue(self) -> Dict[str, Any]:
+        _, offset = self._position()
+        return self.payloads[max(bisect.bisect_right(self.offsets, offset) - 1, 0)]
+
+    def first_seen(self, anon_id: str) -> Optional[float]:
+        offset = self._first_offsets.get(anon_id)
+        if offset is None:
+            return None
+        passes, _ = self._position()
+        return self.clock.wall_time(passes * self.length + offset)
+
+
+def current_stats(queue: Dict[str, Any], updated_at: str) -> Dict[str, Any]:
+    """The /api/v1/stats/current summary of one queue payload."""
+    counts = dict.fromkeys(map(str, TRIAGE_CATEGORIES), 0)
+    waits: Dict[str, List[int]] = {category: [] for category in counts}
+    for patient in queue.get("patients", []):
+        category = str(patient.get("triage_category"))
+        if category in counts:
+            counts[category] += 1
+            waits[category].append(patient.get("time_elapsed") or 0)
+    longest = max((wait for category_waits in waits.values() for wait in category_waits), default=0)
+    return {
+        "waitingCount": sum(counts.values()),
+        "longestWaitTime": longest,
+        "categoryBreakdown": counts,
+        "averageWaitTimes": {c: (sum(w) // len(w) if w else 0) for c, w in waits.items()},
+        "lastUpdated": updated_at,
+    }
+
+
+def create_feed_app(source: FeedSource, clock: SimulationClock) -> Flask:
+    app = Flask(__name__)
+
+    @app.route("/api/v1/queue")
+    def queue():
+        return jsonify(source.queue())
+
+    @app.route("/api/v1/stats/current")
+    def stats():
+        return jsonify(current_stats(source.queue(), clock.timestamp(clock.minutes())))
+
+    @app.route("/api/v1/patient/<anon_id>")
+    def patient(anon_id: str):
+        for found in source.queue().get("patients", []):
+            if found.get("id") == anon_id:
+                return jsonify(found)
+        return jsonify({"error": "Patient not found"}), 404
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--speed", type=float, default=1.0, help="simulated minutes per wall clock minute")
+    parser.add_argument("--replay", help="JSON lines of {at, payload} to replay instead of simulating")
+    parser.add_argument("--loop", action="store_true", help="start the replay over once it ends")
+    parser.add_argument("--arrivals-per-hour", type=float, default=12.0)
+    parser.add_argument("--beds", type=int, default=20)
+    parser.add_argument("--initial-patients", type=int, default=30)
+    parser.add_argument("--surge", type=Surge.parse, action="append", default=[],
+                        help="start:minutes:arrivals, e.g. 30:60:5000 for 5000 arrivals in an hour from minute 30")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    clock = SimulationClock(args.speed)
+    if args.replay:
+        source: FeedSource = RecordedFeed(load_recording(args.replay), clock, args.loop)
+    else:
+        source = SimulatedED(clock, args.arrivals_per_hour, args.beds, tuple(args.surge), args.initial_patients, args.seed)
+    create_feed_app(source, clock).run(port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import re
+
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+from config import DB_PATH, DEFAULT_SITE, HISTORY_DIR, QUEUE_DATA_URL, SITES, SITES_DIR
+
+# site names end up in file paths and query strings
+SITE_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class UnknownSite(KeyError):
+    def __init__(self, name: str):
+        super().__init__(f"Unknown site {name}")
+        self.name = name
+
+
+class InvalidSite(ValueError):
+    """A site given as something other than a name, e.g. a list in a JSON body."""
+
+    def __init__(self, name: Any):
+        super().__init__(f"site must be a string, not {type(name).__name__}")
+        self.name = name
+
+
+@dataclass(frozen=True)
+class Site:
+    """One ED: its feed and the partition (patient DB and history) its data is kept in."""
+
+    name: str
+    queue_url: str
+    db_path: str
+    history_dir: str
+
+
+def load_sites(
+    extra: Mapping[str, Mapping[str, Any]] = SITES,
+    default: str = DEFAULT_SITE,
+    directory: str = SITES_DIR,
+) -> Dict[str, Site]:
+    """
+    The default site, on the single-site settings, plus every site in extra.
+    Each extra site needs a queue_url; its db_path and history_dir default
+    to its own files under directory.
+    """
+    sites = {default: Site(default, QUEUE_DATA_URL, DB_PATH, HISTORY_DIR)}
+    for name, settings in extra.items():
+        if not SITE_NAME.match(name):
+            raise ValueError(f"Site name {name!r} may only hold letters, digits, _ and -")
+        if name in sites:
+            raise ValueError(f"Site {name} is configured twice")
+        sites[name] = Site(
+            name,
+            settings["queue_url"],
+            settings.get("db_path") or os.path.join(directory, f"{name}.db"),
+            settings.get("history_dir") or os.path.join(directory, name, "history"),
+        )
+    return sites
+
+
+sites = load_sites()
+
+
+def get_site(name: Optional[str] = None) -> Site:
+    """The named site, or the default one for None; raises InvalidSite or UnknownSite."""
+    if name is not None and not isinstance(name, str):
+        raise InvalidSite(name)
+    site = sites.get(name or DEFAULT_SITE)
+    if site is None:
+        raise UnknownSite(name)
+    return site
@@ -0,0 +1,200 @@
+import math
+import zlib
+
+from array import array
+from itertools import repeat
+from config import DB_PATH, DEFAULT_SITE
+from typing import Dict, List, Optional, Tuple
+from core.instrumentation import count_rows
+from core.singleflight import SingleFlight
+from hospital_data.aggregates import AggregateSummary, TriageAggregates
+from hospital_data.hospital_api import Patient
+from hospital_data.db import get_pool, select_sql
+from hospital_data.estimator import Rates, WaitEstimate, estimate_wait, rates_tag
+from hospital_data.patient_store import MISSING, PatientStore
+from hospital_data.ranking import QueueRanking
+from hospital_data.sites import get_site
+
+# status written by the ingester for patients that dropped out of the feed
+DEPARTED_STATUS = "departed"
+
+
+class QueueSnapshot:
+    """
+    A single load of the patient_data table.
+
+    Everything a request needs (patient lookup, queue stats, per-category
+    counts and average waits) is derived from one scan, so a page view costs
+    one query instead of one per helper. The ingester passes in the
+    aggregates it maintains so publishing a snapshot doesn't recompute them,
+    and its queue ranking, whose positions replace the feed's: patients it
+    doesn't rank (not in QUEUE_PHASES) have no position then. Each site has
+    its own snapshots, loaded from its own partition.
+    """
+
+    def __init__(
+        self,
+        store: PatientStore,
+        aggregates: Optional[TriageAggregates] = None,
+        version: int = 0,
+        rates: Rates = (),
+        site: str = DEFAULT_SITE,
+        ranking: Optional[QueueRanking] = None,
+    ):
+        self.site = site
+        # 0 for ad-hoc loads, published snapshots carry the site's change feed version
+        self.version = version
+        self.store = store
+        # service rates learned by the ingester, empty for ad-hoc loads
+        self.rates = rates
+        active = store.active_mask(DEPARTED_STATUS)
+        self.total_patients = active.count(1)
+        if aggregates is None:
+            self.aggregates: AggregateSummary = store.category_summary(active)
+        else:
+            self.aggregates = aggregates.summary()
+        self._rank(ranking)
+        self.aggregates_tag = zlib.crc32(repr((
+            self.total_patients,
+            self.ranked_patients,
+            self.aggregates.counts,
+            self.aggregates.mean_waits,
+            rates_tag(rates),
+        )).encode())
+
+    def _rank(self, ranking: Optional[QueueRanking]) -> None:
+        """Queue positions per row: the feed's for ad-hoc loads, otherwise the ranking's, MISSING for unranked rows."""
+        store = self.store
+        self.ranked_patients = 0
+        # ranked rows whose feed position disagrees, see IngestStats.last_rank_mismatches
+        self.rank_mismatches = 0
+        if ranking is None:
+            self.queue_local, self.queue_global = store.queue_local, store.queue_global
+            return
+        self.queue_local = array('l', repeat(MISSING, len(store)))
+        self.queue_global = array('l', repeat(MISSING, len(store)))
+        for anon_id, local, position in ranking.positions():
+            row = store.row_of(anon_id)
+            if row is None:
+                continue
+            self.ranked_patients += 1
+            if (store.queue_local[row], store.queue_global[row]) != (local, position):
+                self.rank_mismatches += 1
+            self.queue_local[row] = local
+            self.queue_global[row] = position
+
+    @classmethod
+    def load(
+        cls,
+        db_path: str = DB_PATH,
+        aggregates: Optional[TriageAggregates] = None,
+        version: int = 0,
+        rates: Rates = (),
+        site: str = DEFAULT_SITE,
+        ranking: Optional[QueueRanking] = None,
+    ) -> "QueueSnapshot":
+        with get_pool(db_path).connection() as conn:
+            store = PatientStore.from_rows(conn.execute(select_sql()))
+        count_rows(len(store))
+        return cls(store, aggregates, version, rates, site, ranking)
+
+    @property
+    def patients(self) -> List[Patient]:
+        """Materialises every patient still in the ED; avoid on hot paths."""
+        departed = self.store.statuses.codes.get(DEPARTED_STATUS)
+        return [
+            self.store.patient(row)
+            for row in range(len(self.store))
+            if self.store.status[row] != departed
+        ]
+
+    def get_patient(self, patient_id: str) -> Optional[Patient]:
+        return self.store.find(patient_id)
+
+    def etag(self, patient_id: str) -> Optional[str]:
+        """
+        Entity tag for a patient's status response.
+
+        Built from the patient's row, queue positions and the shared category
+        values rather than the bare version, so ingests that touch none of
+        them keep it valid.
+        """
+        row = self.store.row_of(patient_id)
+        if row is None:
+            return None
+        positions = f"{self.queue_local[row]},{self.queue_global[row]}".encode()
+        return f"{self.aggregates_tag:08x}-{zlib.crc32(positions, self.store.row_tag(row)):08x}"
+
+    def positions(self, row: int) -> Tuple[Optional[int], Optional[int]]:
+        """(category, global) queue position of a row, None when it has none, e.g. a patient in treatment."""
+        local, position = self.queue_local[row], self.queue_global[row]
+        return (None if local == MISSING else local, None if position == MISSING else position)
+
+    def people_ahead(self, row: int) -> Optional[int]:
+        position = self.queue_global[row]
+        return None if position == MISSING else max(position - 1, 0)
+
+    def queue_stats(self, patient_id: str) -> Tuple[int, int, int]:
+        row = self.store.row_of(patient_id)
+        if row is None:
+            return (0, 0, self.total_patients)
+        return (*self.positions(row), self.total_patients)
+
+    def wait_times_by_cat(self) -> List[int]:
+        return list(self.aggregates.mean_waits)
+
+    def patient_number_by_cat(self) -> List[int]:
+        return list(self.aggregates.counts)
+
+    def longest_wait_time(self) -> int:
+        return self.aggregates.longest_wait or 0
+
+    def wait_estimate(self, row: int) -> Optional[WaitEstimate]:
+        """Throughput based estimate of the minutes still to wait, if the rate is known."""
+        position = self.queue_local[row]
+        return estimate_wait(self.rates, self.store.triage_category[row], None if position == MISSING else position)
+
+    def expected_time_for_row(self, row: int) -> int:
+        """
+        Expected total wait in minutes: time already waited plus the estimate,
+        or the category's mean wait until the ingester has learned a rate.
+        """
+        estimate = self.wait_estimate(row)
+        if estimate is None:
+            return self.aggregates.mean_wait(self.store.triage_category[row])
+        return max(self.store.wait_time[row], 0) + round(estimate.minutes)
+
+    def expected_time_band(self, row: int) -> Tuple[Optional[int], Optional[int]]:
+        estimate = self.wait_estimate(row)
+        if estimate is None:
+            return (None, None)
+        waited = max(self.store.wait_time[row], 0)
+        return (waited + math.floor(estimate.low), waited + math.ceil(estimate.high))
+
+    def expected_time_seconds(self, patient_id: str) -> int:
+        row = self.store.row_of(patient_id)
+        if row is None:
+            return -1
+        return self.expected_time_for_row(row)
+
+
+_current_snapshots: Dict[str, QueueSnapshot] = {}
+# without an ingester every request loads the table and recomputes the category aggregates
+_loads = SingleFlight("snapshot_load")
+
+
+def publish_snapshot(snapshot: QueueSnapshot) -> None:
+    """Make snapshot the one served to readers of its site; the swap is a single assignment."""
+    _current_snapshots[snapshot.site] = snapshot
+
+
+def current_snapshot(site: str = DEFAULT_SITE) -> QueueSnapshot:
+    """
+    Latest published snapshot of site, or a fresh load when no ingester is
+    running; requests that miss at the same time share one load.
+    """
+    snapshot = _current_snapshots.get(site)
+    if snapshot is None:
+        db_path = get_site(site).db_path
+        return _loads.do(site, lambda: QueueSnapshot.load(db_path, site=site))
+    return snapshot
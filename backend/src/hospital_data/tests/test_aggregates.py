@@ -0,0 +1,92 @@
+import random
+import unittest
+
+from hospital_data.aggregates import TriageAggregates
+from hospital_data.patient_store import PatientStore
+from hospital_data.snapshot import QueueSnapshot
+
+
+def row(pid, anon_id, triage_category, wait_time):
+    return (pid, anon_id, "2025-01-25T19:55:53", pid, 1, "triaged", "NA", "NA", triage_category, wait_time)
+
+
+class TestPercentiles(unittest.TestCase):
+
+    def test_quantiles_follow_removals(self):
+        aggregates = TriageAggregates()
+        for wait in (10, 20, 30, 40, 200):
+            aggregates.add(3, wait)
+        summary = aggregates.summary()
+        self.assertEqual((summary.p50_waits[2], summary.p90_waits[2]), (30, 200))
+
+        aggregates.remove(3, 200)
+        self.assertEqual(aggregates.summary().p90_waits[2], 40)
+
+    def test_incremental_and_store_percentiles_agree(self):
+        rng = random.Random(3)
+        aggregates = TriageAggregates()
+        waiting = {}
+        for step in range(500):
+            anon_id = f"anon_{rng.randrange(60)}"
+            if anon_id in waiting:
+                aggregates.remove(*waiting.pop(anon_id))
+            else:
+                waiting[anon_id] = (rng.randint(1, 5), rng.choice((None, -3, rng.randrange(600))))
+                aggregates.add(*waiting[anon_id])
+
+        store = PatientStore.from_rows(
+            row(pid, anon_id, category, wait) for pid, (anon_id, (category, wait)) in enumerate(waiting.items(), 1)
+        )
+        incremental, scanned = aggregates.summary(), store.category_summary()
+        self.assertEqual(incremental.p50_waits, scanned.p50_waits)
+        self.assertEqual(incremental.p90_waits, scanned.p90_waits)
+
+
+class TestTriageAggregates(unittest.TestCase):
+
+    def test_add_and_remove(self):
+        aggregates = TriageAggregates()
+        aggregates.add(2, 100)
+        aggregates.add("2", 50)
+        aggregates.add(2, "n/a")
+        aggregates.add(4, 10)
+
+        summary = aggregates.summary()
+        self.assertEqual(summary.counts, [0, 3, 0, 1, 0])
+        self.assertEqual(summary.mean_waits, [0, 50, 0, 10, 0])
+        self.assertEqual(summary.max_waits, [None, 100, None, 10, None])
+        self.assertEqual(summary.longest_wait, 100)
+
+        aggregates.remove(2, 100)
+        summary = aggregates.summary()
+        self.assertEqual(summary.counts, [0, 2, 0, 1, 0])
+        self.assertEqual(summary.max_waits[1], 50)
+
+    def test_duplicate_max_survives_one_removal(self):
+        aggregates = TriageAggregates()
+        aggregates.add(3, 90)
+        aggregates.add(3, 90)
+        aggregates.remove(3, 90)
+        self.assertEqual(aggregates.summary().max_waits[2], 90)
+
+    def test_unknown_categories_are_ignored(self):
+        aggregates = TriageAggregates()
+        aggregates.add(None, 10)
+        aggregates.add(9, 10)
+        self.assertEqual(aggregates.summary().counts, [0, 0, 0, 0, 0])
+
+
+class TestExpectedTimeCategoryTypes(unittest.TestCase):
+
+    def test_string_category_matches_integer_rows(self):
+        snapshot = QueueSnapshot(PatientStore.from_rows([
+            row(1, "anon_1", "3", 30),
+            row(2, "anon_2", 3, 90),
+        ]))
+        self.assertEqual(snapshot.patient_number_by_cat(), [0, 0, 2, 0, 0])
+        self.assertEqual(snapshot.expected_time_seconds("anon_1"), 60)
+        self.assertEqual(snapshot.expected_time_seconds("anon_2"), 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
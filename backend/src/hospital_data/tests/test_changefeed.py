@@ -0,0 +1,76 @@
+import json
+import unittest
+
+from hospital_data.changefeed import ChangeFeed, format_sse, patient_event_stream
+
+
+def render(patient_id):
+    return {"patient": patient_id}
+
+
+def status_events(chunks):
+    return [chunk for chunk in chunks if "event: status" in chunk]
+
+
+class TestChangeFeed(unittest.TestCase):
+
+    def test_wait_returns_newer_events(self):
+        feed = ChangeFeed()
+        feed.publish(["anon_1"], aggregates_changed=False)
+        feed.publish(["anon_2"], aggregates_changed=True)
+        self.assertEqual([e.version for e in feed.wait(0, timeout=0)], [1, 2])
+        self.assertEqual([e.version for e in feed.wait(1, timeout=0)], [2])
+        self.assertEqual(feed.wait(2, timeout=0.01), [])
+
+    def test_resume_window(self):
+        feed = ChangeFeed(history=2)
+        for _ in range(4):
+            feed.publish([], aggregates_changed=False)
+        self.assertTrue(feed.can_resume(2))
+        self.assertFalse(feed.can_resume(1))
+        self.assertFalse(feed.can_resume(9))
+
+    def test_format_sse(self):
+        self.assertEqual(format_sse({"a": 1}, event="status", event_id=3), 'id: 3\nevent: status\ndata: {"a": 1}\n\n')
+
+
+class TestPatientEventStream(unittest.TestCase):
+
+    def setUp(self):
+        self.feed = ChangeFeed()
+
+    def stream(self, last_event_id=None):
+        return patient_event_stream("anon_1", render, last_event_id, feed=self.feed, heartbeat=0.01)
+
+    def test_sends_state_then_only_relevant_changes(self):
+        stream = self.stream()
+        self.assertTrue(next(stream).startswith("retry:"))
+        first = next(stream)
+        self.assertIn("id: 0", first)
+        self.assertEqual(json.loads(first.split("data: ")[1]), {"patient": "anon_1"})
+
+        self.feed.publish(["anon_2"], aggregates_changed=False)
+        self.assertEqual(next(stream), ": heartbeat\n\n")
+
+        self.feed.publish(["anon_1"], aggregates_changed=False)
+        self.assertIn("id: 2", next(stream))
+
+        self.feed.publish([], aggregates_changed=True)
+        self.assertIn("id: 3", next(stream))
+
+    def test_resume_skips_state_when_nothing_changed(self):
+        self.feed.publish(["anon_2"], aggregates_changed=False)
+        stream = self.stream(last_event_id=0)
+        chunks = [next(stream) for _ in range(3)]
+        self.assertEqual(status_events(chunks), [])
+
+    def test_resume_replays_missed_change(self):
+        self.feed.publish(["anon_1"], aggregates_changed=False)
+        self.feed.publish(["anon_2"], aggregates_changed=False)
+        stream = self.stream(last_event_id=0)
+        next(stream)
+        self.assertIn("id: 2", next(stream))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from contextlib import ExitStack
+
+from hospital_data.create_db import create_patient_table, upsert_patient_rows
+from hospital_data.db import ConnectionPool, close_pool, get_pool, select_sql
+from hospital_data.hospital_api import get_all_patient_data, get_patient_data, get_patient_fields
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        with get_pool(self.db_path).connection() as conn:
+            with conn:
+                create_patient_table(conn.cursor())
+                upsert_patient_rows(conn.cursor(), [
+                    ("anon_1", "2025-01-25T19:55:53", 2, 1, "triaged", "NA", "NA", 3, 40),
+                    ("anon_2", "2025-01-25T20:55:53", 1, 1, "treatment", "pending", "NA", 2, 20),
+                ])
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def test_connections_are_tuned_and_reused(self):
+        pool = get_pool(self.db_path)
+        with pool.connection() as first:
+            self.assertEqual(first.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(first.execute("PRAGMA synchronous").fetchone()[0], 1)
+        with pool.connection() as second:
+            self.assertIs(first, second)
+
+    def test_pool_is_bounded(self):
+        pool = ConnectionPool(self.db_path, size=2)
+        seen = set()
+        barrier = threading.Barrier(6)
+
+        def worker():
+            barrier.wait()
+            for _ in range(20):
+                with pool.connection() as conn:
+                    conn.execute(select_sql(("anon_id",))).fetchall()
+                    seen.add(id(conn))
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool.close()
+        self.assertLessEqual(len(seen), 2)
+
+    def test_close_also_closes_connections_still_checked_out(self):
+        pool = ConnectionPool(self.db_path, size=2)
+        with ExitStack() as checked_out:
+            busy = checked_out.enter_context(pool.connection())
+            with pool.connection() as idle:
+                pass
+            pool.close()
+            with self.assertRaises(sqlite3.ProgrammingError):
+                idle.execute("SELECT 1")
+            # still usable by whoever holds it until it is returned
+            busy.execute("SELECT 1")
+        with self.assertRaises(sqlite3.ProgrammingError):
+            busy.execute("SELECT 1")
+        with self.assertRaises(RuntimeError):
+            with pool.connection():
+                pass
+
+    def test_missing_patient_returns_connection(self):
+        pool = ConnectionPool(self.db_path, size=1)
+        for _ in range(3):
+            with pool.connection() as conn:
+                self.assertIsNone(conn.execute(select_sql(by_anon_id=True), ("missing",)).fetchone())
+        pool.close()
+        self.assertIsNone(get_patient_data("missing", self.db_path))
+
+    def test_lookups(self):
+        self.assertEqual(get_patient_data("anon_2", self.db_path).status, "treatment")
+        self.assertEqual(
+            get_patient_fields("anon_1", ["status", "wait_time"], self.db_path),
+            {"status": "triaged", "wait_time": 40},
+        )
+        self.assertEqual(len(get_all_patient_data(self.db_path)), 2)
+
+    def test_unknown_columns_are_rejected(self):
+        with self.assertRaises(ValueError):
+            select_sql(("anon_id", "1; DROP TABLE patient_data"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+
+from hospital_data.estimator import ServiceRateEstimator, estimate_wait
+from hospital_data.patient_store import PatientStore
+from hospital_data.replay import replay
+from hospital_data.snapshot import QueueSnapshot
+
+
+def feed_patient(anon_id, position, wait, category=3):
+    return {
+        "id": anon_id,
+        "triage_category": category,
+        "queue_position": {"global": position, "category": position},
+        "status": {"current_phase": "triaged", "investigations": {}},
+        "time_elapsed": wait,
+    }
+
+
+def steady_queue(cycles, served_per_cycle=1, interval=60.0, length=10):
+    """One category 3 queue where the front patients leave every interval and new ones join at the back."""
+    next_id = 0
+    waiting = []
+    for cycle in range(cycles):
+        del waiting[:served_per_cycle if cycle else 0]
+        while len(waiting) < length:
+            waiting.append((f"anon_{next_id}", cycle))
+            next_id += 1
+        payload = {"patients": [
+            feed_patient(anon_id, position, int((cycle - joined) * interval / 60))
+            for position, (anon_id, joined) in enumerate(waiting, start=1)
+        ]}
+        yield cycle * interval, payload
+
+
+class TestServiceRateEstimator(unittest.TestCase):
+
+    def test_learns_rate_and_scales_with_position(self):
+        estimator = ServiceRateEstimator(alpha=0.5)
+        for _ in range(10):
+            estimator.observe({3: 2}, 60)
+        rates = estimator.rates()
+        self.assertAlmostEqual(rates[2][0], 2.0)
+        self.assertIsNone(estimate_wait(rates, 1, 4))
+        near, far = estimate_wait(rates, 3, 1), estimate_wait(rates, 3, 8)
+        self.assertAlmostEqual(far.minutes, 4.0)
+        self.assertGreater(far.minutes, near.minutes)
+        self.assertLess(far.low, far.minutes)
+        self.assertGreater(far.high, far.minutes)
+
+    def test_implausible_samples_are_dropped(self):
+        estimator = ServiceRateEstimator()
+        self.assertTrue(estimator.observe({3: 2}, 60, waiting={3: 5}))
+        learned = estimator.rates()
+        # back to back ingests, and more departures than there were patients
+        self.assertFalse(estimator.observe({3: 1}, 0.01))
+        self.assertFalse(estimator.observe({3: 6}, 60, waiting={3: 5}))
+        self.assertEqual(estimator.rates(), learned)
+
+    def test_noisy_rate_widens_the_band(self):
+        steady, noisy = ServiceRateEstimator(), ServiceRateEstimator()
+        for departures in (2, 2, 2, 2, 2, 2):
+            steady.observe({3: departures}, 60)
+        for departures in (0, 4, 0, 4, 1, 3):
+            noisy.observe({3: departures}, 60)
+        steady_band = estimate_wait(steady.rates(), 3, 6)
+        noisy_band = estimate_wait(noisy.rates(), 3, 6)
+        self.assertGreater(noisy_band.high - noisy_band.low, steady_band.high - steady_band.low)
+
+    def test_snapshot_falls_back_to_mean_wait_without_rates(self):
+        store = PatientStore.from_rows([
+            (1, "anon_1", "2025-01-25T19:55:53", 1, 1, "triaged", "NA", "NA", 3, 30),
+            (2, "anon_2", "2025-01-25T19:55:53", 2, 4, "triaged", "NA", "NA", 3, 10),
+        ])
+        self.assertEqual(QueueSnapshot(store).expected_time_seconds("anon_2"), 20)
+
+        rates = (None, None, (0.5, 0.0), None, None)
+        snapshot = QueueSnapshot(store, rates=rates)
+        # waited 10, 4 ahead at half a patient per minute
+        self.assertEqual(snapshot.expected_time_seconds("anon_2"), 18)
+        low, high = snapshot.expected_time_band(1)
+        self.assertLess(low, 18)
+        self.assertGreater(high, 18)
+
+
+class TestReplay(unittest.TestCase):
+
+    def test_steady_queue_beats_the_mean_wait_baseline(self):
+        score = replay(steady_queue(30)).to_dict()
+        self.assertGreater(score["predictions"], 100)
+        self.assertLess(score["mae_minutes"], 1.0)
+        self.assertLess(score["mae_minutes"], score["baseline_mae_minutes"])
+        self.assertGreater(score["band_coverage"], 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,77 +1,74 @@
-import unittest
+import os
 import re
+import tempfile
+import unittest
 
-from src.hospital_data.hospital_api import get_hospital_state, get_patient_data, get_queue_data
-
-class TestAPIResponses(unittest.TestCase):
+from hospital_data.create_db import create_patient_table, parse_patient_row, upsert_patient_rows
+from hospital_data.db import close_pool, get_pool
+from hospital_data.hospital_api import get_all_patient_data, get_patient_data
 
-    def test_get_hospital_state(self):
-        data = get_hospital_state()
-                
-        wait_time_pattern = re.compile(r'^\d+$')
-        category_pattern = re.compile(r'^[1-5]$')
-        
-        self.assertIn('averageWaitTimes', data)
-        self.assertIn('categoryBreakdown', data)
+# the shape of one patient in the IFEM queue feed
+FEED_PATIENT = {
+    "id": "anon_1234",
+    "arrival_time": "2025-01-25T19:55:53.039708",
+    "triage_category": 3,
+    "queue_position": {"global": 7, "category": 2},
+    "status": {
+        "current_phase": "investigations_pending",
+        "investigations": {"labs": "pending", "imaging": "NA"},
+    },
+    "time_elapsed": 95,
+}
 
-        for key, value in data['averageWaitTimes'].items():
-            self.assertTrue(category_pattern.match(key))
-            self.assertTrue(wait_time_pattern.match(str(value)))
 
-        for key, value in data['categoryBreakdown'].items():
-            self.assertTrue(category_pattern.match(key))
-            self.assertTrue(wait_time_pattern.match(str(value)))
+class TestAPIResponses(unittest.TestCase):
+    """Feed payloads parsed, stored and read back, without calling the live feed."""
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        with get_pool(self.db_path).connection() as conn:
+            with conn:
+                create_patient_table(conn.cursor())
+                upsert_patient_rows(conn.cursor(), [
+                    parse_patient_row(FEED_PATIENT),
+                    parse_patient_row({"id": "anon_5678", "triage_category": 5, "queue_position": {}, "status": {}}),
+                ])
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
 
     def test_get_patient_data(self):
-        patient_id = "any_id"
-        data = get_patient_data(patient_id)
+        data = get_patient_data("anon_1234", self.db_path).to_dict()
 
-        print(data)
-        
         time_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+$')
         category_pattern = re.compile(r'^[1-5]$')
         id_pattern = re.compile(r'^\d+$')
         phase_pattern = re.compile(r'^\w+$')
 
-        self.assertIn('arrival_time', data)
         self.assertTrue(time_pattern.match(data['arrival_time']))
-
-        self.assertIn('id', data)
         self.assertTrue(id_pattern.match(str(data['id'])))
+        self.assertTrue(category_pattern.match(str(data['triage_category'])))
+        self.assertEqual((data['queue_global'], data['queue_local']), (7, 2))
+        self.assertTrue(phase_pattern.match(data['status']))
+        self.assertEqual((data['labs'], data['imaging']), ("pending", "NA"))
+        self.assertEqual(data['wait_time'], 95)
+
+    def test_missing_fields_fall_back_to_defaults(self):
+        data = get_patient_data("anon_5678", self.db_path)
+        self.assertEqual((data.labs, data.imaging), ("NA", "NA"))
+        self.assertIsNone(data.status)
+        self.assertIsNone(get_patient_data("any_id", self.db_path))
+
+    def test_get_all_patient_data(self):
+        self.assertEqual(
+            sorted(patient.anon_id for patient in get_all_patient_data(self.db_path)),
+            ["anon_1234", "anon_5678"],
+        )
 
-        self.assertIn('queue_position', data)
-        self.assertIn('category', data['queue_position'])
-        self.assertIn('global', data['queue_position'])
-
-        self.assertTrue(category_pattern.match(str(data['queue_position']['category'])))
-        self.assertTrue(id_pattern.match(str(data['queue_position']['global'])))
-
-        self.assertIn('status', data)
-        self.assertIn('current_phase', data['status'])
-        self.assertTrue(phase_pattern.match(data['status']['current_phase']))
-
-        self.assertIn('investigations', data['status'])
-        self.assertIn('imaging', data['status']['investigations'])
-        self.assertIn('labs', data['status']['investigations'])
-
-    """
-    def test_get_queue_data(self):
-        data = get_queue_data()
-                
-        wait_time_pattern = re.compile(r'^\d+$')
-        category_pattern = re.compile(r'^[1-5]$')
-
-        self.assertIn('averageWaitTimes', data)
-        self.assertIn('categoryBreakdown', data)
-
-        for key, value in data['averageWaitTimes'].items():
-            self.assertTrue(category_pattern.match(key))
-            self.assertTrue(wait_time_pattern.match(str(value)))
-
-        for key, value in data['categoryBreakdown'].items():
-            self.assertTrue(category_pattern.match(key))
-            self.assertTrue(wait_time_pattern.match(str(value)))
-    """
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,315 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from unittest import mock
+
+from hospital_data import snapshot as snapshot_module
+from hospital_data.changefeed import ChangeFeed
+from hospital_data.create_db import InvalidQueuePayload
+from hospital_data.db import close_pool
+from hospital_data.estimator import ServiceRateEstimator
+from hospital_data.history import QueueHistory
+from hospital_data.ingest import QueueIngester, SiteIngesters
+from hospital_data.sites import UnknownSite, load_sites
+from hospital_data.snapshot import DEPARTED_STATUS, QueueSnapshot, current_snapshot
+
+
+def feed_patient(anon_id, category=3, phase="triaged", wait=60, queue_global=1, queue_local=1):
+    return {
+        "id": anon_id,
+        "arrival_time": "2025-01-25T19:55:53.039708",
+        "triage_category": category,
+        "queue_position": {"global": queue_global, "category": queue_local},
+        "status": {
+            "current_phase": phase,
+            "investigations": {"labs": "pending", "imaging": "NA"},
+        },
+        "time_elapsed": wait,
+    }
+
+
+class TestQueueIngester(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.payload = {"patients": [feed_patient("anon_1"), feed_patient("anon_2", category=5)]}
+        self.feed = ChangeFeed()
+        self.ingester = QueueIngester(fetch=lambda: self.payload, db_path=self.db_path, interval=0.01, feed=self.feed)
+        # the cycles here run back to back
+        self.ingester.estimator = ServiceRateEstimator(min_seconds=0)
+
+    def tearDown(self):
+        self.ingester.stop()
+        close_pool(self.db_path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def _statuses(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return dict(conn.execute("SELECT anon_id, status FROM patient_data"))
+        finally:
+            conn.close()
+
+    def test_first_cycle_inserts_and_publishes(self):
+        self.ingester.ingest_once()
+        self.assertEqual(self.ingester.stats.last_rows_changed, 2)
+        self.assertEqual(current_snapshot().patient_number_by_cat(), [0, 0, 1, 0, 1])
+
+    def test_only_changed_rows_are_written(self):
+        self.ingester.ingest_once()
+        self.ingester.ingest_once()
+        self.assertEqual(self.ingester.stats.last_rows_changed, 0)
+
+        self.payload = {"patients": [feed_patient("anon_1", phase="treatment"), feed_patient("anon_2", category=5)]}
+        self.ingester.ingest_once()
+        self.assertEqual(self.ingester.stats.last_rows_changed, 1)
+        self.assertEqual(self._statuses()["anon_1"], "treatment")
+
+    def test_departed_patients_are_marked(self):
+        self.ingester.ingest_once()
+        self.payload = {"patients": [feed_patient("anon_1")]}
+        self.ingester.ingest_once()
+
+        self.assertEqual(self.ingester.stats.last_rows_departed, 1)
+        self.assertEqual(self._statuses()["anon_2"], DEPARTED_STATUS)
+        snapshot = current_snapshot()
+        self.assertEqual(snapshot.total_patients, 1)
+        self.assertEqual(snapshot.get_patient("anon_2").status, DEPARTED_STATUS)
+
+    def test_incremental_aggregates_match_full_rebuild(self):
+        self.ingester.ingest_once()
+        self.payload = {"patients": [
+            feed_patient("anon_1", category=2, wait=200),
+            feed_patient("anon_3", category=5, wait=15),
+        ]}
+        self.ingester.ingest_once()
+
+        incremental = current_snapshot().aggregates
+        rebuilt = QueueSnapshot.load(self.db_path).aggregates
+        self.assertEqual(incremental.counts, [0, 1, 0, 0, 1])
+        self.assertEqual(incremental.counts, rebuilt.counts)
+        self.assertEqual(incremental.mean_waits, rebuilt.mean_waits)
+        self.assertEqual(incremental.max_waits, rebuilt.max_waits)
+
+    def test_positions_follow_departures_before_the_feed_renumbers(self):
+        self.payload = {"patients": [
+            feed_patient("anon_1", queue_global=1, queue_local=1),
+            feed_patient("anon_2", queue_global=2, queue_local=2),
+            feed_patient("anon_3", category=5, queue_global=3, queue_local=1),
+        ]}
+        self.ingester.ingest_once()
+        self.assertEqual(self.ingester.stats.last_rank_mismatches, 0)
+
+        # anon_1 is gone but the feed hasn't renumbered the others yet
+        self.payload = {"patients": self.payload["patients"][1:]}
+        self.ingester.ingest_once()
+        snapshot = current_snapshot()
+        self.assertEqual(snapshot.queue_stats("anon_2"), (1, 1, 2))
+        self.assertEqual(snapshot.queue_stats("anon_3"), (1, 2, 2))
+        self.assertEqual(snapshot.people_ahead(snapshot.store.row_of("anon_3")), 1)
+        self.assertEqual(self.ingester.stats.last_rank_mismatches, 2)
+        self.assertEqual(self.ingester.ranking.rank("anon_3"), (1, 2))
+
+        # in treatment, a patient leaves the queue, whatever position the feed still reports
+        self.payload = {"patients": [feed_patient("anon_2", phase="treatment"), feed_patient("anon_3", category=5)]}
+        self.ingester.ingest_once()
+        snapshot = current_snapshot()
+        self.assertEqual(snapshot.queue_stats("anon_2"), (None, None, 2))
+        self.assertIsNone(snapshot.people_ahead(snapshot.store.row_of("anon_2")))
+        self.assertEqual(snapshot.queue_stats("anon_3"), (1, 1, 2))
+        self.assertEqual(snapshot.people_ahead(snapshot.store.row_of("anon_3")), 0)
+
+    def test_change_feed_gets_one_event_per_changing_cycle(self):
+        self.ingester.ingest_once()
+        self.assertEqual(self.feed.version, 1)
+        # the first rates are learned: republished, though no row changed and no estimate shows them yet
+        self.ingester.ingest_once()
+        event = self.feed.wait(1, timeout=0)[0]
+        self.assertEqual((event.changed_ids, event.aggregates_changed), (frozenset(), False))
+        self.assertEqual(self.ingester.snapshot.rates, self.ingester.estimator.rates())
+        # nothing left to change
+        self.ingester.ingest_once()
+        self.assertEqual(self.feed.version, 2)
+
+        # still waiting, so nobody else's position moves
+        self.payload = {"patients": [feed_patient("anon_1", phase="investigations_pending"), feed_patient("anon_2", category=5)]}
+        self.ingester.ingest_once()
+        event = self.feed.wait(2, timeout=0)[0]
+        self.assertEqual(event.changed_ids, frozenset({"anon_1"}))
+        self.assertFalse(event.aggregates_changed)
+
+        self.payload = {"patients": [feed_patient("anon_1", phase="investigations_pending")]}
+        self.ingester.ingest_once()
+        event = self.feed.wait(3, timeout=0)[0]
+        self.assertEqual(event.changed_ids, frozenset({"anon_2"}))
+        self.assertTrue(event.aggregates_changed)
+
+    def test_failed_fetch_is_counted(self):
+        def broken_fetch():
+            raise ConnectionError("feed unavailable")
+
+        self.ingester.fetch = broken_fetch
+        with self.assertRaises(ConnectionError):
+            self.ingester.ingest_once()
+        self.assertEqual(self.ingester.stats.failures, 1)
+        self.assertEqual(self.ingester.stats.last_error, "feed unavailable")
+
+    def test_error_payload_is_a_failed_fetch_not_an_empty_ed(self):
+        self.ingester.ingest_once()
+        self.ingester.ingest_once()
+        published, rates = current_snapshot(), self.ingester.estimator.rates()
+        for payload in ({"error": "upstream overloaded"}, {"patients": None}, ["anon_1"]):
+            self.payload = payload
+            with self.assertRaises(InvalidQueuePayload):
+                self.ingester.ingest_once()
+
+        self.assertEqual(self.ingester.stats.failures, 3)
+        self.assertEqual(set(self._statuses().values()), {"triaged"})
+        self.assertIs(current_snapshot(), published)
+        self.assertEqual(self.feed.version, 2)
+        # nobody departed, so the learned rates are untouched
+        self.assertEqual(self.ingester.estimator.rates(), rates)
+
+    def test_failure_after_the_write_is_counted_and_logged(self):
+        def broken_publish(changed, departed):
+            raise RuntimeError("snapshot swap failed")
+
+        self.ingester._publish = broken_publish
+        with self.assertLogs("hospital_data.ingest", "ERROR") as logs, self.assertRaises(RuntimeError):
+            self.ingester.ingest_once()
+        self.assertEqual(self.ingester.stats.failures, 1)
+        self.assertEqual(self.ingester.stats.last_error, "snapshot swap failed")
+        self.assertIn("Traceback", logs.output[0])
+
+    def test_history_records_aggregates_and_phase_changes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.ingester.history = QueueHistory(directory)
+        self.ingester.ingest_once()
+        self.payload = {"patients": [feed_patient("anon_1", phase="treatment"), feed_patient("anon_3")]}
+        self.ingester.ingest_once()
+
+        aggregates = self.ingester.history.aggregates.range(
+            columns=["waiting_3", "arrivals_3", "departures_5"], level="raw"
+        )
+        self.assertEqual(aggregates["waiting_3"], [1.0, 2.0])
+        self.assertEqual(aggregates["arrivals_3"], [1, 1])
+        self.assertEqual(aggregates["departures_5"], [0, 1])
+
+        transitions = self.ingester.history.transitions.range(columns=["anon_id", "phase"], level="raw")
+        self.assertEqual(
+            list(zip(transitions["anon_id"], transitions["phase"]))[2:],
+            [("anon_1", "treatment"), ("anon_3", "triaged"), ("anon_2", DEPARTED_STATUS)],
+        )
+
+    def test_out_of_range_values_do_not_fail_the_cycle(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.ingester.history = QueueHistory(directory)
+        self.payload = {"patients": [feed_patient("anon_1", category=1000, wait=10 ** 12), feed_patient("anon_2")]}
+        self.ingester.ingest_once()
+
+        self.assertEqual(self.ingester.stats.failures, 0)
+        self.assertEqual(self.feed.version, 1)
+        transitions = self.ingester.history.transitions.range(columns=["triage_category", "wait_time"], level="raw")
+        self.assertEqual(transitions["triage_category"], [0, 3])
+        self.assertEqual(transitions["wait_time"], [2 ** 31 - 1, 60])
+
+        # whatever still gets past that costs the cycle its history, not the ingest
+        self.ingester.history.record = mock.Mock(side_effect=OverflowError("signed char is greater than maximum"))
+        self.payload = {"patients": [feed_patient("anon_2", phase="treatment")]}
+        with self.assertLogs("hospital_data.ingest", "WARNING"):
+            self.ingester.ingest_once()
+        self.assertEqual(self.ingester.stats.failures, 0)
+        self.assertEqual(current_snapshot().get_patient("anon_2").status, "treatment")
+
+    def test_background_thread_polls(self):
+        self.ingester.start()
+        for _ in range(200):
+            if self.ingester.stats.cycles >= 2:
+                break
+            self.ingester._stop.wait(0.01)
+        self.ingester.stop(timeout=1)
+        self.assertGreaterEqual(self.ingester.stats.cycles, 2)
+
+
+class TestSiteIngesters(unittest.TestCase):
+
+    def setUp(self):
+        self.db_paths = {}
+        self.payloads = {
+            "north": {"patients": [feed_patient("anon_1"), feed_patient("anon_2", category=5)]},
+            "south": {"patients": [feed_patient("anon_1", category=2, wait=10)]},
+        }
+        ingesters = {}
+        for site in self.payloads:
+            fd, self.db_paths[site] = tempfile.mkstemp(suffix=".db")
+            os.close(fd)
+            ingesters[site] = QueueIngester(
+                fetch=lambda site=site: self.payloads[site], db_path=self.db_paths[site], feed=ChangeFeed(), site=site,
+            )
+        self.sites = SiteIngesters(ingesters, interval=0.01, workers=2)
+
+    def tearDown(self):
+        self.sites.stop(timeout=1)
+        for site in self.payloads:
+            snapshot_module._current_snapshots.pop(site, None)
+        for db_path in self.db_paths.values():
+            close_pool(db_path)
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+    def test_each_site_is_ingested_into_its_own_partition(self):
+        self.sites.ingest_once()
+        north, south = current_snapshot("north"), current_snapshot("south")
+        self.assertEqual((north.site, north.patient_number_by_cat()), ("north", [0, 0, 1, 0, 1]))
+        self.assertEqual((south.site, south.patient_number_by_cat()), ("south", [0, 1, 0, 0, 0]))
+        # the same anon_id means a different patient at each site
+        self.assertEqual(north.get_patient("anon_1").triage_category, 3)
+        self.assertEqual(south.get_patient("anon_1").triage_category, 2)
+        with self.assertRaises(UnknownSite):
+            self.sites["west"]
+
+    def test_a_slow_site_does_not_hold_back_the_others(self):
+        release = threading.Event()
+
+        def slow_fetch():
+            release.wait(5)
+            return self.payloads["north"]
+
+        self.sites["north"].fetch = slow_fetch
+        self.sites.start()
+        for _ in range(200):
+            if self.sites["south"].stats.cycles >= 3:
+                break
+            release.wait(0.01)
+        release.set()
+        self.assertGreaterEqual(self.sites["south"].stats.cycles, 3)
+        self.assertGreaterEqual(self.sites._skipped["north"].value, 1)
+
+
+class TestLoadSites(unittest.TestCase):
+
+    def test_extra_sites_get_their_own_files(self):
+        sites = load_sites({"north": {"queue_url": "http://feed/north"}}, default="main", directory="db/sites")
+        self.assertEqual(list(sites), ["main", "north"])
+        self.assertEqual(sites["north"].db_path, os.path.join("db/sites", "north.db"))
+        self.assertEqual(sites["north"].history_dir, os.path.join("db/sites", "north", "history"))
+
+    def test_names_must_be_safe_in_paths(self):
+        with self.assertRaises(ValueError):
+            load_sites({"../north": {"queue_url": "http://feed/north"}})
+        with self.assertRaises(ValueError):
+            load_sites({"main": {"queue_url": "http://feed/main"}}, default="main")
+
+
+if __name__ == '__main__':
+    unittest.main()
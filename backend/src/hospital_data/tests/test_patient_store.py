@@ -0,0 +1,49 @@
+import unittest
+
+from hospital_data.patient_store import PatientStore
+
+ROWS = [
+    (1, "anon_1", "2025-01-25T19:55:53", 3, 1, "triaged", "NA", "NA", 5, 300),
+    (2, "anon_2", "2025-01-25T21:12:53", 1, 1, "treatment", "reported", "pending", 2, 120),
+    (3, "anon_3", "2025-01-25T21:26:53", None, 2, "departed", "NA", "NA", 5, 100),
+    (4, "anon_4", "2025-01-25T21:30:53", 4, 3, "triaged", "NA", "NA", 5, None),
+    (5, "anon_5", "2025-01-25T21:31:53", 5, 4, "triaged", "NA", "NA", 5, 20),
+]
+
+
+class TestPatientStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = PatientStore.from_rows(ROWS)
+
+    def test_round_trips_rows(self):
+        for row in ROWS:
+            patient = self.store.find(row[1])
+            self.assertEqual(tuple(patient.to_dict().values()), row)
+        self.assertIsNone(self.store.find("missing"))
+
+    def test_categorical_columns_share_codes(self):
+        self.assertEqual(len(self.store.statuses.values), 4)
+        self.assertEqual(self.store.imaging[0], self.store.labs[0])
+
+    def test_patient_has_no_instance_dict(self):
+        self.assertFalse(hasattr(self.store.find("anon_1"), "__dict__"))
+
+    def test_category_summary(self):
+        summary = self.store.category_summary()
+        self.assertEqual(summary.counts, [0, 1, 0, 0, 4])
+        self.assertEqual(summary.mean_waits, [0, 120, 0, 0, 105])
+        self.assertEqual(summary.max_waits, [None, 120, None, None, 300])
+        self.assertEqual(summary.p50_waits[4], 100)
+        self.assertEqual(summary.p90_waits[4], 300)
+
+    def test_category_summary_skips_inactive_rows(self):
+        active = self.store.active_mask("departed")
+        self.assertEqual(active.count(1), 4)
+        summary = self.store.category_summary(active)
+        self.assertEqual(summary.counts, [0, 1, 0, 0, 3])
+        self.assertEqual(summary.mean_waits[4], 106)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from hospital_data.patient_store import PatientStore
+from hospital_data.queue_data import STATUS_COLUMNS, get_batch_status, get_queue_page
+from hospital_data.snapshot import QueueSnapshot
+
+ROWS = [
+    (1, "anon_1", "2025-01-25T19:55:53", 3, 1, "triaged", "NA", "NA", 5, 300),
+    (2, "anon_2", "2025-01-25T21:12:53", 1, 1, "treatment", "reported", "pending", 2, 120),
+    (3, "anon_3", "2025-01-25T21:26:53", 2, 2, "departed", "NA", "NA", 5, 100),
+    (4, "anon_4", "2025-01-25T21:30:53", None, 3, "triaged", "NA", "NA", 5, 40),
+    (5, "anon_5", "2025-01-25T21:31:53", 2, 2, "triaged", "NA", "NA", 5, 20),
+]
+
+
+def column(response, name):
+    index = STATUS_COLUMNS.index(name)
+    return [row[index] for row in response["rows"]]
+
+
+class TestBatchStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = QueueSnapshot(PatientStore.from_rows(ROWS))
+
+    def test_shared_fields_once_and_rows_per_patient(self):
+        response = get_batch_status(["anon_2", "anon_5", "missing", "anon_2"], self.snapshot)
+        self.assertEqual(response["allPatients"], 4)
+        self.assertEqual(response["patientNumberByCat"], [0, 1, 0, 0, 3])
+        self.assertEqual(response["expectedWaitTimesByCat"], [0, 120, 0, 0, 120])
+        self.assertEqual(column(response, "anonId"), ["anon_2", "anon_5"])
+        self.assertEqual(column(response, "expectedTime"), [120, 120])
+        self.assertEqual(response["missing"], ["missing"])
+        self.assertEqual(len(response["rows"][0]), len(STATUS_COLUMNS))
+
+    def test_queue_page_orders_and_filters(self):
+        response = get_queue_page(snapshot=self.snapshot)
+        self.assertEqual(column(response, "anonId"), ["anon_2", "anon_5", "anon_1", "anon_4"])
+        self.assertEqual(response["total"], 4)
+
+        response = get_queue_page(triage_category=5, phase="triaged", snapshot=self.snapshot)
+        self.assertEqual(column(response, "anonId"), ["anon_5", "anon_1", "anon_4"])
+
+        response = get_queue_page(phase="unknown", snapshot=self.snapshot)
+        self.assertEqual(response["rows"], [])
+
+    def test_queue_paging(self):
+        response = get_queue_page(page=2, page_size=3, snapshot=self.snapshot)
+        self.assertEqual(column(response, "anonId"), ["anon_4"])
+        self.assertEqual(response["total"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
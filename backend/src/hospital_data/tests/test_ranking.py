@@ -0,0 +1,82 @@
+import random
+import unittest
+
+from hospital_data.ranking import QueueRanking
+
+WAITING = "triaged"
+
+
+def brute_force(patients):
+    """(category position, global position) per anon_id by sorting the whole queue."""
+    waiting = sorted(
+        (category, arrival, anon_id)
+        for anon_id, (category, arrival, phase) in patients.items()
+        if phase == WAITING
+    )
+    positions, per_category = {}, {}
+    for position, (category, _, anon_id) in enumerate(waiting, 1):
+        per_category[category] = per_category.get(category, 0) + 1
+        positions[anon_id] = (per_category[category], position)
+    return positions
+
+
+class TestQueueRanking(unittest.TestCase):
+
+    def setUp(self):
+        self.ranking = QueueRanking(phases=(WAITING,))
+
+    def test_ranks_by_category_then_arrival(self):
+        self.ranking.update("anon_1", 4, "2025-01-25T10:00:00", WAITING)
+        self.ranking.update("anon_2", 2, "2025-01-25T11:00:00", WAITING)
+        self.ranking.update("anon_3", 4, "2025-01-25T09:00:00", WAITING)
+        self.ranking.update("anon_4", "2", "2025-01-25T08:00:00", WAITING)
+
+        self.assertEqual(self.ranking.rank("anon_4"), (1, 1))
+        self.assertEqual(self.ranking.rank("anon_2"), (2, 2))
+        self.assertEqual(self.ranking.rank("anon_3"), (1, 3))
+        self.assertEqual(self.ranking.rank("anon_1"), (2, 4))
+        self.assertEqual(self.ranking.ahead("anon_1"), 3)
+        self.assertEqual(self.ranking.category_size(4), 2)
+        self.assertEqual(list(self.ranking.positions())[1], ("anon_2", 2, 2))
+
+    def test_leaving_the_waiting_phases_drops_the_patient(self):
+        self.ranking.update("anon_1", 3, "2025-01-25T10:00:00", WAITING)
+        self.ranking.update("anon_2", 3, "2025-01-25T11:00:00", WAITING)
+        self.ranking.update("anon_1", 3, "2025-01-25T10:00:00", "treatment")
+
+        self.assertIsNone(self.ranking.rank("anon_1"))
+        self.assertEqual(self.ranking.rank("anon_2"), (1, 1))
+        self.ranking.discard("anon_2")
+        self.ranking.discard("anon_missing")
+        self.assertEqual(len(self.ranking), 0)
+
+    def test_missing_category_and_arrival_go_last(self):
+        self.ranking.update("anon_1", None, "2025-01-25T10:00:00", WAITING)
+        self.ranking.update("anon_2", 5, None, WAITING)
+        self.ranking.update("anon_3", 5, "2025-01-25T12:00:00", WAITING)
+
+        self.assertEqual([anon_id for anon_id, _, _ in self.ranking.positions()], ["anon_3", "anon_2", "anon_1"])
+
+    def test_random_updates_match_a_full_sort(self):
+        rng = random.Random(7)
+        patients = {}
+        for step in range(2000):
+            anon_id = f"anon_{rng.randrange(200)}"
+            if anon_id in patients and rng.random() < 0.2:
+                del patients[anon_id]
+                self.ranking.discard(anon_id)
+            else:
+                category = rng.randint(1, 5)
+                arrival = f"2025-01-25T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00"
+                phase = rng.choice((WAITING, WAITING, "treatment"))
+                patients[anon_id] = (category, arrival, phase)
+                self.ranking.update(anon_id, category, arrival, phase)
+
+            if step % 100 == 0:
+                expected = brute_force(patients)
+                self.assertEqual({anon_id: self.ranking.rank(anon_id) for anon_id in expected}, expected)
+                self.assertEqual({a: (l, g) for a, l, g in self.ranking.positions()}, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from hospital_data.patient_store import PatientStore
+from hospital_data.response_cache import PatientResponseCache
+from hospital_data.snapshot import QueueSnapshot
+
+
+def row(pid, anon_id, status="triaged", wait=60, category=3):
+    return (pid, anon_id, "2025-01-25T19:55:53", pid, 1, status, "NA", "NA", category, wait)
+
+
+def snapshot(rows, version=1):
+    return QueueSnapshot(PatientStore.from_rows(rows), version=version)
+
+
+class TestPatientETag(unittest.TestCase):
+
+    def test_unrelated_change_keeps_etag(self):
+        before = snapshot([row(1, "anon_1"), row(2, "anon_2", wait=30)])
+        after = snapshot([row(1, "anon_1"), row(2, "anon_2", status="treatment", wait=30)], version=2)
+        self.assertEqual(before.etag("anon_1"), after.etag("anon_1"))
+        self.assertNotEqual(before.etag("anon_2"), after.etag("anon_2"))
+
+    def test_aggregate_change_moves_every_etag(self):
+        before = snapshot([row(1, "anon_1"), row(2, "anon_2", wait=30)])
+        after = snapshot([row(1, "anon_1"), row(2, "anon_2", wait=90)], version=2)
+        self.assertNotEqual(before.etag("anon_1"), after.etag("anon_1"))
+
+    def test_missing_patient_has_no_etag(self):
+        self.assertIsNone(snapshot([row(1, "anon_1")]).etag("missing"))
+
+
+class TestPatientResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = PatientResponseCache(maxsize=2)
+        self.renders = 0
+
+    def render(self):
+        self.renders += 1
+        return f"body {self.renders}"
+
+    def test_reuses_body_within_a_version(self):
+        current = snapshot([row(1, "anon_1")])
+        self.assertEqual(self.cache.get("anon_1", current, self.render), "body 1")
+        self.assertEqual(self.cache.get("anon_1", current, self.render), "body 1")
+        self.assertEqual(self.renders, 1)
+
+    def test_new_version_invalidates(self):
+        self.cache.get("anon_1", snapshot([row(1, "anon_1")]), self.render)
+        self.assertEqual(self.cache.get("anon_1", snapshot([row(1, "anon_1")], version=2), self.render), "body 2")
+        # a request still holding the old snapshot doesn't bring old bodies back
+        self.cache.get("anon_1", snapshot([row(1, "anon_1")]), self.render)
+        self.assertEqual(self.cache.get("anon_1", snapshot([row(1, "anon_1")], version=2), self.render), "body 2")
+
+    def test_unpublished_snapshots_are_not_cached(self):
+        unpublished = snapshot([row(1, "anon_1")], version=0)
+        self.cache.get("anon_1", unpublished, self.render)
+        self.cache.get("anon_1", unpublished, self.render)
+        self.assertEqual(self.renders, 2)
+
+    def test_bounded(self):
+        current = snapshot([row(1, "a"), row(2, "b"), row(3, "c")])
+        for patient_id in ("a", "b", "c", "a"):
+            self.cache.get(patient_id, current, self.render)
+        self.assertEqual(self.renders, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from flask import Flask
+
+from hospital_data import routes
+
+
+def status_client():
+    """The status routes alone, without the ingesters register() starts."""
+    app = Flask(__name__)
+    app.register_blueprint(routes.blueprint)
+    return app.test_client()
+
+
+class TestSiteParameter(unittest.TestCase):
+
+    def setUp(self):
+        self.client = status_client()
+
+    def test_non_string_site_is_a_bad_request(self):
+        response = self.client.post("/patients/status", json={"patientIds": ["anon_1"], "site": ["x"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"error": "site must be a string, not list"})
+
+    def test_unknown_site_is_not_found(self):
+        response = self.client.post("/patients/status", json={"patientIds": ["anon_1"], "site": "nowhere"})
+        self.assertEqual(response.status_code, 404)
+
+
+class TestQueueParameters(unittest.TestCase):
+
+    def test_malformed_values_are_a_bad_request(self):
+        client = status_client()
+        for query in ("page=abc", "triage=x", "pageSize=1.5", "triage=9", "page=0"):
+            response = client.get(f"/queue?{query}")
+            self.assertEqual(response.status_code, 400, query)
+        self.assertEqual(client.get("/queue?page=abc").get_json(), {"error": "page must be an integer, not 'abc'"})
+
+
+class TestHistoryParameters(unittest.TestCase):
+
+    def test_malformed_time_bounds_are_a_bad_request(self):
+        client = status_client()
+        for query in ("start=abc", "end=1e999", "start=nan"):
+            response = client.get(f"/history/aggregates?{query}")
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn("must be a number", response.get_json()["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
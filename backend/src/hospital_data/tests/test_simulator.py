@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+import unittest
+
+from hospital_data.changefeed import ChangeFeed
+from hospital_data.create_db import parse_patient_row
+from hospital_data.db import close_pool
+from hospital_data.ingest import QueueIngester
+from hospital_data.simulator import RecordedFeed, SimulatedED, SimulationClock, Surge, create_feed_app
+
+
+class FakeWall:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSimulatedED(unittest.TestCase):
+
+    def setUp(self):
+        self.wall = FakeWall()
+        # one simulated minute per wall clock second
+        self.clock = SimulationClock(60, wall=self.wall)
+
+    def test_payload_has_the_feed_shape(self):
+        ed = SimulatedED(self.clock, initial_patients=20, seed=1)
+        self.wall.now += 30
+        patients = ed.queue()["patients"]
+        self.assertEqual(len(patients), len(ed.patients))
+        for patient in patients:
+            self.assertEqual(
+                set(patient), {"id", "arrival_time", "triage_category", "queue_position", "status", "time_elapsed"}
+            )
+            self.assertEqual(set(patient["status"]["investigations"]), {"labs", "imaging"})
+            self.assertEqual(len(parse_patient_row(patient)), 9)
+
+        waiting = sorted(
+            (p for p in patients if p["queue_position"]["global"] is not None),
+            key=lambda p: p["queue_position"]["global"],
+        )
+        self.assertEqual([p["queue_position"]["global"] for p in waiting], list(range(1, len(waiting) + 1)))
+        # the global queue is in triage order
+        categories = [p["triage_category"] for p in waiting]
+        self.assertEqual(categories, sorted(categories))
+
+    def test_surge_arrivals_land_in_their_window(self):
+        ed = SimulatedED(self.clock, arrivals_per_hour=0, surges=(Surge(10, 60, 500),), seed=2)
+        self.wall.now += 9
+        self.assertEqual(len(ed.queue()["patients"]), 0)
+        self.wall.now += 61
+        self.assertGreater(len(ed.queue()["patients"]), 400)
+        self.assertEqual(ed.arrivals, 500)
+
+    def test_same_seed_same_feed(self):
+        first = SimulatedED(self.clock, initial_patients=10, seed=3)
+        second = SimulatedED(self.clock, initial_patients=10, seed=3)
+        self.wall.now += 120
+        self.assertEqual(first.queue(), second.queue())
+
+    def test_ingester_reads_the_simulator_over_http_routes(self):
+        ed = SimulatedED(self.clock, initial_patients=15, seed=4)
+        client = create_feed_app(ed, self.clock).test_client()
+        fd, db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(os.remove, db_path)
+        self.addCleanup(close_pool, db_path)
+        ingester = QueueIngester(fetch=lambda: client.get("/api/v1/queue").get_json(), db_path=db_path, feed=ChangeFeed())
+
+        ingester.ingest_once()
+        self.assertEqual(ingester.snapshot.total_patients, 15)
+        # the locally maintained ranking agrees with the simulator's own numbering
+        self.assertEqual(ingester.stats.last_rank_mismatches, 0)
+        self.assertEqual(ingester.snapshot.ranked_patients, len(ingester.ranking))
+        anon_id = ingester.snapshot.store.anon_ids[0]
+        self.assertEqual(client.get(f"/api/v1/patient/{anon_id}").get_json()["id"], anon_id)
+        self.assertEqual(client.get("/api/v1/patient/anon_missing").status_code, 404)
+        stats = client.get("/api/v1/stats/current").get_json()
+        self.assertEqual(sum(stats["categoryBreakdown"].values()), 15)
+
+
+class TestRecordedFeed(unittest.TestCase):
+
+    def test_payloads_are_replayed_at_speed(self):
+        wall = FakeWall()
+        recording = [
+            (0.0, {"patients": [{"id": "anon_1"}]}),
+            (600.0, {"patients": [{"id": "anon_1"}, {"id": "anon_2"}]}),
+        ]
+        # ten minutes of recording take one wall clock minute
+        feed = RecordedFeed(recording, SimulationClock(10, wall=wall))
+        self.assertEqual(len(feed.queue()["patients"]), 1)
+        wall.now += 59
+        self.assertEqual(len(feed.queue()["patients"]), 1)
+        wall.now += 1
+        self.assertEqual(len(feed.queue()["patients"]), 2)
+        self.assertEqual(feed.first_seen("anon_2"), 1060.0)
+        self.assertIsNone(feed.first_seen("anon_3"))
+
+    def test_recordings_load_from_the_ingester_format(self):
+        from hospital_data.replay import load_recording
+
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+            f.write(json.dumps({"at": 5.0, "payload": {"patients": []}}) + "\n")
+        self.addCleanup(os.remove, f.name)
+        feed = RecordedFeed(load_recording(f.name), SimulationClock(1, wall=FakeWall()))
+        self.assertEqual(feed.queue(), {"patients": []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from hospital_data.create_db import create_patient_table
+from hospital_data.db import close_pool
+from hospital_data.snapshot import QueueSnapshot
+
+ROWS = [
+    ("anon_1", "2025-01-25T19:55:53.039708", 3, 1, "triaged", "NA", "NA", 5, 300),
+    ("anon_2", "2025-01-25T21:12:53.039754", 1, 1, "treatment", "reported", "pending", 2, 120),
+    ("anon_3", "2025-01-25T21:26:53.039697", 2, 2, "registered", "NA", "NA", 5, 100),
+    ("anon_4", "2025-01-25T21:30:53.039697", 4, 3, "triaged", "NA", "NA", 5, "n/a"),
+]
+
+
+class TestQueueSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        conn = sqlite3.connect(self.db_path)
+        create_patient_table(conn.cursor())
+        conn.executemany(
+            """
+            INSERT INTO patient_data (
+                anon_id, arrival_time, queue_global, queue_local, status,
+                imaging, labs, triage_category, wait_time
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            ROWS,
+        )
+        conn.commit()
+        conn.close()
+        self.snapshot = QueueSnapshot.load(self.db_path)
+
+    def tearDown(self):
+        close_pool(self.db_path)
+        os.remove(self.db_path)
+
+    def test_patient_lookup(self):
+        patient = self.snapshot.get_patient("anon_2")
+        self.assertEqual(patient.status, "treatment")
+        self.assertEqual(patient.labs, "pending")
+        self.assertIsNone(self.snapshot.get_patient("missing"))
+
+    def test_queue_stats(self):
+        self.assertEqual(self.snapshot.queue_stats("anon_3"), (2, 2, 4))
+        self.assertEqual(self.snapshot.queue_stats("missing"), (0, 0, 4))
+
+    def test_category_aggregates(self):
+        self.assertEqual(self.snapshot.total_patients, 4)
+        self.assertEqual(self.snapshot.patient_number_by_cat(), [0, 1, 0, 0, 3])
+        # non-numeric waits count towards the category size but not the sum
+        self.assertEqual(self.snapshot.wait_times_by_cat(), [0, 120, 0, 0, 133])
+
+    def test_expected_time(self):
+        self.assertEqual(self.snapshot.expected_time_seconds("anon_1"), 133)
+        self.assertEqual(self.snapshot.expected_time_seconds("missing"), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import logging
+import queue
+import smtplib
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask
+from flask_mail import Connection, Mail, Message
+
+from config import MAIL_BATCH_SIZE, MAIL_IDLE_SECONDS, MAIL_MAX_ATTEMPTS, MAIL_RETRY_SECONDS
+from core.outbound import call_seconds
+
+logger = logging.getLogger(__name__)
+
+send_seconds = call_seconds("smtp", "send")
+
+# finished jobs kept around for the status endpoint
+MAX_TRACKED_JOBS = 1000
+
+QUEUED = "queued"
+SENT = "sent"
+FAILED = "failed"
+
+
+class MailJob:
+    def __init__(self, patient_id: str, recipients: List[str]):
+        self.id = uuid.uuid4().hex
+        self.patient_id = patient_id
+        self.created_at = time.time()
+        self.recipients: Dict[str, Dict[str, Any]] = {
+            email: {"status": QUEUED, "attempts": 0, "error": None} for email in recipients
+        }
+
+    @property
+    def status(self) -> str:
+        statuses = [r["status"] for r in self.recipients.values()]
+        if QUEUED in statuses:
+            return QUEUED
+        if all(s == SENT for s in statuses):
+            return SENT
+        return FAILED if all(s == FAILED for s in statuses) else "partial"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "jobId": self.id,
+            "patientId": self.patient_id,
+            "status": self.status,
+            "createdAt": self.created_at,
+            "recipients": self.recipients,
+        }
+
+
+class _Delivery:
+    __slots__ = ("job", "email", "message")
+
+    def __init__(self, job: MailJob, email: str, message: Message):
+        self.job = job
+        self.email = email
+        self.message = message
+
+
+class MailQueue:
+    """
+    Sends mail from one background thread over a reused SMTP connection.
+
+    Requests enqueue a job and return straight away. The worker drains up to
+    batch_size deliveries per wake-up on the open connection, retries
+    connection-level failures with backoff, records per-recipient outcomes
+    and closes the connection after idle_seconds without mail.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        mail: Mail,
+        batch_size: int = MAIL_BATCH_SIZE,
+        max_attempts: int = MAIL_MAX_ATTEMPTS,
+        retry_seconds: float = MAIL_RETRY_SECONDS,
+        idle_seconds: float = MAIL_IDLE_SECONDS,
+    ):
+        self.app = app
+        self.mail = mail
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.idle_seconds = idle_seconds
+
+        self._pending: "queue.Queue[_Delivery]" = queue.Queue()
+        self._jobs: "OrderedDict[str, MailJob]" = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._connection: Optional[Connection] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, patient_id: str, messages: List[Tuple[str, Message]]) -> MailJob:
+        job = MailJob(patient_id, [email for email, _ in messages])
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                self._jobs.popitem(last=False)
+        self._ensure_worker()
+        for email, message in messages:
+            self._pending.put(_Delivery(job, email, message))
+        return job
+
+    def get_job(self, job_id: str) -> Optional[MailJob]:
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def _ensure_worker(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mail-queue", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        with self.app.app_context():
+            while True:
+                try:
+                    first = self._pending.get(timeout=self.idle_seconds)
+                except queue.Empty:
+                    self._disconnect()
+                    continue
+                batch = [first]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._pending.get_nowait())
+                    except queue.Empty:
+                        break
+                for delivery in batch:
+                    self._deliver(delivery)
+
+    def _connect(self) -> Connection:
+        if self._connection is None:
+            connection = self.mail.connect()
+            self._connection = connection.__enter__()
+        return self._connection
+
+    def _disconnect(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass  # the server may already have dropped us
+
+    def _deliver(self, delivery: _Delivery) -> None:
+        status = delivery.job.recipients[delivery.email]
+        status["attempts"] += 1
+        started = time.monotonic()
+        try:
+            self._connect().send(delivery.message)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+            # the server answered and said no, retrying won't help
+            self._finish(delivery, FAILED, str(e))
+        except Exception as e:
+            self._disconnect()
+            if status["attempts"] >= self.max_attempts:
+                self._finish(delivery, FAILED, str(e))
+            else:
+                status["error"] = str(e)
+                delay = self.retry_seconds * 2 ** (status["attempts"] - 1)
+                threading.Timer(delay, self._pending.put, args=(delivery,)).start()
+        else:
+            self._finish(delivery, SENT, None)
+        finally:
+            send_seconds.observe(time.monotonic() - started)
+
+    def _finish(self, delivery: _Delivery, outcome: str, error: Optional[str]) -> None:
+        status = delivery.job.recipients[delivery.email]
+        status["status"] = outcome
+        status["error"] = error
+        if outcome == SENT:
+            logger.info("Email sent", extra={"job_id": delivery.job.id, "patient_id": delivery.job.patient_id})
+        else:
+            logger.error(
+                f"Failed to send email: {error}",
+                extra={"job_id": delivery.job.id, "patient_id": delivery.job.patient_id},
+            )
@@ -0,0 +1,115 @@
+import logging
+
+from typing import Any, List
+
+from flask import Blueprint, Flask, current_app, jsonify, request
+from flask_mail import Mail, Message
+
+from config import MAIL_MAX_RECIPIENTS
+from notifications.mail_queue import MailQueue
+
+logger = logging.getLogger(__name__)
+
+blueprint = Blueprint("mail", __name__)
+
+
+def register(app: Flask) -> None:
+    """Tracking link emails, sent from a background queue with the app's MAIL_* settings."""
+    app.extensions["mail_queue"] = MailQueue(app, Mail(app))
+    app.register_blueprint(blueprint)
+
+
+def parse_recipients(emails: Any, limit: int = MAIL_MAX_RECIPIENTS) -> List[str]:
+    """
+    The distinct addresses in emails, in order and compared case-insensitively;
+    raises ValueError unless it is a non-empty list of at most limit of them,
+    each a string with an @ and no whitespace.
+    """
+    if not isinstance(emails, list) or not emails:
+        raise ValueError("emails must be a non-empty list")
+    recipients, seen = [], set()
+    for email in emails:
+        address = email.strip() if isinstance(email, str) else ""
+        if "@" not in address or any(c.isspace() for c in address):
+            raise ValueError(f"not an email address: {str(email)[:100]!r}")
+        email = address
+        if email.lower() not in seen:
+            seen.add(email.lower())
+            recipients.append(email)
+    if len(recipients) > limit:
+        raise ValueError(f"at most {limit} emails per request")
+    return recipients
+
+
+@blueprint.route("/email/<patient_id>", methods=["POST"])
+def send_email(patient_id: str):
+    """
+    Send email with clickable link 
+    ---
+    parameters:
+      - name: patient_id
+        in: path
+        type: string
+        required: true
+        description: The ID of the patient
+      - name: emails
+        in: body
+        type: array
+        required: true
+        description: List of recipient email addresses, duplicates are sent once
+    responses:
+      202:
+        description: Emails queued, poll /email/jobs/{jobId} for per-recipient delivery status
+      400:
+        description: emails missing, not a list, too long, or with an entry that isn't an email address
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        emails = parse_recipients(data.get('emails', []))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    link = f"http://localhost:3000/patient/{patient_id}"
+    logger.info(f"Queueing {len(emails)} emails", extra={"patient_id": patient_id, "recipients": len(emails)})
+
+    messages = []
+    for email in emails:
+      msg = Message(
+          subject="Hospital Visit Tracking",
+          sender="noreply@hospital.com",
+          recipients=[email],
+          body=f"Hello,\n\nHere is the link to track your loved one's ED visit: {link}\n\nPatient ID: {patient_id}\n\nHave a good day."
+      )
+      msg.html = f"""
+            <p>Hello,</p>
+            <p>Here is the link to track your loved one's ED visit:</p>
+            <p><a href="{link}">Click here to track</a></p>
+            <p>Patient ID: {patient_id}</p>
+            <p>Have a good day.</p>
+        """
+      messages.append((email, msg))
+
+    job = current_app.extensions["mail_queue"].submit(patient_id, messages)
+    return jsonify({"message": "Email queued", "jobId": job.id, "status": job.status}), 202
+
+
+@blueprint.route("/email/jobs/<job_id>", methods=["GET"])
+def get_email_job(job_id: str):
+    """
+    Delivery status of a queued email job
+    ---
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+        description: The jobId returned by POST /email/{patient_id}
+    responses:
+      200:
+        description: Overall status plus status, attempts and last error per recipient
+      404:
+        description: Unknown or expired job
+    """
+    job = current_app.extensions["mail_queue"].get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"no such job {job_id}"}), 404
+    return jsonify(job.to_dict())
@@ -0,0 +1,33 @@
+import unittest
+
+from flask import Flask
+
+from notifications import routes
+from notifications.routes import parse_recipients
+
+
+class TestRecipients(unittest.TestCase):
+
+    def test_duplicates_are_dropped_in_order(self):
+        self.assertEqual(
+            parse_recipients([" a@example.com", "b@example.com", "A@example.com"]),
+            ["a@example.com", "b@example.com"],
+        )
+
+    def test_malformed_lists_are_rejected(self):
+        for emails in (None, [], "a@example.com", ["a@example.com", ""], [42], ["nobody"], ["a@example.com\r\nBcc: x@y"]):
+            with self.assertRaises(ValueError, msg=repr(emails)):
+                parse_recipients(emails)
+        with self.assertRaises(ValueError):
+            parse_recipients([f"{i}@example.com" for i in range(3)], limit=2)
+
+    def test_route_answers_bad_request_before_queueing(self):
+        app = Flask(__name__)
+        app.register_blueprint(routes.blueprint)
+        response = app.test_client().post("/email/anon_1", json={"emails": ["a@example.com", None]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"error": "not an email address: 'None'"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import socketserver
+import threading
+import time
+import unittest
+
+from flask import Flask
+from flask_mail import Mail, Message
+
+from notifications.mail_queue import FAILED, SENT, MailQueue
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accepts everything except recipients containing 'refuse'."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "DATA":
+                self.reply("354 go ahead")
+                while self.rfile.readline().rstrip(b"\r\n") != b".":
+                    pass
+                server.delivered += 1
+                self.reply("250 queued")
+            elif verb == "RCPT" and "refuse" in command:
+                self.reply("550 no such user")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInSMTPHandler)
+        self.connections = 0
+        self.delivered = 0
+
+
+def message(email):
+    return email, Message(subject="test", sender="noreply@hospital.com", recipients=[email], body="hi")
+
+
+class TestMailQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInSMTPServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        app = Flask(__name__)
+        app.config.update(
+            MAIL_SERVER="127.0.0.1",
+            MAIL_PORT=self.server.server_address[1],
+            MAIL_USE_TLS=False,
+            MAIL_USE_SSL=False,
+        )
+        self.queue = MailQueue(app, Mail(app), batch_size=10, max_attempts=2, retry_seconds=0.05, idle_seconds=0.5)
+
+    def tearDown(self):
+        self.stop_server()
+
+    def stop_server(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def wait_for(self, job):
+        for _ in range(200):
+            if job.status != "queued":
+                return job
+            time.sleep(0.01)
+        self.fail(f"job still queued: {job.to_dict()}")
+
+    def test_submit_returns_before_sending(self):
+        started = time.perf_counter()
+        job = self.queue.submit("anon_1", [message("a@example.com")])
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertIs(self.queue.get_job(job.id), job)
+        self.assertEqual(self.wait_for(job).status, SENT)
+
+    def test_one_connection_for_many_recipients(self):
+        job = self.queue.submit("anon_1", [message(f"r{i}@example.com") for i in range(5)])
+        self.wait_for(job)
+        second = self.queue.submit("anon_2", [message("late@example.com")])
+        self.wait_for(second)
+        self.assertEqual(self.server.delivered, 6)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_refused_recipient_does_not_stop_the_others(self):
+        job = self.queue.submit("anon_1", [
+            message("a@example.com"),
+            message("refuse@example.com"),
+            message("b@example.com"),
+        ])
+        self.wait_for(job)
+        self.assertEqual(job.status, "partial")
+        self.assertEqual(job.recipients["refuse@example.com"]["status"], FAILED)
+        self.assertEqual(job.recipients["b@example.com"]["status"], SENT)
+
+    def test_connection_failures_are_retried_then_reported(self):
+        self.stop_server()
+        job = self.queue.submit("anon_1", [message("a@example.com")])
+        for _ in range(200):
+            if job.status != "queued":
+                break
+            time.sleep(0.01)
+        self.assertEqual(job.status, FAILED)
+        self.assertEqual(job.recipients["a@example.com"]["attempts"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
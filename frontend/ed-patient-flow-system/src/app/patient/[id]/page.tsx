@@ -497,6 +497,53 @@ export default function PatientPage() {
   };
 
   useEffect(() => {
+    const applyData = (data: BackendPatientData) => {
+      // Transform the raw data into our frontend format
+      const patientInfo: PatientData = {
+        id: patientId,
+        arrival_time: data.arrivalTime,
+        triage_category: parseInt(data.triage),
+        queue_position: {
+          global: data.queuePositionGlobal,
+          category: data.queuePositionLocal
+        },
+        status: {
+          current_phase: data.currentPhase,
+          investigations: {
+            labs: data.labs,
+            imaging: data.imaging
+          }
+        },
+        time_elapsed: data.elapsedTime,
+        expectedTime: data.expectedTime
+      };
+
+      // Transform the arrays into objects for easier access
+      const categoryBreakdown: Record<string, number> = {};
+      const waitTimes: Record<string, number> = {};
+      
+      // Map the arrays to their respective categories (1-5)
+      for (let i = 0; i < data.patientNumberByCat.length; i++) {
+        categoryBreakdown[i + 1] = data.patientNumberByCat[i];
+        waitTimes[i + 1] = data.expectedWaitTimesByCat[i];
+      }
+
+      const statsData: HospitalStats = {
+        categoryBreakdown,
+        averageWaitTimes: waitTimes
+      };
+
+      const queueInfo: QueueData = {
+        waitingCount: data.allPatients,
+        longestWaitTime: data.expectedTime,
+        patients: [patientInfo]
+      };
+
+      setPatientData(patientInfo);
+      setHospitalStats(statsData);
+      setQueueData(queueInfo);
+    };
+
     const fetchData = async () => {
       try {
         const response = await fetch(`${BACKEND_API_BASE}/patient/${patientId}`);
@@ -505,52 +552,7 @@ export default function PatientPage() {
           throw new Error('Failed to fetch data');
         }
 
-        const data = await response.json() as BackendPatientData;
-        
-        // Transform the raw data into our frontend format
-        const patientInfo: PatientData = {
-          id: patientId,
-          arrival_time: data.arrivalTime,
-          triage_category: parseInt(data.triage),
-          queue_position: {
-            global: data.queuePositionGlobal,
-            category: data.queuePositionLocal
-          },
-          status: {
-            current_phase: data.currentPhase,
-            investigations: {
-              labs: data.labs,
-              imaging: data.imaging
-            }
-          },
-          time_elapsed: data.elapsedTime,
-          expectedTime: data.expectedTime
-        };
-
-        // Transform the arrays into objects for easier access
-        const categoryBreakdown: Record<string, number> = {};
-        const waitTimes: Record<string, number> = {};
-        
-        // Map the arrays to their respective categories (1-5)
-        for (let i = 0; i < data.patientNumberByCat.length; i++) {
-          categoryBreakdown[i + 1] = data.patientNumberByCat[i];
-          waitTimes[i + 1] = data.expectedWaitTimesByCat[i];
-        }
-
-        const statsData: HospitalStats = {
-          categoryBreakdown,
-          averageWaitTimes: waitTimes
-        };
-
-        const queueInfo: QueueData = {
-          waitingCount: data.allPatients,
-          longestWaitTime: data.expectedTime,
-          patients: [patientInfo]
-        };
-
-        setPatientData(patientInfo);
-        setHospitalStats(statsData);
-        setQueueData(queueInfo);
+        applyData(await response.json() as BackendPatientData);
       } catch (error) {
         console.error('Error fetching data:', error);
         setError('Failed to load data. Please try again later.');
@@ -559,11 +561,38 @@ export default function PatientPage() {
       }
     };
 
-    void fetchData();
-    
-    const intervalId = setInterval(() => void fetchData(), 30000);
-    
-    return () => clearInterval(intervalId);
+    if (typeof EventSource === 'undefined') {
+      void fetchData();
+      const intervalId = setInterval(() => void fetchData(), 30000);
+      return () => clearInterval(intervalId);
+    }
+
+    // The server pushes a "status" event whenever this patient or the category
+    // stats change; EventSource reconnects on its own and resumes via Last-Event-ID.
+    const events = new EventSource(`${BACKEND_API_BASE}/patient/${patientId}/events`);
+    events.addEventListener('status', (event) => {
+      try {
+        const data = JSON.parse((event as MessageEvent).data) as BackendPatientData | { error: string };
+        if ('error' in data) {
+          setError(data.error);
+          return;
+        }
+        applyData(data);
+        setError(null);
+      } catch (error) {
+        console.error('Error parsing status update:', error);
+      } finally {
+        setLoading(false);
+      }
+    });
+    events.onerror = () => {
+      if (events.readyState === EventSource.CLOSED) {
+        setError('Failed to load data. Please try again later.');
+        setLoading(false);
+      }
+    };
+
+    return () => events.close();
   }, [patientId]);
 
   if (loading) {
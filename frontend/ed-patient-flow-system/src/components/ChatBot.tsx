@@ -26,6 +26,30 @@ const WELCOME_MESSAGE = `👋 Hi! I'm your ED Assistant. I can help you with:
 You can type your questions or use the microphone button to speak.
 How can I help you today?`;
 
+// Reads a text/event-stream response body, calling onEvent for each event
+const readEvents = async (
+  response: Response,
+  onEvent: (event: string, data: any) => void
+) => {
+  const reader = response.body!.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const events = buffer.split("\n\n");
+    buffer = events.pop() ?? "";
+    for (const raw of events) {
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = raw.match(/^data: (.*)$/m)?.[1];
+      if (event && data) {
+        onEvent(event, JSON.parse(data));
+      }
+    }
+  }
+};
+
 const ChatBot: React.FC<ChatBotProps> = ({ patientId }) => {
   const [isOpen, setIsOpen] = useState(false);
   const [message, setMessage] = useState("");
@@ -34,6 +58,8 @@ const ChatBot: React.FC<ChatBotProps> = ({ patientId }) => {
   const [isRecording, setIsRecording] = useState(false);
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const chunksRef = useRef<Blob[]>([]);
+  // lets the backend answer follow-up questions with the earlier ones in mind
+  const sessionIdRef = useRef<string | null>(null);
 
   // Add welcome message when chat is first opened
   useEffect(() => {
@@ -60,32 +86,45 @@ const ChatBot: React.FC<ChatBotProps> = ({ patientId }) => {
       };
 
       mediaRecorder.onstop = async () => {
+        stream.getTracks().forEach(track => track.stop());
         const audioBlob = new Blob(chunksRef.current, { type: 'audio/webm' });
-        // Convert audio to base64
-        const reader = new FileReader();
-        reader.readAsDataURL(audioBlob);
-        reader.onloadend = async () => {
-          const base64Audio = reader.result as string;
+        const form = new FormData();
+        form.append("audio", audioBlob, "speech.webm");
+
+        try {
           const response = await fetch(`http://localhost:5000/listen/${patientId}`, {
             method: "POST",
-            headers: {
-              "Content-Type": "application/json", 
-            },
-            body: JSON.stringify({
-              base64Audio: base64Audio, 
-            }), 
+            body: form,
           });
-          
-          if (!response.ok) {
+          if (!response.ok || !response.body) {
             throw new Error("Speech to Speech failed");
           }
-          const data = await response.json();
-          const audio = new Audio(`data:audio/webm;base64,${data.base64_tts_audio}`);
-          audio.play();
-          //setMessage("Speech recording feature coming soon!");
-          //await sendMessage();
-        };
-        stream.getTracks().forEach(track => track.stop());
+
+          // Each sentence arrives as its own clip, play them back to back
+          // while the rest of the reply is still being synthesized
+          let playback = Promise.resolve();
+          await readEvents(response, (event, data) => {
+            if (event === "transcript") {
+              setMessages(prev => [...prev, { content: data.text, isBot: false, timestamp: new Date() }]);
+            } else if (event === "audio") {
+              const audio = new Audio(`data:audio/mpeg;base64,${data.audio}`);
+              playback = playback.then(() => new Promise<void>(resolve => {
+                audio.onended = () => resolve();
+                audio.onerror = () => resolve();
+                audio.play().catch(() => resolve());
+              }));
+            } else if (event === "error") {
+              throw new Error(data.error || "Speech to Speech failed");
+            }
+          });
+        } catch (error) {
+          console.error('Speech error:', error);
+          setMessages(prev => [...prev, {
+            content: "Sorry, I couldn't process your voice message. Please try again.",
+            isBot: true,
+            timestamp: new Date()
+          }]);
+        }
       };
 
       mediaRecorder.start();
@@ -122,28 +161,47 @@ const ChatBot: React.FC<ChatBotProps> = ({ patientId }) => {
     setIsLoading(true);
 
     try {
-      const response = await fetch('http://localhost:5000/chat', {
+      const response = await fetch('http://localhost:5000/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
           message: userMessage,
-          patient_id: patientId
+          patient_id: patientId,
+          session_id: sessionIdRef.current
         }),
       });
 
-      const data = await response.json();
-
-      if (response.ok) {
-        setMessages(prev => [...prev, {
-          content: data.reply,
-          isBot: true,
-          timestamp: new Date()
-        }]);
-      } else {
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
         throw new Error(data.error || 'Failed to get response');
       }
+
+      // Show the reply as it streams in instead of waiting for all of it
+      const replyTimestamp = new Date();
+      const appendToReply = (text: string) => {
+        setMessages(prev => prev.map(msg =>
+          msg.timestamp === replyTimestamp ? { ...msg, content: msg.content + text } : msg
+        ));
+      };
+
+      let started = false;
+      await readEvents(response, (event, data) => {
+        if (event === "token") {
+          if (!started) {
+            started = true;
+            setIsLoading(false);
+            setMessages(prev => [...prev, { content: data.text, isBot: true, timestamp: replyTimestamp }]);
+          } else {
+            appendToReply(data.text);
+          }
+        } else if (event === "done") {
+          sessionIdRef.current = data.sessionId ?? null;
+        } else if (event === "error") {
+          throw new Error(data.error || 'Failed to get response');
+        }
+      });
     } catch (error) {
       console.error('Chat error:', error);
       setMessages(prev => [...prev, {